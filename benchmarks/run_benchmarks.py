@@ -0,0 +1,208 @@
+"""Benchmarks für Model- und Controller-Schicht (offline, ohne Streamlit-Server).
+
+Aufruf aus dem Projektverzeichnis:
+    python -m benchmarks.run_benchmarks --sizes 1000 100000 --output bench_results.json
+    python -m benchmarks.run_benchmarks --baseline bench_baseline.json
+    python -m benchmarks.run_benchmarks --current bench_results.json --baseline bench_baseline.json
+"""
+import argparse
+import json
+import logging
+import platform
+import random
+import sqlite3
+import statistics
+import sys
+import time
+import tracemalloc
+from datetime import datetime
+from benchmarks.seed import create_benchmark_db, drop_benchmark_db, BENCHMARK_PASSWORD
+from models.article_model import Article
+from models.user_model import User
+from controllers.admin_controller import AdminController
+from controllers.purchase_controller import PurchaseController
+from controllers.auth_controller import AuthController
+from utils.cache import read_cache
+from utils.password_utils import password_hasher
+
+# ----- 4.2 BENCHMARK-RUNNER -----
+
+DEFAULT_SIZES = [1_000, 100_000, 1_000_000]
+DEFAULT_REPEAT = 20
+DEFAULT_THRESHOLD = 0.20  # +20 % p50 gilt als Regression
+
+
+# ---- 4.2.1 Messfälle ----
+def _benchmark_cases(size):
+    """Liefert (name, funktion, cache_leeren) je Einstiegspunkt"""
+    admin_controller = AdminController()
+    purchase_controller = PurchaseController()
+    auth_controller = AuthController()
+    rng = random.Random(size)
+
+    def login():
+        # Jeder Versuch mit anderem User, damit der Login-Throttle nicht greift
+        username = f"bench_user_{rng.randrange(size):08d}"
+        success, _, message = auth_controller.login_user(username, BENCHMARK_PASSWORD)
+        if not success:
+            raise RuntimeError(message)
+
+    return [
+        ("Article.get_all (kalt)", Article.get_all, True),
+        ("Article.get_all (Cache)", Article.get_all, False),
+        ("User.get_all_with_roles (kalt)", User.get_all_with_roles, True),
+        ("User.search (Teilstring)", lambda: User.search("user_0001"), True),
+        ("User.search (Präfix)", lambda: User.search("be"), True),
+        ("AdminController.get_user_statistics", admin_controller.get_user_statistics, True),
+        ("PurchaseController.get_active_articles", purchase_controller.get_active_articles, True),
+        ("PurchaseController.get_articles_page", purchase_controller.get_articles_page, True),
+        ("Article.search (Präfix)", lambda: Article.search("lap"), True),
+        ("Article.search (zwei Wörter)", lambda: Article.search("artikel 12"), True),
+        ("AuthController.login_user", login, True),
+    ]
+
+
+# ---- 4.2.2 Einzelnen Fall messen ----
+def _percentile(sorted_values, fraction):
+    index = min(len(sorted_values) - 1, max(0, round(fraction * (len(sorted_values) - 1))))
+    return sorted_values[index]
+
+
+def measure(func, iterations, clear_cache):
+    # Aufwärmen (Pool, Statement-Cache, ggf. Lese-Cache für warme Messung)
+    func()
+
+    timings = []
+    for _ in range(iterations):
+        if clear_cache:
+            read_cache.clear()
+        started = time.perf_counter()
+        func()
+        timings.append((time.perf_counter() - started) * 1000)
+
+    # Speicher separat messen: tracemalloc verfälscht die Laufzeit
+    if clear_cache:
+        read_cache.clear()
+    tracemalloc.start()
+    func()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    timings.sort()
+    return {
+        "iterations": iterations,
+        "min_ms": round(timings[0], 3),
+        "p50_ms": round(_percentile(timings, 0.50), 3),
+        "p95_ms": round(_percentile(timings, 0.95), 3),
+        "p99_ms": round(_percentile(timings, 0.99), 3),
+        "max_ms": round(timings[-1], 3),
+        "mean_ms": round(statistics.fmean(timings), 3),
+        "peak_kb": round(peak / 1024, 1),
+    }
+
+
+# ---- 4.2.3 Alle Größen messen ----
+def run(sizes, repeat, only=None):
+    results = {}
+    for size in sizes:
+        print(f"▶ Lege Benchmark-DB mit {size:,} Artikeln/Usern an...", flush=True)
+        started = time.perf_counter()
+        path = create_benchmark_db(article_count=size, user_count=size)
+        print(f"  fertig in {time.perf_counter() - started:.1f}s", flush=True)
+
+        # Große Datensätze: weniger Wiederholungen, damit der Lauf endlich bleibt
+        iterations = repeat if size <= 10_000 else max(3, repeat // 4)
+        size_results = {}
+        try:
+            for name, func, clear_cache in _benchmark_cases(size):
+                if only and not any(part in name for part in only):
+                    continue
+                size_results[name] = measure(func, iterations, clear_cache)
+                print(f"  {name:<45} p50 {size_results[name]['p50_ms']:>10.2f} ms   "
+                      f"p95 {size_results[name]['p95_ms']:>10.2f} ms   "
+                      f"peak {size_results[name]['peak_kb']:>10.1f} KiB", flush=True)
+        finally:
+            drop_benchmark_db(path)
+
+        results[str(size)] = size_results
+    return results
+
+
+# ---- 4.2.4 Vergleich mit Baseline ----
+def compare(current, baseline, threshold=DEFAULT_THRESHOLD):
+    """Liefert Liste der Regressionen (p50 oder Peak-Speicher über Schwelle)"""
+    regressions = []
+    for size, cases in current["results"].items():
+        for name, values in cases.items():
+            base = baseline.get("results", {}).get(size, {}).get(name)
+            if not base:
+                continue
+            for metric in ("p50_ms", "peak_kb"):
+                if base[metric] > 0 and values[metric] > base[metric] * (1 + threshold):
+                    regressions.append({
+                        "size": size,
+                        "case": name,
+                        "metric": metric,
+                        "baseline": base[metric],
+                        "current": values[metric],
+                        "change": round(values[metric] / base[metric] - 1, 3),
+                    })
+    return regressions
+
+
+# ---- 4.2.5 Kommandozeile ----
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="SYNAGEION Model/Controller-Benchmarks")
+    parser.add_argument("--sizes", type=int, nargs="+", default=DEFAULT_SIZES,
+                        help="Anzahl Artikel und User je Benchmark-DB")
+    parser.add_argument("--repeat", type=int, default=DEFAULT_REPEAT,
+                        help="Wiederholungen je Messfall (große DBs: ein Viertel)")
+    parser.add_argument("--only", nargs="+", help="Nur Messfälle, deren Name einen der Begriffe enthält")
+    parser.add_argument("--output", default="bench_results.json", help="Ergebnisdatei (JSON)")
+    parser.add_argument("--current", help="Vorhandene Ergebnisdatei statt neuer Messung")
+    parser.add_argument("--baseline", help="Baseline-Datei zum Vergleich")
+    parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD,
+                        help="Erlaubte Verschlechterung (0.2 = +20 %%)")
+    args = parser.parse_args(argv)
+
+    # Streamlit warnt ohne Server bei jedem Session-State-Zugriff
+    logging.getLogger("streamlit").setLevel(logging.ERROR)
+
+    if args.current:
+        with open(args.current, encoding="utf-8") as f:
+            current = json.load(f)
+    else:
+        try:
+            results = run(args.sizes, args.repeat, args.only)
+        finally:
+            password_hasher.shutdown()
+        current = {
+            "meta": {
+                "created_at": datetime.now().isoformat(timespec="seconds"),
+                "python": platform.python_version(),
+                "sqlite": sqlite3.sqlite_version,
+                "platform": platform.platform(),
+                "repeat": args.repeat,
+            },
+            "results": results,
+        }
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(current, f, indent=2, ensure_ascii=False)
+        print(f"💾 Ergebnisse gespeichert: {args.output}")
+
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            baseline = json.load(f)
+        regressions = compare(current, baseline, args.threshold)
+        if regressions:
+            print(f"🚨 {len(regressions)} Regression(en) gegenüber {args.baseline}:")
+            for r in regressions:
+                print(f"  [{r['size']}] {r['case']} {r['metric']}: "
+                      f"{r['baseline']} -> {r['current']} ({r['change']:+.0%})")
+            return 1
+        print(f"✅ Keine Regressionen gegenüber {args.baseline}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,94 @@
+import os
+import random
+import tempfile
+import bcrypt
+from database_setup import init_db
+from utils.database import set_default_database, transaction, close_all_pools
+from utils.cache import read_cache
+from utils.settings import set_setting
+from utils.password_utils import SETTING_BCRYPT_ROUNDS
+
+# ----- 4.1 BENCHMARK-DATEN -----
+# Legt eine temporäre SQLite-Datenbank mit synthetischen Artikeln und Usern an
+# und macht sie zur Standard-Datenbank des Prozesses.
+
+CHUNK_SIZE = 50_000
+BENCHMARK_PASSWORD = "benchmark"
+# Niedrige Kosten: gemessen wird der Controller-Pfad, nicht bcrypt selbst
+BENCHMARK_BCRYPT_ROUNDS = 4
+
+STATUSES = ["aktiv"] * 9 + ["inaktiv"]
+ROLE_IDS = [1] + [2, 3, 4] * 30 + [5] * 9  # wenige Admins, ~10 % wartend
+
+
+# ---- 4.1.1 Zeilen-Generatoren ----
+def _article_rows(count, rng):
+    for i in range(count):
+        yield (
+            f"BM{i:08d}",
+            f"Artikel {i} {rng.choice(['Laptop', 'Monitor', 'Kabel', 'Drucker', 'Tastatur'])}",
+            f"Synthetische Beschreibung für Artikel {i}",
+            rng.randint(0, 100),
+            rng.choice(STATUSES),
+        )
+
+
+def _user_rows(count, rng, hashed_password):
+    for i in range(count):
+        yield (f"bench_user_{i:08d}", hashed_password, rng.choice(ROLE_IDS))
+
+
+def _chunks(rows, size=CHUNK_SIZE):
+    chunk = []
+    for row in rows:
+        chunk.append(row)
+        if len(chunk) >= size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+# ---- 4.1.2 Datenbank anlegen ----
+def create_benchmark_db(article_count, user_count, seed=42, directory=None):
+    """Erstellt und befüllt eine Temp-DB; liefert ihren Pfad"""
+    rng = random.Random(seed)
+    fd, path = tempfile.mkstemp(prefix="synageion_bench_", suffix=".db", dir=directory)
+    os.close(fd)
+    os.unlink(path)
+
+    set_default_database(path)
+    read_cache.clear()
+    init_db(path)
+
+    hashed_password = bcrypt.hashpw(BENCHMARK_PASSWORD.encode("utf-8"),
+                                    bcrypt.gensalt(BENCHMARK_BCRYPT_ROUNDS))
+    set_setting(SETTING_BCRYPT_ROUNDS, BENCHMARK_BCRYPT_ROUNDS)
+
+    for chunk in _chunks(_article_rows(article_count, rng)):
+        with transaction() as conn:
+            conn.executemany("""
+                INSERT INTO articles (article_number, name, description, min_stock, status)
+                VALUES (?, ?, ?, ?, ?)
+            """, chunk)
+
+    for chunk in _chunks(_user_rows(user_count, rng, hashed_password)):
+        with transaction() as conn:
+            conn.executemany("""
+                INSERT INTO users (username, hashed_password, role_id)
+                VALUES (?, ?, ?)
+            """, chunk)
+
+    with transaction() as conn:
+        conn.execute("ANALYZE")
+
+    return path
+
+
+# ---- 4.1.3 Datenbank entfernen ----
+def drop_benchmark_db(path):
+    close_all_pools()
+    read_cache.clear()
+    for suffix in ("", "-wal", "-shm"):
+        if os.path.exists(path + suffix):
+            os.unlink(path + suffix)
@@ -5,6 +5,42 @@ load_dotenv()
 
 # Database Configuration
 DB_NAME = "users.db"
+DB_POOL_SIZE = int(os.getenv('DB_POOL_SIZE', '8'))
+DB_POOL_TIMEOUT = float(os.getenv('DB_POOL_TIMEOUT', '10'))
+DB_BUSY_TIMEOUT_MS = int(os.getenv('DB_BUSY_TIMEOUT_MS', '5000'))
+DB_CACHED_STATEMENTS = int(os.getenv('DB_CACHED_STATEMENTS', '256'))
+
+# Read Cache Configuration
+CACHE_MAX_ENTRIES = int(os.getenv('CACHE_MAX_ENTRIES', '256'))
+CACHE_TTL_SECONDS = float(os.getenv('CACHE_TTL_SECONDS', '30'))
+
+# Password Hashing Configuration
+BCRYPT_MAX_WORKERS = int(os.getenv('BCRYPT_MAX_WORKERS', str(max(1, (os.cpu_count() or 2) // 2))))
+BCRYPT_MAX_QUEUE = int(os.getenv('BCRYPT_MAX_QUEUE', '16'))
+BCRYPT_TIMEOUT_SECONDS = float(os.getenv('BCRYPT_TIMEOUT_SECONDS', '10'))
+BCRYPT_TARGET_MS = float(os.getenv('BCRYPT_TARGET_MS', '250'))
+BCRYPT_MIN_ROUNDS = int(os.getenv('BCRYPT_MIN_ROUNDS', '10'))
+BCRYPT_MAX_ROUNDS = int(os.getenv('BCRYPT_MAX_ROUNDS', '16'))
+# Fester Wert überschreibt die Kalibrierung (leer = kalibrierten Wert verwenden)
+BCRYPT_ROUNDS = int(os.getenv('BCRYPT_ROUNDS')) if os.getenv('BCRYPT_ROUNDS') else None
+
+# Login Throttle Configuration ('memory' = pro Prozess, 'sqlite' = prozessübergreifend)
+LOGIN_THROTTLE_BACKEND = os.getenv('LOGIN_THROTTLE_BACKEND', 'memory')
+LOGIN_MAX_ATTEMPTS = int(os.getenv('LOGIN_MAX_ATTEMPTS', '5'))
+LOGIN_REFILL_SECONDS = float(os.getenv('LOGIN_REFILL_SECONDS', '30'))
+# Nur hinter einem Reverse-Proxy setzen: IPs/Netze des Proxys (kommagetrennt,
+# z. B. '127.0.0.1, 10.0.0.0/8'). Nur Verbindungen von dort dürfen per
+# X-Forwarded-For eine Client-IP angeben; der Proxy muss die Gegenstelle an den
+# Header anhängen. Leer = immer die Socket-Adresse (X-Forwarded-For wird ignoriert).
+TRUSTED_PROXIES = os.getenv('TRUSTED_PROXIES', '')
+
+# Audit Log Configuration (Hintergrund-Writer)
+AUDIT_QUEUE_SIZE = int(os.getenv('AUDIT_QUEUE_SIZE', '10000'))
+AUDIT_BATCH_SIZE = int(os.getenv('AUDIT_BATCH_SIZE', '200'))
+AUDIT_FLUSH_SECONDS = float(os.getenv('AUDIT_FLUSH_SECONDS', '0.5'))
+
+# Stock Alert Configuration (voller Abgleich als Sicherheitsnetz, Sekunden)
+STOCK_ALERT_RECONCILE_SECONDS = float(os.getenv('STOCK_ALERT_RECONCILE_SECONDS', '3600'))
 
 # Admin Configuration
 ADMIN_USERNAME = os.getenv('ADMIN_USERNAME', 'admin')
@@ -13,6 +49,7 @@ SECRET_KEY = os.getenv('SECRET_KEY', os.urandom(24).hex())
 
 # Session Configuration
 SESSION_TIMEOUT_MINUTES = int(os.getenv('SESSION_TIMEOUT_MINUTES', '30'))
+ROLE_EPOCH_SYNC_SECONDS = float(os.getenv('ROLE_EPOCH_SYNC_SECONDS', '2'))
 
 # Logging Configuration
 LOG_LEVEL = os.getenv('LOG_LEVEL', 'INFO')
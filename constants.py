@@ -3,4 +3,28 @@ VALID_ROLES = ["Administrator", "Einkäufer", "Logistiker", "Vertriebler", "Wart
 ACTIVE_ROLES = ["Administrator", "Einkäufer", "Logistiker", "Vertriebler"]
 DEFAULT_ROLE = "Wartend"
 MIN_PASSWORD_LENGTH = 6
-MIN_USERNAME_LENGTH = 4
\ No newline at end of file
+MIN_USERNAME_LENGTH = 4
+PAGE_SIZE = 50
+FETCH_BATCH_SIZE = 1000
+ARTICLE_STATUSES = ["aktiv", "inaktiv"]
+IMPORT_CHUNK_SIZE = 1000
+IMPORT_MAX_ERRORS = 1000
+EXPORT_MAX_AGE_SECONDS = 3600
+SEARCH_LIMIT = 20
+SEARCH_MIN_LENGTH = 2
+ARTICLE_HISTORY_SNAPSHOT_EVERY = 10
+ARTICLE_HISTORY_PAGE_SIZE = 100
+AUDIT_ACTIONS = ["Rolle geändert", "User deaktiviert", "Artikel angelegt", "Artikel geändert",
+                 "Artikel deaktiviert", "Artikel importiert", "Bestellung angelegt",
+                 "Bestellung storniert"]
+# Bewegungsart -> erlaubtes Vorzeichen der Menge (+1 Zugang, -1 Abgang, 0 beides)
+STOCK_MOVEMENT_TYPES = {"Eingang": 1, "Ausgang": -1, "Umlagerung": 0, "Korrektur": 0}
+PO_STATUSES = ["Offen", "Teilgeliefert", "Geliefert", "Storniert"]
+OPEN_PO_STATUSES = ["Offen", "Teilgeliefert"]
+PUTAWAY_SUGGESTIONS = 10
+MAX_BINS_PER_GENERATE = 100000
+# ABC: Grenzen des kumulierten Wertanteils (A bis 80 %, B bis 95 %)
+ABC_THRESHOLDS = (0.80, 0.95)
+# XYZ: Grenzen des Variationskoeffizienten der Monatsverbräuche
+XYZ_THRESHOLDS = (0.5, 1.0)
+CLASSIFICATION_MONTHS = 24
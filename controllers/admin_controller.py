@@ -1,5 +1,29 @@
 from models.user_model import User
-from constants import ACTIVE_ROLES
+from models.base_model import ConflictError
+from constants import ACTIVE_ROLES, VALID_ROLES, PAGE_SIZE
+from utils.database import get_pool_stats
+from utils.cache import read_cache
+from utils.password_utils import password_hasher, get_target_rounds, calibrate_bcrypt_rounds
+from utils.throttle import login_throttle
+from utils.file_export import export_query
+from utils.audit import audit, audit_writer, query_admin_logs
+
+# Export-Spalten: (SQL-Ausdruck, Überschrift, Typ) – ohne Passwort-Hash!
+USER_EXPORT_COLUMNS = [
+    ("u.user_id", "ID", "int"),
+    ("u.username", "Benutzername", "text"),
+    ("r.role_name", "Rolle", "text"),
+    ("u.created_at", "Angelegt am", "text"),
+    ("u.last_login", "Letzter Login", "text"),
+]
+
+ADMIN_LOG_EXPORT_COLUMNS = [
+    ("l.log_id", "ID", "int"),
+    ("l.timestamp", "Zeitpunkt", "text"),
+    ("u.username", "Administrator", "text"),
+    ("l.action", "Aktion", "text"),
+    ("l.target", "Ziel", "text"),
+]
 
 # ----- 2.3 ADMIN-Controller -----
 # ---- 2.3.1 Admin-Controller Initialisierung ----
@@ -26,43 +50,84 @@ class AdminController:
             return [], str(e)
         
     # ---- 2.3.4 User Rolle ändern ----
-    def change_user_role(self, user_id, new_role):
-        """Ändert die Rolle eines Users"""
+    def change_user_role(self, user_id, new_role, expected_version=None, audit_action="Rolle geändert"):
+        """Ändert die Rolle eines Users.
+
+        expected_version: row_version, die der Admin angezeigt bekam. Wurde
+        der User inzwischen geändert, kommt (False, ConflictError) zurück.
+        """
         try:
-            if new_role not in ACTIVE_ROLES:
+            if new_role not in VALID_ROLES:
                 return False, [f"Ungültige Rolle: {new_role}"]
             
-            all_users, error = self.get_all_users()
-            if error:
-                return False, [f"Fehler beim Laden der User: {error}"]
-            
-            user = None
-            for u in all_users:
-                if u.user_id == user_id:
-                    user = u
-                    break
-            
+            user = User.find_by_id(user_id)
             if not user:
                 return False, ["User nicht gefunden"]
+            if expected_version is not None:
+                user.row_version = expected_version
             
             old_role = user.role_name
             user.update_role(new_role)
+            audit(audit_action, f"{user.username}: {old_role} -> {new_role}")
 
             return True, f"Rolle von '{old_role}' zu '{new_role}' geändert'"
         
+        except ConflictError as conflict:
+            return False, conflict
         except ValueError as e:
             return False, [str(e)]
         except Exception as e:
             return False, [f"Unerwarteter Fehler: {str(e)}"]
         
     # ---- 2.3.5 User "deaktivieren" ----
-    def deactivate_user(self, user_id):
+    def deactivate_user(self, user_id, expected_version=None):
         """Setzt User-Rolle auf 'Wartend' (SOFT-DELETE)"""
         try:
-            return self.change_user_role(user_id, "Wartend")
+            return self.change_user_role(user_id, "Wartend", expected_version=expected_version,
+                                         audit_action="User deaktiviert")
         except Exception as e:
             return False, [f"Fehler beim Deaktivieren: {str(e)}"]
 
+    # ---- 2.3.5.1 Rollen mehrerer User auf einmal ändern ----
+    def change_user_roles_bulk(self, assignments):
+        """Ändert viele Rollen in einer Transaktion (z. B. Freischaltung einer Schicht).
+
+        assignments: {user_id: rolle} oder [(user_id, rolle[, erwartete_version])]
+        Liefert (True, bericht) mit einem Eintrag je User
+        {user_id, username, old_role, new_role, success, message} oder (False, [fehler]).
+        """
+        try:
+            if isinstance(assignments, dict):
+                assignments = list(assignments.items())
+            normalized = []
+            for assignment in assignments:
+                user_id, new_role, *rest = assignment
+                normalized.append((user_id, new_role, rest[0] if rest else None))
+
+            invalid = sorted({role for _, role, _ in normalized if role not in VALID_ROLES})
+            if invalid:
+                return False, [f"Ungültige Rolle: {role}" for role in invalid]
+            if not normalized:
+                return True, []
+
+            report = []
+            for user_id, username, old_role, new_role, error in User.update_roles_bulk(normalized):
+                if error is None:
+                    action = "User deaktiviert" if new_role == "Wartend" else "Rolle geändert"
+                    audit(action, f"{username}: {old_role} -> {new_role}")
+                report.append({
+                    "user_id": user_id,
+                    "username": username,
+                    "old_role": old_role,
+                    "new_role": new_role,
+                    "success": error is None,
+                    "message": error or f"{old_role} -> {new_role}"
+                })
+            return True, report
+
+        except Exception as e:
+            return False, [f"Unerwarteter Fehler: {str(e)}"]
+
     # ---- 2.3.6 Verfügbare Rollen abrufen ----
     def get_available_roles(self):
         """Gibt alle aktiven Rollen zurück"""
@@ -70,19 +135,123 @@ class AdminController:
     
     # ---- 2.3.7 User-Statistiken ----
     def get_user_statistics(self):
-        """Erstellt Statistiken über User Verteilung"""
-        try:
-            all_users, error = self.get_all_users()
-            if error:
-                return {}, error
-            
-            # Statistiken berechnen
-            stats = {}
-            for user in all_users:
-                role = user.role_name
-                stats[role] = stats.get(role, 0) + 1
+        """Erstellt Statistiken über User Verteilung.
 
+        Liefert ({"by_role": {rolle: anzahl}, "total", "waiting", "admins"}, fehler);
+        gelesen wird nur die Zählertabelle (eine Zeile je Rolle).
+        """
+        try:
+            by_role = User.count_by_role()
+            stats = {
+                "by_role": by_role,
+                "total": sum(by_role.values()),
+                "waiting": by_role.get("Wartend", 0),
+                "admins": by_role.get("Administrator", 0)
+            }
             return stats, None
         
         except Exception as e:
-            return {}, str(e)
\ No newline at end of file
+            return {}, str(e)
+
+    # ---- 2.3.7.1 Rollen-Zähler prüfen ----
+    def check_role_counts(self, repair=True):
+        """Vergleicht role_counts mit einer echten Zählung; repariert auf Wunsch"""
+        try:
+            return User.check_role_counts(repair=repair), None
+        except Exception as e:
+            return [], str(e)
+        
+    # ---- 2.3.8 User seitenweise abrufen ----
+    def get_users_page(self, role=None, search=None, after=None, limit=PAGE_SIZE):
+        """Holt eine Seite User (Rollenfilter und indexgestützte Namenssuche, Keyset-Cursor)"""
+        try:
+            users, next_cursor = User.search(search, role=role, limit=limit, cursor=after)
+            return users, next_cursor, None
+        except Exception as e:
+            return [], None, str(e)
+
+    # ---- 2.3.9 DB-Pool-Statistiken ----
+    def get_database_stats(self):
+        """Liefert Statistiken der DB-Connection-Pools dieses Prozesses"""
+        try:
+            return get_pool_stats(), None
+        except Exception as e:
+            return [], str(e)
+
+    # ---- 2.3.10 Lese-Cache-Statistiken ----
+    def get_cache_stats(self):
+        """Liefert Treffer-/Fehlzugriffszähler des prozessweiten Lese-Caches"""
+        try:
+            return read_cache.stats(), None
+        except Exception as e:
+            return {}, str(e)
+
+    # ---- 2.3.11 Passwort-Hashing-Statistiken ----
+    def get_hashing_stats(self):
+        """Liefert Laufzeit- und Auslastungswerte des bcrypt-Prozess-Pools"""
+        try:
+            stats = password_hasher.stats()
+            stats["target_rounds"] = get_target_rounds()
+            return stats, None
+        except Exception as e:
+            return {}, str(e)
+
+    # ---- 2.3.12 bcrypt-Kosten kalibrieren ----
+    def calibrate_password_cost(self):
+        """Misst bcrypt auf diesem Host und speichert die gewählten Kosten"""
+        try:
+            rounds, measurements = calibrate_bcrypt_rounds()
+            return True, (rounds, measurements)
+        except Exception as e:
+            return False, [f"Fehler bei der Kalibrierung: {str(e)}"]
+
+    # ---- 2.3.13 Login-Throttle-Zustand ----
+    def get_throttle_state(self):
+        """Liefert Throttle-Konfiguration und alle aktuell gedrosselten Buckets"""
+        try:
+            return (login_throttle.stats(), login_throttle.state()), None
+        except Exception as e:
+            return ({}, []), str(e)
+
+    # ---- 2.3.14 User exportieren (CSV/Parquet) ----
+    def export_users(self, export_format="csv"):
+        """Streamt alle User (ohne Passwort-Hash) in eine Temp-Datei"""
+        try:
+            result = export_query("""
+                FROM users u
+                LEFT JOIN roles r ON u.role_id = r.role_id
+                ORDER BY u.username
+            """, (), USER_EXPORT_COLUMNS, export_format, "benutzer")
+            return result, None
+        except Exception as e:
+            return None, str(e)
+
+    # ---- 2.3.15 Admin-Logs exportieren (CSV/Parquet) ----
+    def export_admin_logs(self, export_format="csv"):
+        """Streamt das Admin-Protokoll in eine Temp-Datei"""
+        try:
+            result = export_query("""
+                FROM admin_logs l
+                LEFT JOIN users u ON l.admin_id = u.user_id
+                ORDER BY l.log_id
+            """, (), ADMIN_LOG_EXPORT_COLUMNS, export_format, "admin_logs")
+            return result, None
+        except Exception as e:
+            return None, str(e)
+
+    # ---- 2.3.16 Audit-Log seitenweise abrufen ----
+    def get_admin_logs_page(self, action=None, admin_username=None, before=None, limit=PAGE_SIZE):
+        """Neueste Einträge zuerst; liefert (zeilen, next_cursor, fehler)"""
+        try:
+            rows, next_cursor = query_admin_logs(action=action, admin_username=admin_username,
+                                                 before=before, limit=limit)
+            return rows, next_cursor, None
+        except Exception as e:
+            return [], None, str(e)
+
+    # ---- 2.3.17 Audit-Writer-Statistiken ----
+    def get_audit_stats(self):
+        try:
+            return audit_writer.stats(), None
+        except Exception as e:
+            return {}, str(e)
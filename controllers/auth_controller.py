@@ -1,9 +1,17 @@
+import logging
 import sqlite3
-import bcrypt
 import streamlit as st
-from config import DB_NAME
+from utils.database import connection, transaction
+from utils.cache import bump_version
+from utils.password_utils import password_hasher, needs_rehash, HashingBusyError
+from utils.throttle import login_throttle
+from utils.session_epochs import epoch_registry
 from constants import MIN_PASSWORD_LENGTH
 
+logger = logging.getLogger("synageion.auth")
+
+BUSY_MESSAGE = "⏳ Server ist gerade ausgelastet – bitte in einigen Sekunden erneut versuchen"
+
 # ---- 2.2 Authentifikator-Controller ----
 class AuthController:
     # --- 2.2.1 Authentifikator-Initialisierung ---
@@ -11,28 +19,39 @@ class AuthController:
         pass
     
     # --- 2.2.2 Login-Authentifizierung ---
-    def login_user(self, username, password):
+    def login_user(self, username, password, client_id=None):
         """Benutzer anmelden"""
         try:
-            conn = sqlite3.connect(DB_NAME)
-            c = conn.cursor()
+            # Throttle VOR Datenbank und bcrypt prüfen
+            allowed, retry_after = login_throttle.allow(username, client_id)
+            if not allowed:
+                return False, None, f"Zu viele Anmeldeversuche – bitte in {int(retry_after) + 1} s erneut versuchen"
 
-            c.execute("""
-                      SELECT u.hashed_password, r.role_name
-                      FROM users u
-                      JOIN roles r ON u.role_id = r.role_id
-                      WHERE u.username = ?
-                      """, (username,))
-            
-            result = c.fetchone()
-            conn.close()
+            with connection() as conn:
+                c = conn.cursor()
+                c.execute("""
+                          SELECT u.user_id, u.hashed_password, r.role_name
+                          FROM users u
+                          JOIN roles r ON u.role_id = r.role_id
+                          WHERE u.username = ?
+                          """, (username,))
+                
+                result = c.fetchone()
 
             if result:
-                hashed_pw, role = result
-                if bcrypt.checkpw(password.encode("utf-8"), hashed_pw):
+                user_id, hashed_pw, role = result
+                if password_hasher.check_password(password, hashed_pw):
+                    # Hash mit veralteten Kosten transparent erneuern
+                    if needs_rehash(hashed_pw):
+                        self._rehash_password(user_id, password, hashed_pw)
+
                     # ✅ Login-Zeit für Session-Timeout setzen
                     import time
                     st.session_state.login_time = time.time()  # ← HINZUFÜGEN
+
+                    # Rollen-Epoche merken, um spätere Rollenänderungen zu erkennen
+                    st.session_state.user_id = user_id
+                    st.session_state.role_epoch = epoch_registry.load_epoch(user_id)
                     
                     return True, role, "Login erfolgreich!"
                 else:
@@ -40,30 +59,54 @@ class AuthController:
             else:
                 return False, None, "Benutzer nicht gefunden"
             
+        except HashingBusyError:
+            return False, None, BUSY_MESSAGE
         except Exception as e:
             return False, None, f"Fehler beim Login: {str(e)}"
     
+    # --- 2.2.2.1 Rehash nach erfolgreichem Login ---
+    def _rehash_password(self, user_id, password, old_hash):
+        """Speichert einen Hash mit den aktuellen Ziel-Kosten (best effort)"""
+        try:
+            new_hash = password_hasher.hash_password(password)
+        except HashingBusyError:
+            return  # Beim nächsten Login erneut versuchen
+
+        try:
+            with transaction() as conn:
+                # Nur ersetzen, wenn das Passwort nicht zwischenzeitlich geändert wurde
+                conn.execute("""
+                        UPDATE users
+                        SET hashed_password = ?
+                        WHERE user_id = ? AND hashed_password = ?
+                        """, (new_hash, user_id, old_hash))
+        except sqlite3.Error:
+            # Z. B. Datenbank gesperrt – der Login selbst bleibt gültig
+            logger.warning("Passwort-Rehash für User %s übersprungen", user_id, exc_info=True)
+            return
+        bump_version("users")
+
     # --- 2.2.3 User-Anlage ---
     def register_user(self, username, password, role):
         """Registriert neuen Benutzer"""
         try:
-            conn = sqlite3.connect(DB_NAME)
-            c = conn.cursor()
-
-            # Passwort-Hash
-            hashed_pw = bcrypt.hashpw(password.encode("utf-8"), bcrypt.gensalt())
+            # Passwort-Hash (vor der Transaktion, um die Schreibsperre kurz zu halten)
+            hashed_pw = password_hasher.hash_password(password)
 
-            c.execute("""
-                    INSERT INTO users (username, hashed_password, role_id)
-                    SELECT ?, ?, role_id FROM roles WHERE role_name = ?
-                    """, (username, hashed_pw, role))
+            with transaction() as conn:
+                c = conn.cursor()
+                c.execute("""
+                        INSERT INTO users (username, hashed_password, role_id)
+                        SELECT ?, ?, role_id FROM roles WHERE role_name = ?
+                        """, (username, hashed_pw, role))
+            bump_version("users")
             
-            conn.commit()
-            conn.close()
             return True, "Registrierung erfolgreich"
         
         except sqlite3.IntegrityError:
             return False, "Benutzername bereits vergeben"
+        except HashingBusyError:
+            return False, BUSY_MESSAGE
         except Exception as e:
             return False, f"Fehler: {str(e)}"
         
@@ -81,47 +124,40 @@ class AuthController:
             if len(new_password) < MIN_PASSWORD_LENGTH:
                 return False, f"Passwort muss mindestens {MIN_PASSWORD_LENGTH} Zeichen haben"
             
-            # Altes Passwort mit SQL prüfen
-            conn = sqlite3.connect(DB_NAME)
-            c = conn.cursor()
-
             # Aktuelles Passwort abrufen
-            c.execute("""
-                    SELECT hashed_password, user_id
-                    FROM users
-                    WHERE username = ?
-                    """, (username,))
-            
-            result = c.fetchone()
+            with connection() as conn:
+                c = conn.cursor()
+                c.execute("""
+                        SELECT hashed_password, user_id
+                        FROM users
+                        WHERE username = ?
+                        """, (username,))
+                
+                result = c.fetchone()
 
             if not result:
-                conn.close()
                 return False, "Benutzer nicht gefunden"
                 
             current_hash, user_id = result
 
             # Altes Passwort prüfen
-            if not bcrypt.checkpw(old_password.encode("utf-8"), current_hash):
-                conn.close()
+            if not password_hasher.check_password(old_password, current_hash):
                 return False, "Aktuelles Passwort ist falsch"
             
             # Neues Passwort hashen und speichern
-            new_hash = bcrypt.hashpw(new_password.encode("utf-8"), bcrypt.gensalt())
+            new_hash = password_hasher.hash_password(new_password)
 
-            c.execute("""
-                    UPDATE users
-                    SET hashed_password = ?
-                    WHERE user_id = ?
-                    """, (new_hash, user_id))
-            
-            conn.commit()
-            conn.close()
+            with transaction() as conn:
+                conn.execute("""
+                        UPDATE users
+                        SET hashed_password = ?
+                        WHERE user_id = ?
+                        """, (new_hash, user_id))
+            bump_version("users")
 
             return True, "Passwort erfolgreich geändert!"
         
+        except HashingBusyError:
+            return False, BUSY_MESSAGE
         except Exception as e:
-            if "conn" in locals():
-                conn.close()
             return False, f"Fehler beim Passwort-Wechsel: {str(e)}"
-            
-
@@ -0,0 +1,235 @@
+import streamlit as st
+from models.article_model import Article
+from models.stock_model import StockMovement
+from models.purchase_order_model import PurchaseOrder
+from models.storage_bin_model import StorageBin
+from models.stock_alert_model import StockAlert
+from models.classification_model import ArticleClassification
+from utils.bin_codes import normalize_bin_code
+from constants import PAGE_SIZE, SEARCH_LIMIT, SEARCH_MIN_LENGTH, OPEN_PO_STATUSES
+
+
+# ----- 2.5 LOGISTIK-Controller -----
+class LogisticsController:
+    # ---- 2.5.1 Logistik-Controller Initialisierung ----
+    def __init__(self):
+        pass
+
+    # ---- 2.5.2 Bewegung buchen (Eingang/Ausgang/Korrektur) ----
+    def book_movement(self, article_id, bin_code, quantity, movement_type, reference=None):
+        """Bucht eine Bewegung; Menge mit Vorzeichen (Ausgang negativ)"""
+        try:
+            movement = StockMovement(
+                article_id=article_id,
+                bin_code=bin_code,
+                quantity=quantity,
+                movement_type=movement_type,
+                reference=(reference or "").strip() or None,
+                user_id=st.session_state.get("user_id")
+            )
+            errors = movement.validate()
+            if errors:
+                return False, errors
+
+            movement.save()
+            balance = StockMovement.get_balance(movement.article_id, movement.bin_code)
+            return True, f"{movement_type} gebucht – neuer Bestand auf {movement.bin_code}: {balance}"
+
+        except ValueError as e:
+            return False, [str(e)]
+        except Exception as e:
+            return False, [f"Unerwarteter Fehler: {str(e)}"]
+
+    # ---- 2.5.3 Umlagerung zwischen Lagerplätzen ----
+    def transfer_stock(self, article_id, from_bin, to_bin, quantity, reference=None):
+        try:
+            StockMovement.transfer(article_id, from_bin, to_bin, quantity,
+                                   reference=(reference or "").strip() or None,
+                                   user_id=st.session_state.get("user_id"))
+            return True, (f"{quantity} Stück von {normalize_bin_code(from_bin)} "
+                          f"nach {normalize_bin_code(to_bin)} umgelagert")
+        except ValueError as e:
+            return False, [str(e)]
+        except Exception as e:
+            return False, [f"Unerwarteter Fehler: {str(e)}"]
+
+    # ---- 2.5.4 Bestand eines Artikels je Lagerplatz ----
+    def get_article_stock(self, article_id):
+        try:
+            return StockMovement.get_article_stock(article_id), None
+        except Exception as e:
+            return {}, str(e)
+
+    # ---- 2.5.5 Bestände seitenweise ----
+    def get_stock_page(self, article_id=None, bin_code=None, after=None, limit=PAGE_SIZE):
+        """Liefert (ResultSet, next_cursor, fehler)"""
+        try:
+            balances, next_cursor = StockMovement.query_balances(
+                article_id=article_id, bin_code=bin_code, after=after, limit=limit
+            )
+            return balances, next_cursor, None
+        except Exception as e:
+            return None, None, str(e)
+
+    # ---- 2.5.6 Bewegungsjournal seitenweise ----
+    def get_movements_page(self, article_id=None, before=None, limit=PAGE_SIZE):
+        try:
+            movements, next_cursor = StockMovement.query_movements(
+                article_id=article_id, before=before, limit=limit
+            )
+            return movements, next_cursor, None
+        except Exception as e:
+            return None, None, str(e)
+
+    # ---- 2.5.7 Bestände gegen Journal prüfen ----
+    def verify_balances(self, repair=False):
+        """Liefert ([(article_id, lagerplatz, bestand, journal)], fehler)"""
+        try:
+            return StockMovement.verify_balances(repair=repair), None
+        except Exception as e:
+            return [], str(e)
+
+    # ---- 2.5.8 Artikel suchen (für Buchungsformulare) ----
+    def search_articles(self, query, limit=SEARCH_LIMIT):
+        try:
+            if len((query or "").strip()) < SEARCH_MIN_LENGTH:
+                return [], None
+            return Article.search(query, limit=limit), None
+        except Exception as e:
+            return [], str(e)
+
+    # ---- 2.5.9 Offene Bestellungen (für den Wareneingang) ----
+    def get_open_purchase_orders(self, before=None, limit=PAGE_SIZE):
+        try:
+            orders, next_cursor = PurchaseOrder.query(status=OPEN_PO_STATUSES, before=before, limit=limit)
+            return orders, next_cursor, None
+        except Exception as e:
+            return None, None, str(e)
+
+    # ---- 2.5.10 Offene Positionen einer Bestellung ----
+    def get_open_lines(self, po_id):
+        try:
+            return PurchaseOrder.open_lines(po_id), None
+        except Exception as e:
+            return None, str(e)
+
+    # ---- 2.5.11 Wareneingang buchen (alle Positionen in einem Schritt) ----
+    def receive_goods(self, po_id, receipts, delivery_note=None):
+        """receipts: [(line_id, menge, lagerplatz)] – bucht alle oder keine"""
+        try:
+            normalized = []
+            for line_id, quantity, bin_code in receipts:
+                try:
+                    normalized.append((line_id, int(quantity or 0), bin_code))
+                except (TypeError, ValueError):
+                    return False, [f"Ungültige Menge: {quantity}"]
+
+            result = PurchaseOrder.receive(
+                po_id, normalized,
+                reference=(delivery_note or "").strip() or None,
+                user_id=st.session_state.get("user_id")
+            )
+            return True, (f"{result['quantity']} Stück auf {result['lines']} Positionen eingebucht – "
+                          f"Bestellung ist jetzt {result['status'].lower()}")
+        except ValueError as e:
+            return False, [str(e)]
+        except Exception as e:
+            return False, [f"Unerwarteter Fehler: {str(e)}"]
+
+    # ---- 2.5.12 Lagerplatz-Bereich anlegen ----
+    def create_bins(self, zone, aisles, shelves, levels, capacity=None):
+        """aisles/shelves/levels: (von, bis) inklusive"""
+        try:
+            created = StorageBin.generate(
+                zone,
+                range(aisles[0], aisles[1] + 1),
+                range(shelves[0], shelves[1] + 1),
+                range(levels[0], levels[1] + 1),
+                capacity=capacity
+            )
+            return True, f"{created:,} Lagerplätze angelegt"
+        except ValueError as e:
+            return False, [str(e)]
+        except Exception as e:
+            return False, [f"Unerwarteter Fehler: {str(e)}"]
+
+    # ---- 2.5.13 Einzelnen Lagerplatz anlegen/ändern ----
+    def save_bin(self, bin_code, capacity=None, active=True):
+        try:
+            storage_bin = StorageBin(bin_code, capacity=capacity, active=active)
+            errors = storage_bin.validate()
+            if errors:
+                return False, errors
+            storage_bin.save()
+            return True, f"Lagerplatz {storage_bin.bin_code} gespeichert"
+        except ValueError as e:
+            return False, [str(e)]
+        except Exception as e:
+            return False, [f"Unerwarteter Fehler: {str(e)}"]
+
+    # ---- 2.5.14 Lagerplätze seitenweise ----
+    def get_bins_page(self, prefix=None, zone=None, only_free=False, after=None, limit=PAGE_SIZE):
+        try:
+            bins, next_cursor = StorageBin.query(prefix=prefix, zone=zone, only_free=only_free,
+                                                 after=after, limit=limit)
+            return bins, next_cursor, None
+        except Exception as e:
+            return None, None, str(e)
+
+    # ---- 2.5.15 Einlagerungsvorschläge ----
+    def suggest_putaway(self, article_id, quantity, zone=None, prefix=None):
+        try:
+            return StorageBin.suggest_putaway(article_id, quantity, zone=zone, prefix=prefix), None
+        except Exception as e:
+            return None, str(e)
+
+    # ---- 2.5.16 Belegung prüfen ----
+    def check_bin_occupancy(self, repair=False):
+        try:
+            return StorageBin.check_occupancy(repair=repair), None
+        except Exception as e:
+            return [], str(e)
+
+    # ---- 2.5.17 Mindestbestands-Warnungen seitenweise ----
+    def get_stock_alerts_page(self, before=None, limit=PAGE_SIZE):
+        """Liefert (ResultSet, next_cursor, anzahl, fehler); stößt ggf. den periodischen Abgleich an"""
+        try:
+            StockAlert.reconcile_if_due()
+            alerts, next_cursor = StockAlert.query(before=before, limit=limit)
+            return alerts, next_cursor, StockAlert.count(), None
+        except Exception as e:
+            return None, None, 0, str(e)
+
+    # ---- 2.5.18 Warnungen gegen Bestände abgleichen ----
+    def reconcile_stock_alerts(self, repair=False):
+        try:
+            return StockAlert.reconcile(repair=repair), None
+        except Exception as e:
+            return [], str(e)
+
+    # ---- 2.5.19 ABC/XYZ-Analyse neu berechnen ----
+    def run_classification(self):
+        """Liefert (laufstatistik, fehler)"""
+        try:
+            return ArticleClassification.classify(), None
+        except Exception as e:
+            return None, str(e)
+
+    # ---- 2.5.20 ABC/XYZ-Matrix ----
+    def get_classification_matrix(self):
+        """Liefert ({(abc, xyz): (anzahl, wert)}, berechnet_am, fehler)"""
+        try:
+            cells, computed_at = ArticleClassification.matrix()
+            return cells, computed_at, None
+        except Exception as e:
+            return {}, None, str(e)
+
+    # ---- 2.5.21 Klassifizierte Artikel seitenweise ----
+    def get_classification_page(self, abc_class=None, xyz_class=None, after=None, limit=PAGE_SIZE):
+        try:
+            articles, next_cursor = ArticleClassification.query(
+                abc_class=abc_class, xyz_class=xyz_class, after=after, limit=limit
+            )
+            return articles, next_cursor, None
+        except Exception as e:
+            return None, None, str(e)
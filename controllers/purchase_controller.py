@@ -1,4 +1,36 @@
+import math
+import streamlit as st
 from models.article_model import Article
+from models.purchase_order_model import PurchaseOrder
+from models.stock_alert_model import StockAlert
+from models.base_model import ConflictError
+from constants import PAGE_SIZE, IMPORT_CHUNK_SIZE, IMPORT_MAX_ERRORS, SEARCH_LIMIT, SEARCH_MIN_LENGTH
+from utils.file_import import open_table
+from utils.file_export import export_query
+from utils.audit import audit
+
+# Export-Spalten: (SQL-Ausdruck, Überschrift, Typ)
+ARTICLE_EXPORT_COLUMNS = [
+    ("article_id", "ID", "int"),
+    ("article_number", "Artikelnummer", "text"),
+    ("name", "Artikelname", "text"),
+    ("description", "Beschreibung", "text"),
+    ("min_stock", "Mindestbestand", "int"),
+    ("status", "Status", "text"),
+]
+
+# Zulässige Spaltenüberschriften (kleingeschrieben) -> Artikelfeld
+ARTICLE_IMPORT_COLUMNS = {
+    "artikelnummer": "article_number",
+    "article_number": "article_number",
+    "artikelname": "name",
+    "name": "name",
+    "beschreibung": "description",
+    "description": "description",
+    "mindestbestand": "min_stock",
+    "min_stock": "min_stock",
+    "status": "status",
+}
 
 # ----- 2.0 Controller -----
     # ---- 2.1 Einkauf-Controller ----
@@ -35,6 +67,7 @@ class PurchaseController:
             
             success = article.save()
             if success:
+                audit("Artikel angelegt", f"{article.article_number} ({article.name})")
                 return True, "Artikel erfolgreich erstellt"
             else:
                 return False, ["Fehler beim Speichern"]
@@ -47,20 +80,24 @@ class PurchaseController:
             return False, [f"Unerwarteter Fehler: {str(e)}"]
         
     # ---- 2.1.3 Artikel aktualisieren ----
-    def update_article(self, article_id, article_data):
-        """Aktualisiert einen bestehenden Artikel"""
+    def update_article(self, article_id, article_data, expected_version=None, original=None):
+        """Aktualisiert einen bestehenden Artikel.
+
+        expected_version: row_version beim Laden im Formular. Hat jemand den
+        Artikel seitdem geändert, wird mit original (geladene Werte) drei-Wege
+        zusammengeführt; echte Feldkonflikte kommen als (False, ConflictError)
+        zurück, damit die Oberfläche vergleichen oder überschreiben kann.
+        """
         try:
             # Artikel aus der Datenbank laden
             article = Article.find_by_id(article_id)
             if not article:
                 return False, ["Artikel nicht gefunden"]
+            if expected_version is not None:
+                article.row_version = expected_version
             
             # Neue Daten setzen
-            article.article_number = article_data.get("article_number", article.article_number)
-            article.name = article_data.get("name", article.name)
-            article.description = article_data.get("description", article.description)
-            article.min_stock = article_data.get("min_stock", article.min_stock)
-            article.status = article_data.get("status", article.status)
+            self._apply_article_data(article, article_data)
 
             # Validierung
             errors = article.validate()
@@ -68,16 +105,46 @@ class PurchaseController:
                 return False, errors
             
             # Speicherung
-            success = article.save()
+            try:
+                success = article.save()
+            except ConflictError as conflict:
+                if original is None:
+                    return False, conflict
+                merged, conflict.fields = conflict.merge(original, article_data)
+                if conflict.fields:
+                    return False, conflict
+
+                # Nur unterschiedliche Felder geändert: auf aktuellem Stand speichern
+                article = conflict.current
+                self._apply_article_data(article, merged)
+                errors = article.validate()
+                if errors:
+                    return False, errors
+                article.save()
+                audit("Artikel geändert", f"{article.article_number} (zusammengeführt)")
+                return True, "Artikel aktualisiert (mit zwischenzeitlichen Änderungen zusammengeführt)"
+
             if success:
+                audit("Artikel geändert", article.article_number)
                 return True, "Artikel erfolgreich aktualisiert"
             else:
                 return False, ["Fehler beim Aktualisieren"]
         
+        except ConflictError as conflict:
+            return False, conflict
         except ValueError as e:
             return False, [str(e)]
         except Exception as e:
             return False, [f"Unerwarteter Fehler: {str(e)}"]
+
+    # ---- 2.1.3.1 Formulardaten auf Artikel übertragen ----
+    @staticmethod
+    def _apply_article_data(article, article_data):
+        article.article_number = article_data.get("article_number", article.article_number)
+        article.name = article_data.get("name", article.name)
+        article.description = article_data.get("description", article.description)
+        article.min_stock = article_data.get("min_stock", article.min_stock)
+        article.status = article_data.get("status", article.status)
             
     # ---- 2.1.4 Artikel löschen ----
     def delete_article(self, article_id):
@@ -91,6 +158,7 @@ class PurchaseController:
 
             success = article.save()
             if success:
+                audit("Artikel deaktiviert", article.article_number)
                 return True, "Artikel erfolgreich deaktiviert"
             else:
                 return False, ["Fehler beim Deaktivieren"]
@@ -102,11 +170,362 @@ class PurchaseController:
     def get_active_articles(self):
         """Holt nur Artikel mit Status 'aktiv'"""
         try:
-            all_articles = Article.get_all()
-            active_articles = [article for article in all_articles if article.status == "aktiv"]
+            active_articles, _ = Article.query(status="aktiv", limit=None)
             return active_articles, None
         except Exception as e:
             return [], str(e)
-            
 
-            
+    # ---- 2.1.6 Artikel seitenweise abrufen ----
+    def get_articles_page(self, status=None, after=None, limit=PAGE_SIZE):
+        """Holt eine Seite Artikel als spaltenorientiertes ResultSet (Filter in SQL, Keyset-Cursor)"""
+        try:
+            articles, next_cursor = Article.query_table(status=status, after=after, limit=limit)
+            return articles, next_cursor, None
+        except Exception as e:
+            return None, None, str(e)
+
+    # ---- 2.1.7 Einzelnen Artikel abrufen ----
+    def get_article(self, article_id):
+        """Holt einen Artikel direkt über seine ID"""
+        try:
+            article = Article.find_by_id(article_id)
+            if not article:
+                return None, "Artikel nicht gefunden"
+            return article, None
+        except Exception as e:
+            return None, str(e)
+
+    # ---- 2.1.8 Artikel-Massenimport (CSV/XLSX) ----
+    def import_articles(self, file, filename, progress_callback=None, chunk_size=IMPORT_CHUNK_SIZE):
+        """Importiert Artikel streamend in Chunks (Upsert per Artikelnummer).
+
+        Fehlerhafte Zeilen werden gesammelt und übersprungen, der Rest wird
+        gespeichert. progress_callback(verarbeitete_zeilen, anteil_oder_None)
+        wird nach jedem Chunk aufgerufen.
+        Liefert (True, bericht) oder (False, [fehler]).
+        """
+        try:
+            reader = open_table(file, filename)
+        except Exception as e:
+            return False, [f"Datei kann nicht gelesen werden: {str(e)}"]
+
+        try:
+            columns = {header: ARTICLE_IMPORT_COLUMNS.get(header) for header in reader.headers}
+            missing = {"article_number", "name"} - set(columns.values())
+            if missing:
+                return False, ["Pflichtspalten fehlen: Artikelnummer, Artikelname"]
+
+            report = {"processed": 0, "saved": 0, "failed": 0, "errors": []}
+            chunk = []
+
+            for row_number, record in reader:
+                chunk.append((row_number, record))
+                if len(chunk) >= chunk_size:
+                    self._import_chunk(chunk, columns, report)
+                    chunk = []
+                    if progress_callback:
+                        progress_callback(report["processed"], reader.progress)
+
+            self._import_chunk(chunk, columns, report)
+            if progress_callback:
+                progress_callback(report["processed"], 1.0)
+
+            audit("Artikel importiert",
+                  f"{filename}: {report['saved']} gespeichert, {report['failed']} fehlerhaft")
+            return True, report
+
+        except Exception as e:
+            return False, [f"Unerwarteter Fehler beim Import: {str(e)}"]
+        finally:
+            reader.detach()
+
+    # ---- 2.1.8.1 Einen Chunk parsen, validieren und speichern ----
+    def _import_chunk(self, chunk, columns, report):
+        parsed, errors = [], []
+
+        for row_number, record in chunk:
+            # Fehlende Spalten bleiben None: beim Update wird der gespeicherte Wert nicht überschrieben
+            values = {"article_number": "", "name": "", "description": None, "min_stock": None, "status": None}
+            for header, value in record.items():
+                field = columns.get(header)
+                if field and value is not None:
+                    values[field] = str(value).strip() if field != "min_stock" else value
+
+            min_stock = values["min_stock"]
+            if min_stock is not None and str(min_stock).strip():
+                try:
+                    number = float(str(min_stock).strip().replace(",", "."))
+                    if not math.isfinite(number) or not number.is_integer():
+                        raise ValueError(min_stock)
+                    values["min_stock"] = int(number)
+                except (ValueError, OverflowError):
+                    errors.append((row_number, [f"Mindestbestand ist keine ganze Zahl: {min_stock}"]))
+                    continue
+            else:
+                values["min_stock"] = None
+
+            values["status"] = values["status"].lower() if values["status"] else None
+            parsed.append((row_number, values))
+
+        valid, validation_errors = Article.validate_batch(parsed)
+        saved, db_errors = Article.upsert_many(valid)
+
+        row_errors = errors + validation_errors + db_errors
+        report["processed"] += len(chunk)
+        report["saved"] += saved
+        report["failed"] += len(row_errors)
+        # Fehlerliste begrenzen, damit riesige fehlerhafte Dateien den Speicher nicht füllen
+        room = IMPORT_MAX_ERRORS - len(report["errors"])
+        if room > 0:
+            report["errors"].extend(sorted(row_errors)[:room])
+
+    # ---- 2.1.9 Artikel exportieren (CSV/Parquet) ----
+    def export_articles(self, export_format="csv", status=None):
+        """Streamt den Artikelstamm in eine Temp-Datei; liefert ((pfad, zeilen), fehler)"""
+        try:
+            where, params = "", ()
+            if status:
+                where, params = "WHERE status = ?", (status,)
+            result = export_query(f"FROM articles {where} ORDER BY article_number", params,
+                                  ARTICLE_EXPORT_COLUMNS, export_format, "artikel")
+            return result, None
+        except Exception as e:
+            return None, str(e)
+
+    # ---- 2.1.10 Artikel suchen (Volltext) ----
+    def search_articles(self, query, limit=SEARCH_LIMIT):
+        """Type-ahead-Suche; zu kurze Begriffe liefern keine Treffer"""
+        try:
+            if len((query or "").strip()) < SEARCH_MIN_LENGTH:
+                return [], None
+            return Article.search(query, limit=limit), None
+        except Exception as e:
+            return [], str(e)
+
+    # ---- 2.1.11 Änderungen aus dem Artikel-Grid übernehmen ----
+    def apply_article_changes(self, edited_rows=None, added_rows=None, deactivated_rows=None):
+        """Übernimmt Grid-Änderungen in einer Transaktion.
+
+        edited_rows: {article_id: {spalte: neuer_wert}} (nur geänderte Spalten,
+                     optional "row_version" = im Grid geladene Version)
+        added_rows: [{spalte: wert}]
+        deactivated_rows: {article_id: im Grid geladene row_version (oder None)}
+        Liefert (True, meldung) oder (False, [fehler je Zeile]); bei Fehlern
+        wird nichts gespeichert.
+        """
+        edited_rows = dict(edited_rows or {})
+        added_rows = list(added_rows or [])
+        deactivated_rows = dict(deactivated_rows or {})
+
+        try:
+            # Deaktivieren ist nur eine Status-Änderung – mit derselben Konfliktprüfung
+            for article_id, row_version in deactivated_rows.items():
+                changes = edited_rows.setdefault(article_id, {})
+                changes["status"] = "inaktiv"
+                if row_version is not None:
+                    changes.setdefault("row_version", row_version)
+
+            if not edited_rows and not added_rows:
+                return True, "Keine Änderungen"
+
+            current = Article.find_by_ids(edited_rows)
+            updates, inserts, errors = [], [], []
+
+            for article_id, changes in edited_rows.items():
+                article = current.get(article_id)
+                if not article:
+                    errors.append(f"Artikel {article_id}: Artikel nicht gefunden")
+                    continue
+                label = article.article_number
+                if "row_version" in changes:
+                    # Version, die im Grid angezeigt wurde (sonst gewinnt blind der letzte)
+                    article.row_version = changes["row_version"]
+                for column in ("article_number", "name", "description", "min_stock", "status"):
+                    if column in changes:
+                        setattr(article, column, changes[column])
+                row_errors = self._normalize_grid_article(article)
+                if row_errors:
+                    errors.extend(f"Artikel {label}: {error}" for error in row_errors)
+                else:
+                    updates.append((label, article))
+
+            for index, values in enumerate(added_rows, start=1):
+                label = f"Neue Zeile {index}"
+                article = Article(
+                    article_number=values.get("article_number"),
+                    name=values.get("name"),
+                    description=values.get("description"),
+                    min_stock=values.get("min_stock"),
+                    status=values.get("status") or "aktiv"
+                )
+                row_errors = self._normalize_grid_article(article)
+                if row_errors:
+                    errors.extend(f"{label}: {error}" for error in row_errors)
+                else:
+                    inserts.append((label, article))
+
+            if errors:
+                return False, errors
+
+            saved, db_errors = Article.apply_changes(updates, inserts)
+            if db_errors:
+                return False, [f"{label}: {error}" for label, messages in db_errors for error in messages]
+
+            deactivated = set(deactivated_rows)
+            for _, article in updates:
+                action = "Artikel deaktiviert" if article.article_id in deactivated else "Artikel geändert"
+                audit(action, article.article_number)
+            for _, article in inserts:
+                audit("Artikel angelegt", f"{article.article_number} ({article.name})")
+
+            return True, (f"{saved} Artikel gespeichert "
+                          f"({len(updates)} geändert, {len(inserts)} neu, {len(deactivated_rows)} deaktiviert)")
+
+        except Exception as e:
+            return False, [f"Unerwarteter Fehler: {str(e)}"]
+
+    # ---- 2.1.11.1 Grid-Werte bereinigen und validieren ----
+    @staticmethod
+    def _normalize_grid_article(article):
+        """Leere Zellen kommen aus dem Grid als None/NaN; danach normale Validierung"""
+        article.article_number = (article.article_number or "").strip()
+        article.name = (article.name or "").strip()
+        article.description = (article.description or "").strip()
+        try:
+            min_stock = float(article.min_stock if article.min_stock is not None else 0)
+        except (TypeError, ValueError):
+            return [f"Ungültiger Mindestbestand: {article.min_stock}"]
+        # NaN (geleerte Zelle), unendlich oder 2.5 nicht stillschweigend abschneiden
+        if not math.isfinite(min_stock) or not min_stock.is_integer():
+            return [f"Mindestbestand muss eine ganze Zahl sein: {article.min_stock}"]
+        article.min_stock = int(min_stock)
+        return article.validate()
+
+    # ---- 2.1.12 Änderungshistorie eines Artikels ----
+    def get_article_history(self, article_id):
+        """Liefert ([(changed_at, kind, änderungen)], fehler) – neueste zuerst"""
+        try:
+            return Article.history(article_id), None
+        except Exception as e:
+            return [], str(e)
+
+    # ---- 2.1.13 Artikelstand zu einem Zeitpunkt ----
+    def get_article_as_of(self, article_id, timestamp):
+        """Rekonstruierter Artikel zum Zeitpunkt (UTC); None wenn es ihn da nicht gab"""
+        try:
+            return Article.as_of(article_id, timestamp), None
+        except Exception as e:
+            return None, str(e)
+
+    # ---- 2.1.14 Bestellung anlegen ----
+    def create_purchase_order(self, order_data, line_rows):
+        """Legt Kopf und Positionen an.
+
+        line_rows: [{"article_number", "quantity", "unit_price"}] (z. B. aus dem Positions-Grid);
+        leere Zeilen werden ignoriert. Liefert (True, meldung) oder (False, [fehler]).
+        """
+        try:
+            errors, lines, numbers = [], [], []
+            for line_no, row in enumerate(line_rows, start=1):
+                article_number = str(row.get("article_number") or "").strip()
+                try:
+                    # Geleerte Grid-Zellen kommen als NaN an (wahr!) – daher explizit prüfen
+                    quantity = float(row["quantity"] if row.get("quantity") is not None else 0)
+                    unit_price = float(row["unit_price"] if row.get("unit_price") is not None else 0)
+                except (TypeError, ValueError):
+                    errors.append(f"Position {line_no}: Menge oder Preis ungültig")
+                    continue
+                if not article_number and not (math.isfinite(quantity) and quantity):
+                    continue
+                if not math.isfinite(quantity) or not quantity.is_integer():
+                    errors.append(f"Position {line_no}: Menge muss eine ganze Zahl sein")
+                    continue
+                if not math.isfinite(unit_price):
+                    errors.append(f"Position {line_no}: Preis fehlt oder ist ungültig")
+                    continue
+                quantity, unit_price = int(quantity), round(unit_price, 2)
+                numbers.append(article_number)
+                lines.append({"article_number": article_number, "quantity_ordered": quantity,
+                              "unit_price": unit_price})
+
+            # Alle Artikelnummern mit einer Abfrage auflösen
+            article_ids = PurchaseOrder.resolve_article_numbers(numbers)
+            for line_no, line in enumerate(lines, start=1):
+                line["article_id"] = article_ids.get(line["article_number"])
+                if line["article_number"] and line["article_id"] is None:
+                    errors.append(f"Position {line_no}: Artikel {line['article_number']} "
+                                  f"nicht gefunden oder inaktiv")
+
+            order = PurchaseOrder(
+                po_number=order_data.get("po_number"),
+                supplier=order_data.get("supplier"),
+                order_date=order_data.get("order_date"),
+                expected_date=order_data.get("expected_date"),
+                created_by=st.session_state.get("user_id"),
+                lines=lines
+            )
+            # "Artikel ist erforderlich" ist bei unbekannten Nummern schon oben gemeldet
+            unresolved = {f"Position {line_no}: Artikel ist erforderlich"
+                          for line_no, line in enumerate(lines, start=1) if line["article_number"]}
+            if errors:
+                # Verworfene Zeilen sind schon gemeldet
+                unresolved.add("Mindestens eine Position ist erforderlich")
+            errors.extend(error for error in order.validate() if error not in unresolved)
+            if errors:
+                return False, errors
+
+            order.save()
+            audit("Bestellung angelegt", f"{order.po_number} ({order.supplier}, {len(lines)} Positionen)")
+            return True, f"Bestellung {order.po_number} mit {len(lines)} Positionen angelegt"
+
+        except ValueError as e:
+            return False, [str(e)]
+        except Exception as e:
+            return False, [f"Unerwarteter Fehler: {str(e)}"]
+
+    # ---- 2.1.15 Bestellungen seitenweise ----
+    def get_purchase_orders_page(self, status=None, before=None, limit=PAGE_SIZE):
+        """Liefert (ResultSet, next_cursor, fehler)"""
+        try:
+            orders, next_cursor = PurchaseOrder.query(status=status, before=before, limit=limit)
+            return orders, next_cursor, None
+        except Exception as e:
+            return None, None, str(e)
+
+    # ---- 2.1.16 Einzelne Bestellung mit Positionen ----
+    def get_purchase_order(self, po_id):
+        try:
+            order = PurchaseOrder.find_by_id(po_id)
+            if order is None:
+                return None, "Bestellung nicht gefunden"
+            return order, None
+        except Exception as e:
+            return None, str(e)
+
+    # ---- 2.1.17 Bestellung stornieren ----
+    def cancel_purchase_order(self, po_id, po_number):
+        try:
+            PurchaseOrder.cancel(po_id)
+            audit("Bestellung storniert", po_number)
+            return True, f"Bestellung {po_number} storniert"
+        except ValueError as e:
+            return False, [str(e)]
+        except Exception as e:
+            return False, [f"Unerwarteter Fehler: {str(e)}"]
+
+    # ---- 2.1.18 Nächste Bestellnummer ----
+    def suggest_po_number(self):
+        try:
+            return PurchaseOrder.next_po_number()
+        except Exception:
+            return ""
+
+    # ---- 2.1.19 Artikel unter Mindestbestand ----
+    def get_stock_alerts_page(self, before=None, limit=PAGE_SIZE):
+        """Liefert (ResultSet, next_cursor, anzahl, fehler) – inkl. bereits bestellter Menge"""
+        try:
+            StockAlert.reconcile_if_due()
+            alerts, next_cursor = StockAlert.query(before=before, limit=limit)
+            return alerts, next_cursor, StockAlert.count(), None
+        except Exception as e:
+            return None, None, 0, str(e)
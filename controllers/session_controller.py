@@ -1,4 +1,6 @@
 import streamlit as st
+from models.user_model import User
+from utils.session_epochs import epoch_registry
 
 # ----- 2.4 SESSION-CONTROLLER -----
 class SessionController:
@@ -10,4 +12,28 @@ class SessionController:
         
         import time
         elapsed = time.time() - st.session_state.login_time
-        return elapsed > 1800  # 30 Minuten
\ No newline at end of file
+        return elapsed > 1800  # 30 Minuten
+
+    # ---- 2.4.2 Rollenänderungen erkennen ----
+    def check_role_change(self):
+        """Vergleicht die Rollen-Epoche der Session mit der Registry (O(1)).
+
+        Nur bei Abweichung wird die Rolle neu geladen. Liefert (geändert, neue_rolle);
+        neue_rolle ist None, wenn der User nicht mehr existiert.
+        """
+        user_id = st.session_state.get("user_id")
+        if user_id is None:
+            return False, st.session_state.get("role")
+
+        current_epoch = epoch_registry.get_epoch(user_id)
+        if current_epoch == st.session_state.get("role_epoch", 0):
+            return False, st.session_state.get("role")
+
+        user = User.find_by_id(user_id)
+        st.session_state.role_epoch = current_epoch
+        if not user:
+            return True, None
+
+        changed = user.role_name != st.session_state.get("role")
+        st.session_state.role = user.role_name
+        return changed, user.role_name
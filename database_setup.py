@@ -1,81 +1,720 @@
 import sqlite3
-from config import DB_NAME
-
-def init_db():
-    try:
-        conn = sqlite3.connect(DB_NAME)
-        c = conn.cursor()
-    
-        # Rollen-Tabelle - Hier die Änderung mit DROP TABLE
-        c.execute('DROP TABLE IF EXISTS roles')
-        c.execute('''
-            CREATE TABLE IF NOT EXISTS roles (
-                role_id INTEGER PRIMARY KEY,
-                role_name TEXT UNIQUE NOT NULL
-            )
-        ''')
+import threading
+from utils.database import get_database_name, connection, transaction
+from utils.search import fold_sql
+from utils.bin_codes import parse_bin_code
+from models.stock_alert_model import SETTING_STOCK_ALERTS_RECONCILED
+from constants import ARTICLE_HISTORY_SNAPSHOT_EVERY
 
-        # Standard-Rollen einfügen - Hier INSERT OR REPLACE statt INSERT OR IGNORE
-        roles = [
-            (1, "Administrator"),
-            (2, "Einkäufer"),
-            (3, "Logistiker"),
-            (4, "Vertriebler"),
-            (5, "Wartend")
-        ]
-        c.executemany("INSERT OR REPLACE INTO roles (role_id, role_name) VALUES (?, ?)", roles)
-
-        # Benutzer-Tabelle
-        c.execute('''
-            CREATE TABLE IF NOT EXISTS users (
-                user_id INTEGER PRIMARY KEY,
-                username TEXT UNIQUE NOT NULL,
-                hashed_password TEXT NOT NULL,
-                role_id INTEGER,
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                last_login TIMESTAMP,
-                FOREIGN KEY (role_id) REFERENCES roles(role_id)
-            )
-        ''')
+# ----- 0.2 SCHEMA-MIGRATIONEN -----
+# Jede Migration ist ein (Version, Name, Funktion)-Eintrag und läuft genau
+# einmal pro Datenbank. Die angewandte Version steht in schema_version.
+# init_db() prüft pro Prozess nur einmal; spätere Reruns kosten nichts.
+
+_init_lock = threading.Lock()
+_initialized = set()
+
+# ---- 0.2.1 Standard-Rollen ----
+DEFAULT_ROLES = [
+    (1, "Administrator"),
+    (2, "Einkäufer"),
+    (3, "Logistiker"),
+    (4, "Vertriebler"),
+    (5, "Wartend")
+]
+
+
+# ---- 0.2.2 Aktuelle Schema-Version ----
+def get_schema_version(conn):
+    """Höchste angewandte Migration (0 = leere Datenbank)"""
+    row = conn.execute("SELECT MAX(version) FROM schema_version").fetchone()
+    return row[0] or 0
 
-        # Admin-Logs-Tabelle
-        c.execute('''
-            CREATE TABLE IF NOT EXISTS admin_logs (
-                log_id INTEGER PRIMARY KEY,
-                admin_id INTEGER,
-                action TEXT NOT NULL,
-                target TEXT NOT NULL,
-                timestamp TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                FOREIGN KEY (admin_id) REFERENCES users(user_id)
-            )
-        ''')
 
-        # Artikelstamm - Vereinfachte Version
-        c.execute('''
-            CREATE TABLE IF NOT EXISTS articles (
-                article_id INTEGER PRIMARY KEY,
-                article_number TEXT UNIQUE NOT NULL,
+# ---- 0.2.3 Ausstehende Migrationen ausführen ----
+def run_migrations(db_name=None):
+    """Wendet alle ausstehenden Migrationen je in eigener Transaktion an"""
+    with connection(db_name) as conn:
+        conn.execute('''
+            CREATE TABLE IF NOT EXISTS schema_version (
+                version INTEGER PRIMARY KEY,
                 name TEXT NOT NULL,
-                description TEXT,
-                min_stock INTEGER DEFAULT 0,
-                status TEXT DEFAULT 'aktiv'
+                applied_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
             )
         ''')
 
-        # Ein Beispielartikel
-        example_article = [
-            ('ART001', 'ThinkPad X1 Carbon', 'Business Laptop der Oberklasse', 5, 'aktiv')
-        ]
-        
-        c.executemany("""
-            INSERT OR IGNORE INTO articles 
-            (article_number, name, description, min_stock, status)
-            VALUES (?, ?, ?, ?, ?)
-        """, example_article)       
-
-        conn.commit()
-    except sqlite3.Error as e:
-        print(f"Database error: {e}")
-        raise e
-    finally:
-        conn.close()
\ No newline at end of file
+        applied = []
+        for version, name, migrate in MIGRATIONS:
+            if version <= get_schema_version(conn):
+                continue
+
+            with transaction(db_name) as tx:
+                # Erneut prüfen: ein anderer Prozess könnte schneller gewesen sein
+                if version <= get_schema_version(tx):
+                    continue
+                migrate(tx)
+                tx.execute(
+                    "INSERT INTO schema_version (version, name) VALUES (?, ?)",
+                    (version, name)
+                )
+            applied.append(version)
+
+        return applied
+
+
+# ---- 0.2.4 Einstiegspunkt (einmal pro Prozess) ----
+def init_db(db_name=None):
+    db_name = db_name or get_database_name()
+    if db_name in _initialized:
+        return
+
+    with _init_lock:
+        if db_name in _initialized:
+            return
+        try:
+            run_migrations(db_name)
+        except sqlite3.Error as e:
+            print(f"Database error: {e}")
+            raise e
+        _initialized.add(db_name)
+
+
+# ---- Migration 1: Basisschema ----
+def _migration_base_schema(conn):
+    # Rollen-Tabelle
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS roles (
+            role_id INTEGER PRIMARY KEY,
+            role_name TEXT UNIQUE NOT NULL
+        )
+    ''')
+
+    # Benutzer-Tabelle
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS users (
+            user_id INTEGER PRIMARY KEY,
+            username TEXT UNIQUE NOT NULL,
+            hashed_password TEXT NOT NULL,
+            role_id INTEGER,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            last_login TIMESTAMP,
+            FOREIGN KEY (role_id) REFERENCES roles(role_id)
+        )
+    ''')
+
+    # Admin-Logs-Tabelle
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS admin_logs (
+            log_id INTEGER PRIMARY KEY,
+            admin_id INTEGER,
+            action TEXT NOT NULL,
+            target TEXT NOT NULL,
+            timestamp TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            FOREIGN KEY (admin_id) REFERENCES users(user_id)
+        )
+    ''')
+
+    # Artikelstamm - Vereinfachte Version
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS articles (
+            article_id INTEGER PRIMARY KEY,
+            article_number TEXT UNIQUE NOT NULL,
+            name TEXT NOT NULL,
+            description TEXT,
+            min_stock INTEGER DEFAULT 0,
+            status TEXT DEFAULT 'aktiv'
+        )
+    ''')
+
+    # Ein Beispielartikel
+    conn.execute("""
+        INSERT OR IGNORE INTO articles
+        (article_number, name, description, min_stock, status)
+        VALUES (?, ?, ?, ?, ?)
+    """, ('ART001', 'ThinkPad X1 Carbon', 'Business Laptop der Oberklasse', 5, 'aktiv'))
+
+
+# ---- Migration 2: Rollen per Upsert (statt DROP TABLE) ----
+def _migration_seed_roles(conn):
+    conn.executemany("""
+        INSERT INTO roles (role_id, role_name) VALUES (?, ?)
+        ON CONFLICT(role_id) DO UPDATE SET role_name = excluded.role_name
+    """, DEFAULT_ROLES)
+
+
+# ---- Migration 3: Indizes für Filter und Keyset-Paging ----
+def _migration_query_indexes(conn):
+    # Status-Filter + Sortierung nach Artikelnummer aus einem Index
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_articles_status ON articles(status, article_number)")
+    # Rollen-Filter + Sortierung nach Benutzername aus einem Index
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_users_role ON users(role_id, username)")
+    # users(username) ist bereits durch UNIQUE indiziert
+
+
+# ---- Migration 4: Laufzeit-Einstellungen ----
+def _migration_app_settings(conn):
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS app_settings (
+            key TEXT PRIMARY KEY,
+            value TEXT NOT NULL,
+            updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    ''')
+
+
+# ---- Migration 5: Login-Throttle (SQLite-Backend) ----
+def _migration_login_throttle(conn):
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS login_throttle (
+            bucket_key TEXT PRIMARY KEY,
+            tokens REAL NOT NULL,
+            updated_at REAL NOT NULL
+        )
+    ''')
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_login_throttle_updated ON login_throttle(updated_at)")
+
+
+# ---- Migration 6: Rollen-Epochen für laufende Sessions ----
+def _migration_user_epochs(conn):
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS user_epochs (
+            user_id INTEGER PRIMARY KEY,
+            epoch INTEGER NOT NULL,
+            seq INTEGER NOT NULL,
+            FOREIGN KEY (user_id) REFERENCES users(user_id) ON DELETE CASCADE
+        )
+    ''')
+    # Abgleich anderer Prozesse liest nur Zeilen mit seq > letztem Stand
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_user_epochs_seq ON user_epochs(seq)")
+
+
+# ---- Migration 7: Volltextsuche über Artikel ----
+def _migration_article_search(conn):
+    # Contentless: der Index speichert nur gefaltete Tokens, die Daten
+    # selbst kommen per rowid = article_id aus articles.
+    conn.execute('''
+        CREATE VIRTUAL TABLE IF NOT EXISTS articles_fts USING fts5(
+            article_number, name, description,
+            content = '',
+            prefix = '2 3',
+            tokenize = 'unicode61 remove_diacritics 2'
+        )
+    ''')
+
+    def folded(prefix):
+        return ", ".join(fold_sql(f"{prefix}.{column}")
+                         for column in ("article_number", "name", "description"))
+
+    conn.execute(f'''
+        CREATE TRIGGER IF NOT EXISTS articles_fts_insert AFTER INSERT ON articles BEGIN
+            INSERT INTO articles_fts (rowid, article_number, name, description)
+            VALUES (new.article_id, {folded("new")});
+        END
+    ''')
+    conn.execute(f'''
+        CREATE TRIGGER IF NOT EXISTS articles_fts_delete AFTER DELETE ON articles BEGIN
+            INSERT INTO articles_fts (articles_fts, rowid, article_number, name, description)
+            VALUES ('delete', old.article_id, {folded("old")});
+        END
+    ''')
+    conn.execute(f'''
+        CREATE TRIGGER IF NOT EXISTS articles_fts_update
+        AFTER UPDATE OF article_number, name, description ON articles BEGIN
+            INSERT INTO articles_fts (articles_fts, rowid, article_number, name, description)
+            VALUES ('delete', old.article_id, {folded("old")});
+            INSERT INTO articles_fts (rowid, article_number, name, description)
+            VALUES (new.article_id, {folded("new")});
+        END
+    ''')
+
+    # Bestehende Artikel nachindexieren
+    conn.execute(f'''
+        INSERT INTO articles_fts (rowid, article_number, name, description)
+        SELECT article_id, {folded("articles")} FROM articles
+    ''')
+
+
+# ---- Migration 8: Versionsspalten für optimistische Sperren ----
+def _migration_row_versions(conn):
+    # Jede Änderung erhöht row_version; Updates prüfen die geladene Version
+    for table in ("articles", "users"):
+        columns = [row[1] for row in conn.execute(f"PRAGMA table_info({table})")]
+        if "row_version" not in columns:
+            conn.execute(f"ALTER TABLE {table} ADD COLUMN row_version INTEGER NOT NULL DEFAULT 1")
+
+
+# ---- Migration 9: Änderungshistorie der Artikel ----
+def _migration_article_history(conn):
+    # Append-only: 'snapshot' = alle Felder, 'delta' = nur geänderte Felder,
+    # 'delete' = Artikel entfernt. Spätestens jede ARTICLE_HISTORY_SNAPSHOT_EVERY-te
+    # Zeile je Artikel ist ein Snapshot, damit Article.as_of begrenzt viele Zeilen liest.
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS article_history (
+            history_id INTEGER PRIMARY KEY,
+            article_id INTEGER NOT NULL,
+            changed_at TEXT NOT NULL DEFAULT (strftime('%Y-%m-%d %H:%M:%f', 'now')),
+            kind TEXT NOT NULL CHECK (kind IN ('snapshot', 'delta', 'delete')),
+            data TEXT
+        )
+    ''')
+    conn.execute('''
+        CREATE INDEX IF NOT EXISTS idx_article_history_article
+        ON article_history(article_id, changed_at, history_id)
+    ''')
+
+    columns = ("article_number", "name", "description", "min_stock", "status", "row_version")
+
+    def snapshot(prefix):
+        return "json_object(" + ", ".join(f"'{column}', {prefix}.{column}" for column in columns) + ")"
+
+    # Unveränderte Felder per json_remove entfernen (nicht vorhandener Pfad = no-op)
+    delta = "json_remove(" + snapshot("new") + "".join(
+        f", CASE WHEN old.{column} IS new.{column} THEN '$.{column}' ELSE '$.-' END"
+        for column in columns if column != "row_version"
+    ) + ")"
+    changed = " OR ".join(f"old.{column} IS NOT new.{column}" for column in columns if column != "row_version")
+    deltas_since_snapshot = f'''
+        (SELECT COUNT(*) FROM article_history h
+         WHERE h.article_id = new.article_id
+           AND h.history_id > COALESCE((SELECT MAX(history_id) FROM article_history
+                                        WHERE article_id = new.article_id AND kind = 'snapshot'), 0))
+    '''
+
+    conn.execute(f'''
+        CREATE TRIGGER IF NOT EXISTS article_history_insert AFTER INSERT ON articles BEGIN
+            INSERT INTO article_history (article_id, kind, data)
+            VALUES (new.article_id, 'snapshot', {snapshot("new")});
+        END
+    ''')
+    conn.execute(f'''
+        CREATE TRIGGER IF NOT EXISTS article_history_update AFTER UPDATE ON articles
+        WHEN {changed}
+        BEGIN
+            INSERT INTO article_history (article_id, kind, data)
+            SELECT new.article_id,
+                   CASE WHEN pending >= {ARTICLE_HISTORY_SNAPSHOT_EVERY - 1} THEN 'snapshot' ELSE 'delta' END,
+                   CASE WHEN pending >= {ARTICLE_HISTORY_SNAPSHOT_EVERY - 1} THEN {snapshot("new")} ELSE {delta} END
+            FROM (SELECT {deltas_since_snapshot} AS pending);
+        END
+    ''')
+    conn.execute('''
+        CREATE TRIGGER IF NOT EXISTS article_history_delete AFTER DELETE ON articles BEGIN
+            INSERT INTO article_history (article_id, kind) VALUES (old.article_id, 'delete');
+        END
+    ''')
+
+    # Ausgangsstand aller vorhandenen Artikel
+    conn.execute(f'''
+        INSERT INTO article_history (article_id, kind, data)
+        SELECT article_id, 'snapshot', {snapshot("articles")} FROM articles
+    ''')
+
+
+# ---- Migration 10: Index-Suche über Benutzernamen ----
+def _migration_user_search(conn):
+    # Trigram-Index für Teilstring-Suche ab 3 Zeichen (Groß/Klein egal)
+    conn.execute('''
+        CREATE VIRTUAL TABLE IF NOT EXISTS users_fts USING fts5(
+            username,
+            content = 'users',
+            content_rowid = 'user_id',
+            tokenize = 'trigram'
+        )
+    ''')
+    conn.execute('''
+        CREATE TRIGGER IF NOT EXISTS users_fts_insert AFTER INSERT ON users BEGIN
+            INSERT INTO users_fts (rowid, username) VALUES (new.user_id, new.username);
+        END
+    ''')
+    conn.execute('''
+        CREATE TRIGGER IF NOT EXISTS users_fts_delete AFTER DELETE ON users BEGIN
+            INSERT INTO users_fts (users_fts, rowid, username) VALUES ('delete', old.user_id, old.username);
+        END
+    ''')
+    conn.execute('''
+        CREATE TRIGGER IF NOT EXISTS users_fts_update AFTER UPDATE OF username ON users BEGIN
+            INSERT INTO users_fts (users_fts, rowid, username) VALUES ('delete', old.user_id, old.username);
+            INSERT INTO users_fts (rowid, username) VALUES (new.user_id, new.username);
+        END
+    ''')
+    conn.execute("INSERT INTO users_fts (users_fts) VALUES ('rebuild')")
+
+    # Kürzere Suchbegriffe: Präfix-Bereich über diesen Index
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_users_username_nocase ON users(username COLLATE NOCASE)")
+
+
+# ---- Migration 11: User-Zähler je Rolle ----
+def _migration_role_counts(conn):
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS role_counts (
+            role_id INTEGER PRIMARY KEY,
+            user_count INTEGER NOT NULL DEFAULT 0,
+            FOREIGN KEY (role_id) REFERENCES roles(role_id)
+        )
+    ''')
+
+    # Upsert statt UPDATE: funktioniert auch für später angelegte Rollen
+    def add(role, delta):
+        return f'''
+            INSERT INTO role_counts (role_id, user_count) VALUES ({role}, {delta})
+            ON CONFLICT(role_id) DO UPDATE SET user_count = user_count + ({delta});
+        '''
+
+    conn.execute(f'''
+        CREATE TRIGGER IF NOT EXISTS role_counts_insert AFTER INSERT ON users BEGIN
+            {add("new.role_id", 1)}
+        END
+    ''')
+    conn.execute(f'''
+        CREATE TRIGGER IF NOT EXISTS role_counts_delete AFTER DELETE ON users BEGIN
+            {add("old.role_id", -1)}
+        END
+    ''')
+    conn.execute(f'''
+        CREATE TRIGGER IF NOT EXISTS role_counts_update AFTER UPDATE OF role_id ON users
+        WHEN old.role_id IS NOT new.role_id
+        BEGIN
+            {add("old.role_id", -1)}
+            {add("new.role_id", 1)}
+        END
+    ''')
+
+    conn.execute('''
+        INSERT OR REPLACE INTO role_counts (role_id, user_count)
+        SELECT r.role_id, COUNT(u.user_id)
+        FROM roles r
+        LEFT JOIN users u ON u.role_id = r.role_id
+        GROUP BY r.role_id
+    ''')
+
+
+# ---- Migration 12: Indizes für den Audit-Log-Viewer ----
+def _migration_admin_log_indexes(conn):
+    # Filter nach Admin bzw. Aktion, jeweils neueste zuerst per log_id
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_admin_logs_admin ON admin_logs(admin_id, log_id)")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_admin_logs_action ON admin_logs(action, log_id)")
+
+
+# ---- Migration 13: Lagerbewegungen (Journal) und Bestände ----
+def _migration_stock_ledger(conn):
+    # Append-only: Zugänge positiv, Abgänge negativ; eine Umlagerung = zwei Zeilen
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS stock_movements (
+            movement_id INTEGER PRIMARY KEY,
+            article_id INTEGER NOT NULL,
+            bin_code TEXT NOT NULL,
+            quantity INTEGER NOT NULL CHECK (quantity <> 0),
+            movement_type TEXT NOT NULL,
+            reference TEXT,
+            user_id INTEGER,
+            created_at TEXT NOT NULL DEFAULT (strftime('%Y-%m-%d %H:%M:%f', 'now')),
+            FOREIGN KEY (article_id) REFERENCES articles(article_id),
+            FOREIGN KEY (user_id) REFERENCES users(user_id)
+        )
+    ''')
+    conn.execute('''
+        CREATE INDEX IF NOT EXISTS idx_stock_movements_article
+        ON stock_movements(article_id, bin_code, created_at)
+    ''')
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_stock_movements_created ON stock_movements(created_at)")
+
+    # Laufender Bestand je Artikel und Lagerplatz, in derselben Transaktion gepflegt
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS stock_balances (
+            article_id INTEGER NOT NULL,
+            bin_code TEXT NOT NULL,
+            quantity INTEGER NOT NULL CHECK (quantity >= 0),
+            last_movement_id INTEGER NOT NULL,
+            updated_at TEXT NOT NULL,
+            PRIMARY KEY (article_id, bin_code),
+            FOREIGN KEY (article_id) REFERENCES articles(article_id)
+        ) WITHOUT ROWID
+    ''')
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_stock_balances_bin ON stock_balances(bin_code, article_id)")
+
+
+# ---- Migration 14: Bestellungen und Bestellpositionen ----
+def _migration_purchase_orders(conn):
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS purchase_orders (
+            po_id INTEGER PRIMARY KEY,
+            po_number TEXT UNIQUE NOT NULL,
+            supplier TEXT NOT NULL,
+            status TEXT NOT NULL DEFAULT 'Offen'
+                CHECK (status IN ('Offen', 'Teilgeliefert', 'Geliefert', 'Storniert')),
+            order_date TEXT NOT NULL DEFAULT (date('now')),
+            expected_date TEXT,
+            created_by INTEGER,
+            created_at TEXT NOT NULL DEFAULT CURRENT_TIMESTAMP,
+            FOREIGN KEY (created_by) REFERENCES users(user_id)
+        )
+    ''')
+    # Übersicht/Paging nach Status (neueste zuerst)
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_purchase_orders_status ON purchase_orders(status, po_id)")
+
+    # Geliefert kann nie über Bestellt hinauslaufen – auch nicht bei parallelen Eingängen
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS purchase_order_lines (
+            line_id INTEGER PRIMARY KEY,
+            po_id INTEGER NOT NULL,
+            line_no INTEGER NOT NULL,
+            article_id INTEGER NOT NULL,
+            quantity_ordered INTEGER NOT NULL CHECK (quantity_ordered > 0),
+            quantity_received INTEGER NOT NULL DEFAULT 0
+                CHECK (quantity_received BETWEEN 0 AND quantity_ordered),
+            unit_price REAL NOT NULL DEFAULT 0 CHECK (unit_price >= 0),
+            UNIQUE (po_id, line_no),
+            FOREIGN KEY (po_id) REFERENCES purchase_orders(po_id) ON DELETE CASCADE,
+            FOREIGN KEY (article_id) REFERENCES articles(article_id)
+        )
+    ''')
+    # Partielle Indizes enthalten nur offene Positionen und bleiben klein,
+    # egal wie viele Bestellungen bereits abgeschlossen sind
+    conn.execute('''
+        CREATE INDEX IF NOT EXISTS idx_po_lines_open
+        ON purchase_order_lines(po_id, line_no)
+        WHERE quantity_received < quantity_ordered
+    ''')
+    conn.execute('''
+        CREATE INDEX IF NOT EXISTS idx_po_lines_article_open
+        ON purchase_order_lines(article_id)
+        WHERE quantity_received < quantity_ordered
+    ''')
+
+
+# ---- Migration 15: Lagerplatz-Stamm mit Belegung ----
+def _migration_storage_bins(conn):
+    # capacity NULL = unbegrenzt (z. B. Wareneingangszone); solche Plätze
+    # haben keine free_capacity und werden nie als Einlagerungsziel vorgeschlagen
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS storage_bins (
+            bin_code TEXT PRIMARY KEY,
+            zone TEXT NOT NULL,
+            aisle INTEGER,
+            shelf INTEGER,
+            level INTEGER,
+            capacity INTEGER CHECK (capacity IS NULL OR capacity >= 0),
+            occupied INTEGER NOT NULL DEFAULT 0,
+            free_capacity INTEGER GENERATED ALWAYS AS (capacity - occupied) VIRTUAL,
+            active INTEGER NOT NULL DEFAULT 1,
+            CONSTRAINT bin_capacity CHECK (capacity IS NULL OR occupied <= capacity)
+        ) WITHOUT ROWID
+    ''')
+    conn.execute('''
+        CREATE INDEX IF NOT EXISTS idx_storage_bins_location
+        ON storage_bins(zone, aisle, shelf, level)
+    ''')
+    # Einlagerungsvorschläge: Bereichssuche "Zone X mit mindestens n frei", kleinste Lücke zuerst
+    conn.execute('''
+        CREATE INDEX IF NOT EXISTS idx_storage_bins_free
+        ON storage_bins(zone, free_capacity)
+        WHERE active = 1 AND free_capacity > 0
+    ''')
+
+    # Belegung aus stock_balances fortschreiben (Lagerplätze ohne Stammsatz bleiben unberührt)
+    def add(bin_code, delta):
+        return f'''
+            UPDATE storage_bins SET occupied = occupied + ({delta}) WHERE bin_code = {bin_code};
+        '''
+
+    conn.execute(f'''
+        CREATE TRIGGER IF NOT EXISTS storage_bins_occupancy_insert AFTER INSERT ON stock_balances BEGIN
+            {add("new.bin_code", "new.quantity")}
+        END
+    ''')
+    conn.execute(f'''
+        CREATE TRIGGER IF NOT EXISTS storage_bins_occupancy_delete AFTER DELETE ON stock_balances BEGIN
+            {add("old.bin_code", "-old.quantity")}
+        END
+    ''')
+    conn.execute(f'''
+        CREATE TRIGGER IF NOT EXISTS storage_bins_occupancy_update AFTER UPDATE OF quantity, bin_code
+        ON stock_balances
+        BEGIN
+            {add("old.bin_code", "-old.quantity")}
+            {add("new.bin_code", "new.quantity")}
+        END
+    ''')
+
+    # Bereits bebuchte Lagerplätze übernehmen (Kapazität unbekannt)
+    bin_codes = [row[0] for row in conn.execute("SELECT DISTINCT bin_code FROM stock_balances")]
+    conn.executemany('''
+        INSERT OR IGNORE INTO storage_bins (bin_code, zone, aisle, shelf, level)
+        VALUES (?, ?, ?, ?, ?)
+    ''', [(code, *parse_bin_code(code)) for code in bin_codes])
+    conn.execute('''
+        UPDATE storage_bins
+        SET occupied = COALESCE((SELECT SUM(quantity) FROM stock_balances b
+                                 WHERE b.bin_code = storage_bins.bin_code), 0)
+    ''')
+
+
+# ---- Migration 16: Mindestbestands-Warnungen ----
+def _migration_stock_alerts(conn):
+    # Enthält nur Artikel, die gerade unter Mindestbestand liegen; since =
+    # Zeitpunkt der Unterschreitung (bleibt bei weiteren Abgängen erhalten)
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS stock_alerts (
+            article_id INTEGER PRIMARY KEY,
+            on_hand INTEGER NOT NULL,
+            min_stock INTEGER NOT NULL,
+            since TEXT NOT NULL,
+            FOREIGN KEY (article_id) REFERENCES articles(article_id) ON DELETE CASCADE
+        )
+    ''')
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_stock_alerts_since ON stock_alerts(since, article_id)")
+
+    # Zustand eines Artikels neu bewerten: Bestand = Summe über seine Lagerplätze
+    # (Präfix des Primärschlüssels von stock_balances, also nur wenige Zeilen)
+    def evaluate(article_id):
+        on_hand = f"(SELECT COALESCE(SUM(quantity), 0) FROM stock_balances WHERE article_id = {article_id})"
+        below = f"a.status = 'aktiv' AND a.min_stock > 0 AND {on_hand} < a.min_stock"
+        return f'''
+            INSERT INTO stock_alerts (article_id, on_hand, min_stock, since)
+            SELECT a.article_id, {on_hand}, a.min_stock, strftime('%Y-%m-%d %H:%M:%S', 'now')
+            FROM articles a
+            WHERE a.article_id = {article_id} AND {below}
+            ON CONFLICT(article_id) DO UPDATE SET
+                on_hand = excluded.on_hand, min_stock = excluded.min_stock;
+            DELETE FROM stock_alerts
+            WHERE article_id = {article_id}
+              AND NOT EXISTS (SELECT 1 FROM articles a WHERE a.article_id = {article_id} AND {below});
+        '''
+
+    conn.execute(f'''
+        CREATE TRIGGER IF NOT EXISTS stock_alerts_balance_insert AFTER INSERT ON stock_balances BEGIN
+            {evaluate("new.article_id")}
+        END
+    ''')
+    conn.execute(f'''
+        CREATE TRIGGER IF NOT EXISTS stock_alerts_balance_update AFTER UPDATE OF quantity ON stock_balances
+        WHEN old.quantity IS NOT new.quantity
+        BEGIN
+            {evaluate("new.article_id")}
+        END
+    ''')
+    conn.execute(f'''
+        CREATE TRIGGER IF NOT EXISTS stock_alerts_balance_delete AFTER DELETE ON stock_balances BEGIN
+            {evaluate("old.article_id")}
+        END
+    ''')
+    conn.execute(f'''
+        CREATE TRIGGER IF NOT EXISTS stock_alerts_article_insert AFTER INSERT ON articles
+        WHEN new.min_stock > 0
+        BEGIN
+            {evaluate("new.article_id")}
+        END
+    ''')
+    conn.execute(f'''
+        CREATE TRIGGER IF NOT EXISTS stock_alerts_article_update AFTER UPDATE OF min_stock, status ON articles
+        WHEN old.min_stock IS NOT new.min_stock OR old.status IS NOT new.status
+        BEGIN
+            {evaluate("new.article_id")}
+        END
+    ''')
+
+    conn.execute('''
+        INSERT OR REPLACE INTO stock_alerts (article_id, on_hand, min_stock, since)
+        SELECT a.article_id, COALESCE(SUM(b.quantity), 0) AS on_hand, a.min_stock,
+               strftime('%Y-%m-%d %H:%M:%S', 'now')
+        FROM articles a
+        LEFT JOIN stock_balances b ON b.article_id = a.article_id
+        WHERE a.status = 'aktiv' AND a.min_stock > 0
+        GROUP BY a.article_id
+        HAVING on_hand < a.min_stock
+    ''')
+    # Der Backfill ist ein vollständiger Abgleich – als letzten Lauf vermerken
+    conn.execute('''
+        INSERT OR REPLACE INTO app_settings (key, value, updated_at)
+        VALUES (?, CAST((julianday('now') - 2440587.5) * 86400.0 AS TEXT), CURRENT_TIMESTAMP)
+    ''', (SETTING_STOCK_ALERTS_RECONCILED,))
+
+
+# ---- Migration 17: Monatsverbrauch und ABC/XYZ-Klassifizierung ----
+def _migration_article_classification(conn):
+    # Verbrauch (Warenausgänge) je Artikel und Monat, beim Buchen fortgeschrieben;
+    # month = Jahr * 12 + Monat - 1. Die Analyse liest nur diese Verdichtung.
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS stock_consumption (
+            article_id INTEGER NOT NULL,
+            month INTEGER NOT NULL,
+            quantity INTEGER NOT NULL,
+            PRIMARY KEY (article_id, month),
+            FOREIGN KEY (article_id) REFERENCES articles(article_id)
+        ) WITHOUT ROWID
+    ''')
+    month = "CAST(substr({0}, 1, 4) AS INTEGER) * 12 + CAST(substr({0}, 6, 2) AS INTEGER) - 1"
+    conn.execute(f'''
+        CREATE TRIGGER IF NOT EXISTS stock_consumption_insert AFTER INSERT ON stock_movements
+        WHEN new.movement_type = 'Ausgang'
+        BEGIN
+            INSERT INTO stock_consumption (article_id, month, quantity)
+            VALUES (new.article_id, {month.format("new.created_at")}, -new.quantity)
+            ON CONFLICT(article_id, month) DO UPDATE SET quantity = quantity + excluded.quantity;
+        END
+    ''')
+    conn.execute(f'''
+        INSERT OR REPLACE INTO stock_consumption (article_id, month, quantity)
+        SELECT article_id, {month.format("created_at")}, -SUM(quantity)
+        FROM stock_movements
+        WHERE movement_type = 'Ausgang'
+        GROUP BY 1, 2
+    ''')
+
+    # Ergebnis des letzten Analyse-Laufs; wird je Lauf komplett ersetzt
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS article_classification (
+            article_id INTEGER PRIMARY KEY,
+            abc_class TEXT NOT NULL CHECK (abc_class IN ('A', 'B', 'C')),
+            xyz_class TEXT NOT NULL CHECK (xyz_class IN ('X', 'Y', 'Z')),
+            consumption INTEGER NOT NULL,
+            consumption_value REAL NOT NULL,
+            value_share REAL NOT NULL,
+            demand_cv REAL,
+            computed_at TEXT NOT NULL,
+            FOREIGN KEY (article_id) REFERENCES articles(article_id) ON DELETE CASCADE
+        )
+    ''')
+    # Filter nach Matrixfeld (z. B. "AX"), innerhalb nach Wert absteigend
+    conn.execute('''
+        CREATE INDEX IF NOT EXISTS idx_article_classification_class
+        ON article_classification(abc_class, xyz_class, consumption_value DESC)
+    ''')
+
+
+# ---- Migration 18: Indizes für den Snapshot-Abstand der Artikelhistorie ----
+def _migration_article_history_snapshot_indexes(conn):
+    # Der Update-Trigger (Migration 9) sucht den letzten Snapshot und zählt die
+    # Deltas danach – beides sind damit Bereichszugriffe statt Läufe über die
+    # gesamte Historie des Artikels.
+    conn.execute('''
+        CREATE INDEX IF NOT EXISTS idx_article_history_snapshots
+        ON article_history(article_id, history_id) WHERE kind = 'snapshot'
+    ''')
+    conn.execute('''
+        CREATE INDEX IF NOT EXISTS idx_article_history_article_id
+        ON article_history(article_id, history_id)
+    ''')
+
+
+# ---- Migrations-Liste (nur anhängen, nie umsortieren!) ----
+MIGRATIONS = [
+    (1, "Basisschema", _migration_base_schema),
+    (2, "Standard-Rollen (Upsert)", _migration_seed_roles),
+    (3, "Indizes für Filter/Paging", _migration_query_indexes),
+    (4, "Laufzeit-Einstellungen", _migration_app_settings),
+    (5, "Login-Throttle", _migration_login_throttle),
+    (6, "Rollen-Epochen", _migration_user_epochs),
+    (7, "Artikel-Volltextsuche", _migration_article_search),
+    (8, "Versionsspalten (optimistische Sperren)", _migration_row_versions),
+    (9, "Artikel-Änderungshistorie", _migration_article_history),
+    (10, "Benutzernamen-Suche", _migration_user_search),
+    (11, "User-Zähler je Rolle", _migration_role_counts),
+    (12, "Audit-Log-Indizes", _migration_admin_log_indexes),
+    (13, "Lagerbewegungen und Bestände", _migration_stock_ledger),
+    (14, "Bestellungen", _migration_purchase_orders),
+    (15, "Lagerplätze", _migration_storage_bins),
+    (16, "Mindestbestands-Warnungen", _migration_stock_alerts),
+    (17, "Monatsverbrauch und ABC/XYZ-Klassifizierung", _migration_article_classification),
+    (18, "Historie: Snapshot-Indizes", _migration_article_history_snapshot_indexes),
+]
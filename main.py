@@ -33,6 +33,15 @@ class Application:
                 st.session_state.clear()
                 st.rerun()
         
+        # ✅ Rollenänderungen durch Admins sofort übernehmen (O(1)-Prüfung)
+        if st.session_state.get('logged_in', False):
+            changed, new_role = self.session_controller.check_role_change()
+            if changed and new_role is None:
+                st.session_state.clear()
+                st.warning("🚫 Ihr Account wurde entfernt. Bitte melden Sie sich erneut an.")
+            elif changed:
+                st.info(f"🔄 Ihre Rolle wurde geändert: {new_role}")
+
         # Nicht eingeloggt -> AuthView
         if not st.session_state.get('logged_in', False):
             self.auth_view.render()
@@ -47,7 +56,7 @@ class Application:
 
 if __name__ == "__main__":
     st.set_page_config(page_title="SYNAGEION", layout="centered")
-    init_db()
+    init_db()  # Migrationen laufen nur einmal pro Prozess
 
     app = Application()
     app.run()
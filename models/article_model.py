@@ -1,6 +1,21 @@
-from models.base_model import BaseModel
+from models.base_model import BaseModel, ConflictError
+import json
 import sqlite3
-from config import DB_NAME
+from datetime import datetime, timezone
+from utils.database import connection, transaction
+from utils.cache import cached_query, bump_version
+from models.result_set import ResultSet
+from utils.search import build_match_query
+from constants import (PAGE_SIZE, ARTICLE_STATUSES, SEARCH_LIMIT,
+                       ARTICLE_HISTORY_SNAPSHOT_EVERY, ARTICLE_HISTORY_PAGE_SIZE)
+
+
+# ---- 1.2.0 Gecachte Artikel-Abfrage (liefert unveränderliche ResultSets) ----
+@cached_query("articles")
+def _fetch_article_table(sql, params=()):
+    with connection() as conn:
+        return ResultSet.from_cursor(conn.execute(sql, params))
+
 
 # ---- 1.2 Artikel-DB-Klasse ---- 
 class Article(BaseModel):
@@ -11,7 +26,8 @@ class Article(BaseModel):
                  name=None,
                  description=None,
                  min_stock=0,
-                 status="aktiv"):
+                 status="aktiv",
+                 row_version=1):
         super().__init__()
         self.article_id = article_id
         self.article_number = article_number
@@ -19,99 +35,121 @@ class Article(BaseModel):
         self.description = description
         self.min_stock = min_stock
         self.status = status
+        self.row_version = row_version
 
      # --- 1.2.2 Artikel-DB Validierung ---   
     def validate(self):
         """Überprüft, ob die Artikeldaten gültig sind"""
+        return self.validate_values(self.article_number, self.name, self.min_stock, self.status)
+
+    @staticmethod
+    def validate_values(article_number, name, min_stock, status):
+        """Validierungsregeln ohne Objekt (auch für Massen-Import)"""
         errors = []
-        if not self.article_number:
+        if not article_number:
             errors.append("Artikelnummer ist erforderlich")
-        if not self.name:
+        if not name:
             errors.append("Artikelname ist erforderlich")
-        if self.min_stock < 0:
+        if min_stock < 0:
             errors.append("Mindestbestand muss >= 0 sein")
+        if status not in ARTICLE_STATUSES:
+            errors.append(f"Ungültiger Status: {status}")
         return errors
+
+    # --- 1.2.2.1 Validierung eines ganzen Import-Batches ---
+    @classmethod
+    def validate_batch(cls, rows):
+        """Prüft (zeilennr, werte)-Paare; liefert (gültige Tupel, [(zeilennr, fehler)])"""
+        valid, errors = [], []
+        for row_number, values in rows:
+            # None = Spalte fehlt in der Datei (Standardwert bzw. gespeicherter Wert)
+            row_errors = cls.validate_values(values["article_number"], values["name"],
+                                             values["min_stock"] or 0, values["status"] or "aktiv")
+            if row_errors:
+                errors.append((row_number, row_errors))
+            else:
+                valid.append((row_number, (values["article_number"], values["name"],
+                                           values["description"], values["min_stock"],
+                                           values["status"])))
+        return valid, errors
     
     # --- 1.2.3 Artikel-DB Speicherung ---
     def save(self):
-        """Speicher den Artikel in der Datenbank"""
-        conn = self.get_connection()
-        c = conn.cursor()
+        """Speicher den Artikel in der Datenbank.
 
+        Updates greifen nur, wenn row_version noch dem geladenen Stand
+        entspricht; sonst ConflictError mit dem aktuellen DB-Stand.
+        """
         try:
-            if self.article_id:
-                c.execute("""
-                          UPDATE articles
-                          SET article_number=?, name=?, description=?, min_stock=?, status=?
-                          WHERE article_id=?
-                          """, 
-                          (self.article_number,
+            with self.transaction() as conn:
+                c = conn.cursor()
+
+                if self.article_id:
+                    c.execute("""
+                              UPDATE articles
+                              SET article_number=?, name=?, description=?, min_stock=?, status=?,
+                                  row_version = row_version + 1
+                              WHERE article_id=? AND row_version=?
+                              """, 
+                              (self.article_number,
+                                self.name,
+                                self.description,
+                                self.min_stock,
+                                self.status,
+                                self.article_id,
+                                self.row_version))
+                    if c.rowcount == 0:
+                        self._raise_conflict()
+                    self.row_version += 1
+                else:
+                    c.execute("""
+                            INSERT INTO articles (article_number, name, description, min_stock, status)
+                            VALUES (?,?,?,?,?)
+                            """,
+                            (self.article_number,
                             self.name,
                             self.description,
                             self.min_stock,
-                            self.status,
-                            self.article_id))
-            else:
-                c.execute("""
-                        INSERT INTO articles (article_number, name, description, min_stock, status)
-                        VALUES (?,?,?,?,?)
-                        """,
-                        (self.article_number,
-                        self.name,
-                        self.description,
-                        self.min_stock,
-                        self.status))
-                self.article_id = c.lastrowid
-            conn.commit()
+                            self.status))
+                    self.article_id = c.lastrowid
+                    self.row_version = 1
+            bump_version("articles")
             return True
             
         except sqlite3.IntegrityError:
             raise ValueError("Artikelnummer existiert bereits")
-        except Exception as e:
-            conn.rollback()
-            raise e
-        finally:
-            conn.close()
+
+    # --- 1.2.3.1 Konflikt melden (Artikel geändert oder gelöscht) ---
+    def _raise_conflict(self):
+        current = self.find_by_id(self.article_id)
+        if current is None:
+            raise ValueError("Artikel nicht gefunden")
+        changed = [field for field in ("article_number", "name", "description", "min_stock", "status")
+                   if getattr(current, field) != getattr(self, field)]
+        raise ConflictError(
+            f"Artikel {current.article_number} wurde zwischenzeitlich geändert "
+            f"(Version {self.row_version} -> {current.row_version})",
+            current, changed
+        )
 
     # --- 1.2.4 Alle Artikel aus DB laden ---
     @classmethod
     def get_all(cls):
         """Alle Artikel aus DB laden"""
-        conn = sqlite3.connect(DB_NAME)
-        c = conn.cursor()
-
-        try:
-            c.execute("""
-                    SELECT article_id, article_number, name, description, min_stock, status
+        table = _fetch_article_table("""
+                    SELECT article_id, article_number, name, description, min_stock, status, row_version
                     FROM articles
                     """)
-            results = c.fetchall()
-
-            articles = []
-            for result in results:
-                article = cls()
-                (article.article_id,
-                 article.article_number,
-                 article.name,
-                 article.description,
-                 article.min_stock,
-                 article.status) = result
-                articles.append(article)
-
-            return articles
-        finally:
-            conn.close()
+        return [cls(*result) for result in table.rows()]
 
     # --- 1.2.5 Artikel nach Artikel-ID finden ---
     @classmethod
     def find_by_id(cls, article_id):
         """Sucht einen Artikel anhand ihrer ID"""
-        conn = sqlite3.connect(DB_NAME)
-        c = conn.cursor()
-
-        try:
+        with connection() as conn:
+            c = conn.cursor()
             c.execute("""
-                    SELECT article_id, article_number, name, description, min_stock, status
+                    SELECT article_id, article_number, name, description, min_stock, status, row_version
                     FROM articles
                     WHERE article_id = ?
                     """, (article_id,)) # Komma wichtig für Tupel!
@@ -124,10 +162,264 @@ class Article(BaseModel):
                  article.name,
                  article.description,
                  article.min_stock,
-                 article.status) = result
+                 article.status,
+                 article.row_version) = result
                 return article
             
             return None
-        finally:
-            conn.close()
 
+    # --- 1.2.6 Artikel gefiltert, sortiert und seitenweise laden ---
+    # Sortierbare Spalte -> Position in der SELECT-Liste (für den Cursor)
+    SORT_COLUMNS = {"article_id": 0, "article_number": 1, "name": 2, "min_stock": 4}
+
+    @classmethod
+    def query_table(cls, status=None, order_by="article_number", descending=False,
+                    after=None, limit=PAGE_SIZE):
+        """Filtert in SQL und blättert per Keyset-Cursor (sort_wert, article_id).
+
+        Liefert (ResultSet, next_cursor); next_cursor ist None auf der letzten Seite.
+        limit=None lädt alle Treffer ohne Paging.
+        """
+        if order_by not in cls.SORT_COLUMNS:
+            raise ValueError(f"Ungültige Sortierung: {order_by}")
+
+        direction = "DESC" if descending else "ASC"
+        comparison = "<" if descending else ">"
+        where, params = [], []
+
+        if status:
+            where.append("status = ?")
+            params.append(status)
+
+        if after is not None:
+            where.append(f"({order_by}, article_id) {comparison} (?, ?)")
+            params.extend(after)
+
+        sql = """
+            SELECT article_id, article_number, name, description, min_stock, status, row_version
+            FROM articles
+        """
+        if where:
+            sql += " WHERE " + " AND ".join(where)
+        sql += f" ORDER BY {order_by} {direction}, article_id {direction}"
+        if limit is not None:
+            # Einen Datensatz mehr laden, um das Seitenende zu erkennen
+            sql += " LIMIT ?"
+            params.append(limit + 1)
+
+        table = _fetch_article_table(sql, tuple(params))
+
+        next_cursor = None
+        if limit is not None and len(table) > limit:
+            table = table.head(limit)
+            last = table.row(limit - 1)
+            next_cursor = (last[cls.SORT_COLUMNS[order_by]], last[0])
+
+        return table, next_cursor
+
+    # --- 1.2.7 Wie query_table, aber als Artikel-Objekte ---
+    @classmethod
+    def query(cls, status=None, order_by="article_number", descending=False,
+              after=None, limit=PAGE_SIZE):
+        """Liefert (artikel, next_cursor) – siehe query_table"""
+        table, next_cursor = cls.query_table(status=status, order_by=order_by,
+                                             descending=descending, after=after, limit=limit)
+        return [cls(*result) for result in table.rows()], next_cursor
+
+    # --- 1.2.8 Massen-Upsert (ein Chunk = eine Transaktion) ---
+    UPSERT_SQL = """
+        INSERT INTO articles (article_number, name, description, min_stock, status)
+        VALUES (?1, ?2, COALESCE(?3, ''), COALESCE(?4, 0), COALESCE(?5, 'aktiv'))
+        ON CONFLICT(article_number) DO UPDATE SET
+            name = excluded.name,
+            description = COALESCE(?3, articles.description),
+            min_stock = COALESCE(?4, articles.min_stock),
+            status = COALESCE(?5, articles.status),
+            row_version = articles.row_version + 1
+    """
+
+    @classmethod
+    def upsert_many(cls, rows):
+        """Legt Artikel an oder aktualisiert sie per Artikelnummer.
+
+        rows: [(zeilennr, (article_number, name, description, min_stock, status))]
+        None bei description/min_stock/status: beim Anlegen gilt der Standardwert,
+        beim Aktualisieren bleibt der gespeicherte Wert erhalten.
+        Schlägt der Chunk fehl, wird zeilenweise mit Savepoints wiederholt,
+        damit einzelne fehlerhafte Zeilen den Rest nicht verwerfen.
+        Liefert (anzahl_gespeichert, [(zeilennr, fehler)]).
+        """
+        if not rows:
+            return 0, []
+
+        try:
+            with transaction() as conn:
+                conn.executemany(cls.UPSERT_SQL, [values for _, values in rows])
+            bump_version("articles")
+            return len(rows), []
+        except sqlite3.DatabaseError:
+            pass
+
+        saved, errors = 0, []
+        with transaction() as conn:
+            for row_number, values in rows:
+                conn.execute("SAVEPOINT import_row")
+                try:
+                    conn.execute(cls.UPSERT_SQL, values)
+                    conn.execute("RELEASE import_row")
+                    saved += 1
+                except sqlite3.DatabaseError as e:
+                    conn.execute("ROLLBACK TO import_row")
+                    conn.execute("RELEASE import_row")
+                    errors.append((row_number, [f"Datenbankfehler: {e}"]))
+        bump_version("articles")
+        return saved, errors
+
+    # --- 1.2.9 Volltextsuche (FTS5, BM25-Ranking) ---
+    # Gewichte je FTS-Spalte: Artikelnummer > Name > Beschreibung
+    SEARCH_WEIGHTS = (10.0, 5.0, 1.0)
+
+    @classmethod
+    def search(cls, query, limit=SEARCH_LIMIT):
+        """Präfix-Suche über Nummer, Name und Beschreibung, beste Treffer zuerst.
+
+        FTS5 bewertet alle Treffer mit BM25 und liefert nur die besten `limit`
+        Zeilen; erst diese werden mit dem Artikelstamm verbunden.
+        """
+        match = build_match_query(query)
+        if match is None:
+            return []
+
+        weights = ", ".join(str(weight) for weight in cls.SEARCH_WEIGHTS)
+        table = _fetch_article_table(f"""
+            SELECT a.article_id, a.article_number, a.name, a.description, a.min_stock, a.status, a.row_version
+            FROM (
+                SELECT rowid AS article_id, rank AS score
+                FROM articles_fts
+                WHERE articles_fts MATCH ? AND rank MATCH 'bm25({weights})'
+                ORDER BY rank
+                LIMIT ?
+            ) hits
+            JOIN articles a ON a.article_id = hits.article_id
+            ORDER BY hits.score, a.article_number
+        """, (match, limit))
+        return [cls(*result) for result in table.rows()]
+
+    # --- 1.2.10 Mehrere Artikel per ID laden ---
+    @classmethod
+    def find_by_ids(cls, article_ids):
+        """Liefert {article_id: Artikel} für alle gefundenen IDs (eine Abfrage)"""
+        article_ids = list(article_ids)
+        if not article_ids:
+            return {}
+        placeholders = ", ".join("?" * len(article_ids))
+        with connection() as conn:
+            rows = conn.execute(f"""
+                SELECT article_id, article_number, name, description, min_stock, status, row_version
+                FROM articles
+                WHERE article_id IN ({placeholders})
+            """, article_ids).fetchall()
+        return {row[0]: cls(*row) for row in rows}
+
+    # --- 1.2.11 Geänderte und neue Artikel gemeinsam speichern ---
+    @classmethod
+    def apply_changes(cls, updates, inserts):
+        """Schreibt alle Änderungen in einer Transaktion – ganz oder gar nicht.
+
+        updates: [(zeile, Artikel mit article_id und geladener row_version)],
+        inserts: [(zeile, Artikel)]
+        Liefert (anzahl_gespeichert, [(zeile, fehler)]); bei Fehlern wird nichts gespeichert.
+        """
+        errors = []
+        with transaction() as conn:
+            conn.execute("SAVEPOINT article_changes")
+            for label, article in updates:
+                try:
+                    cursor = conn.execute("""
+                        UPDATE articles
+                        SET article_number=?, name=?, description=?, min_stock=?, status=?,
+                            row_version = row_version + 1
+                        WHERE article_id=? AND row_version=?
+                    """, (article.article_number, article.name, article.description,
+                          article.min_stock, article.status, article.article_id,
+                          article.row_version))
+                    if cursor.rowcount == 0:
+                        errors.append((label, ["Wurde zwischenzeitlich von jemand anderem geändert – "
+                                               "bitte neu laden"]))
+                except sqlite3.IntegrityError:
+                    errors.append((label, ["Artikelnummer existiert bereits"]))
+            for label, article in inserts:
+                try:
+                    cursor = conn.execute("""
+                        INSERT INTO articles (article_number, name, description, min_stock, status)
+                        VALUES (?, ?, ?, ?, ?)
+                    """, (article.article_number, article.name, article.description,
+                          article.min_stock, article.status))
+                    article.article_id = cursor.lastrowid
+                except sqlite3.IntegrityError:
+                    errors.append((label, ["Artikelnummer existiert bereits"]))
+
+            if errors:
+                conn.execute("ROLLBACK TO article_changes")
+            conn.execute("RELEASE article_changes")
+
+        if errors:
+            return 0, errors
+        bump_version("articles")
+        return len(updates) + len(inserts), []
+
+    # --- 1.2.12 Änderungshistorie eines Artikels ---
+    @classmethod
+    def history(cls, article_id, limit=ARTICLE_HISTORY_PAGE_SIZE):
+        """Neueste Einträge zuerst: [(changed_at, kind, {feld: wert})] (Zeiten in UTC)"""
+        with connection() as conn:
+            rows = conn.execute("""
+                SELECT changed_at, kind, data
+                FROM article_history
+                WHERE article_id = ?
+                ORDER BY changed_at DESC, history_id DESC
+                LIMIT ?
+            """, (article_id, limit)).fetchall()
+        return [(changed_at, kind, json.loads(data) if data else {}) for changed_at, kind, data in rows]
+
+    # --- 1.2.13 Artikelstand zu einem Zeitpunkt ---
+    @classmethod
+    def as_of(cls, article_id, timestamp):
+        """Rekonstruiert den Artikel zum Zeitpunkt timestamp (datetime oder UTC-Text).
+
+        Da spätestens jeder ARTICLE_HISTORY_SNAPSHOT_EVERY-te Eintrag ein Snapshot
+        ist, genügen die letzten so vielen Einträge vor dem Zeitpunkt – unabhängig
+        davon, wie lang die Historie ist. None = Artikel existierte noch nicht
+        (oder war gelöscht).
+        """
+        if isinstance(timestamp, datetime):
+            if timestamp.tzinfo is not None:
+                timestamp = timestamp.astimezone(timezone.utc).replace(tzinfo=None)
+            timestamp = timestamp.strftime("%Y-%m-%d %H:%M:%S.%f")[:-3]
+
+        with connection() as conn:
+            rows = conn.execute("""
+                SELECT kind, data
+                FROM article_history
+                WHERE article_id = ? AND changed_at <= ?
+                ORDER BY changed_at DESC, history_id DESC
+                LIMIT ?
+            """, (article_id, timestamp, ARTICLE_HISTORY_SNAPSHOT_EVERY)).fetchall()
+
+        # Vom neuesten Eintrag rückwärts bis zum letzten Snapshot sammeln
+        deltas = []
+        for kind, data in rows:
+            if kind == "delete":
+                if not deltas:
+                    return None
+                break
+            deltas.append(json.loads(data))
+            if kind == "snapshot":
+                break
+        else:
+            return None
+
+        values = {}
+        for delta in reversed(deltas):
+            values.update(delta)
+        return cls(article_id=article_id, **values)
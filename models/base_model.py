@@ -1,24 +1,61 @@
 from abc import ABC, abstractmethod
-import sqlite3
-from config import DB_NAME
+from utils.database import get_database_name, connection, transaction
 
 # ----- 1.0 DATEN-MODELL ----- 
+# ---- 1.0.1 Konflikt bei gleichzeitiger Änderung (optimistische Sperre) ----
+class ConflictError(ValueError):
+    """Der Datensatz wurde seit dem Laden geändert (row_version passt nicht).
+
+    current enthält den aktuellen Stand aus der DB, damit die Oberfläche
+    vergleichen, zusammenführen oder erneut speichern kann.
+    """
+    def __init__(self, message, current, fields=()):
+        super().__init__(message)
+        self.current = current
+        self.fields = list(fields)
+
+    def merge(self, original, mine):
+        """Drei-Wege-Vergleich: original = geladener Stand, mine = eigene Werte.
+
+        Liefert (zusammengeführte Werte, [Felder mit echtem Konflikt]). Felder,
+        die nur eine Seite geändert hat, werden ohne Rückfrage übernommen.
+        """
+        merged, conflicts = {}, []
+        for field, my_value in mine.items():
+            base_value = original.get(field)
+            their_value = getattr(self.current, field)
+            if my_value == base_value or my_value == their_value:
+                merged[field] = their_value
+            elif their_value == base_value:
+                merged[field] = my_value
+            else:
+                merged[field] = my_value
+                conflicts.append(field)
+        return merged, conflicts
+
+
 # ---- 1.1 Hauptklasse des DB-Konnektors ----
 class BaseModel(ABC):
     # --- 1.1.1 DB-Zuweisung ---
     def __init__(self):
-        self.db_name = DB_NAME
+        self.db_name = get_database_name()
 
-    # --- 1.1.2 DB-Verbindung ---
+    # --- 1.1.2 DB-Verbindung (aus dem Pool) ---
     def get_connection(self):
-        return sqlite3.connect(self.db_name)
+        """Context-Manager: with self.get_connection() as conn"""
+        return connection(self.db_name)
+
+    # --- 1.1.3 DB-Transaktion (aus dem Pool) ---
+    def transaction(self):
+        """Context-Manager: Commit bei Erfolg, Rollback bei Fehler"""
+        return transaction(self.db_name)
     
-    # --- 1.1.3 ABST-Validierung ---
+    # --- 1.1.4 ABST-Validierung ---
     @abstractmethod
     def validate(self):
         pass
 
-    # --- 1.1.4 ABST-Speicherung ---
+    # --- 1.1.5 ABST-Speicherung ---
     @abstractmethod
     def save(self):
         pass
\ No newline at end of file
@@ -0,0 +1,189 @@
+import time
+from datetime import datetime, timezone
+import numpy as np
+from models.result_set import ResultSet
+from utils.database import connection, transaction
+from constants import PAGE_SIZE, ABC_THRESHOLDS, XYZ_THRESHOLDS, CLASSIFICATION_MONTHS
+
+# ----- 1.9 ABC/XYZ-ANALYSE -----
+# Verbrauch = Warenausgänge je Artikel und Monat aus stock_consumption (beim
+# Buchen per Trigger verdichtet, Migration 17). EINE gruppierte Abfrage liefert
+# je Artikel Summe und Quadratsumme der Monatsverbräuche als Spalten; die
+# Klassifizierung läuft mit NumPy über alle Artikel gleichzeitig.
+#   ABC: Anteil am Verbrauchswert (Menge x durchschnittlicher Einkaufspreis aus
+#        den nicht stornierten Bestellpositionen; ohne Bestellung Preis 0 -> C)
+#   XYZ: Variationskoeffizient der Monatsverbräuche (ohne Verbrauch -> Z)
+
+ANALYSIS_FETCH_BATCH = 50_000
+
+
+# ---- 1.9.1 Abfrage spaltenweise in NumPy-Arrays lesen ----
+def _fetch_columns(cursor, dtypes, batch_size=ANALYSIS_FETCH_BATCH):
+    """Liefert je Ergebnisspalte ein Array (batchweise, ohne Zeilen-Tupel zu sammeln)"""
+    chunks = []
+    while True:
+        batch = cursor.fetchmany(batch_size)
+        if not batch:
+            break
+        chunks.append(np.array(batch, dtype=np.float64))
+    if not chunks:
+        return [np.empty(0, dtype=dtype) for dtype in dtypes]
+    table = np.concatenate(chunks)
+    return [table[:, index].astype(dtype) for index, dtype in enumerate(dtypes)]
+
+
+# ---- 1.9.2 ABC nach kumuliertem Wertanteil ----
+def classify_abc(values, thresholds=ABC_THRESHOLDS):
+    """Liefert (klassen, wertanteil); ein Artikel ist A, solange der Anteil VOR ihm < 80 % ist"""
+    total = values.sum()
+    if total <= 0:
+        return np.full(values.shape, "C"), np.zeros(values.shape)
+
+    share = values / total
+    order = np.argsort(-values, kind="stable")
+    share_before = np.empty(values.shape)
+    share_before[order] = np.cumsum(share[order]) - share[order]
+
+    classes = np.select([share_before < thresholds[0], share_before < thresholds[1]], ["A", "B"], "C")
+    classes[values <= 0] = "C"
+    return classes, share
+
+
+# ---- 1.9.3 XYZ nach Schwankung der Monatsverbräuche ----
+def classify_xyz(sums, sums_sq, periods, thresholds=XYZ_THRESHOLDS):
+    """Variationskoeffizient aus Summe/Quadratsumme über periods Monate (Monate ohne
+    Verbrauch zählen als 0); liefert (klassen, variationskoeffizient bzw. NaN)"""
+    mean = sums / periods
+    variance = np.maximum(sums_sq / periods - mean ** 2, 0.0)
+    cv = np.divide(np.sqrt(variance), mean, out=np.full(mean.shape, np.nan), where=mean > 0)
+
+    classes = np.select([cv <= thresholds[0], cv <= thresholds[1]], ["X", "Y"], "Z")
+    classes[np.isnan(cv)] = "Z"
+    return classes, cv
+
+
+# ---- 1.9.4 Klassifizierung ----
+class ArticleClassification:
+    # --- 1.9.4.1 Analyse über alle aktiven Artikel ausführen ---
+    @staticmethod
+    def classify(months=CLASSIFICATION_MONTHS, today=None):
+        """Berechnet und speichert ABC/XYZ für alle aktiven Artikel; liefert Laufstatistik"""
+        started = time.perf_counter()
+        today = today or datetime.now(timezone.utc).date()
+        current_month = today.year * 12 + today.month - 1
+        first_month = current_month - (months - 1)
+        since = f"{first_month // 12:04d}-{first_month % 12 + 1:02d}-01"
+
+        with connection() as conn:
+            (article_ids,) = _fetch_columns(conn.execute(
+                "SELECT article_id FROM articles WHERE status = 'aktiv' ORDER BY article_id"
+            ), [np.int64])
+            # Mengengewichteter Durchschnittspreis je Artikel (ohne stornierte Bestellungen)
+            price_ids, prices = _fetch_columns(conn.execute("""
+                SELECT l.article_id, SUM(l.quantity_ordered * l.unit_price) / SUM(l.quantity_ordered)
+                FROM purchase_order_lines l
+                JOIN purchase_orders p ON p.po_id = l.po_id
+                WHERE p.status <> 'Storniert'
+                GROUP BY l.article_id
+            """), [np.int64, np.float64])
+            # Primärschlüssel (article_id, month) liefert die Gruppen vorsortiert
+            consumption_ids, sums, sums_sq = _fetch_columns(conn.execute("""
+                SELECT article_id, SUM(quantity), SUM(quantity * quantity)
+                FROM stock_consumption
+                WHERE month BETWEEN ? AND ?
+                GROUP BY article_id
+            """, (first_month, current_month)), [np.int64, np.float64, np.float64])
+
+        # Artikel-IDs -> Zeilenindex (article_ids ist sortiert)
+        def rows_for(ids):
+            rows = np.searchsorted(article_ids, ids)
+            found = rows < len(article_ids)
+            found[found] = article_ids[rows[found]] == ids[found]
+            return rows, found
+
+        unit_prices = np.zeros(len(article_ids))
+        rows, found = rows_for(price_ids)
+        unit_prices[rows[found]] = prices[found]
+
+        consumption = np.zeros(len(article_ids))
+        consumption_sq = np.zeros(len(article_ids))
+        rows, found = rows_for(consumption_ids)
+        consumption[rows[found]] = sums[found]
+        consumption_sq[rows[found]] = sums_sq[found]
+
+        values = consumption * unit_prices
+        abc, share = classify_abc(values)
+        xyz, cv = classify_xyz(consumption, consumption_sq, months)
+
+        computed_at = datetime.now(timezone.utc).strftime("%Y-%m-%d %H:%M:%S")
+        cv_values = np.where(np.isnan(cv), None, np.round(cv, 4))
+        with transaction() as conn:
+            conn.execute("DELETE FROM article_classification")
+            conn.executemany("""
+                INSERT INTO article_classification
+                    (article_id, abc_class, xyz_class, consumption, consumption_value,
+                     value_share, demand_cv, computed_at)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+            """, zip(article_ids.tolist(), abc.tolist(), xyz.tolist(),
+                     consumption.astype(np.int64).tolist(), np.round(values, 2).tolist(),
+                     share.tolist(), cv_values.tolist(), [computed_at] * len(article_ids)))
+
+        return {
+            "articles": len(article_ids),
+            "consumers": len(consumption_ids),
+            "months": months,
+            "since": since,
+            "computed_at": computed_at,
+            "seconds": round(time.perf_counter() - started, 2),
+        }
+
+    # --- 1.9.4.2 Ergebnisse seitenweise (höchster Verbrauchswert zuerst) ---
+    @staticmethod
+    def query(abc_class=None, xyz_class=None, after=None, limit=PAGE_SIZE):
+        """Keyset-Cursor (consumption_value, article_id)"""
+        where, params = [], []
+        if abc_class:
+            where.append("c.abc_class = ?")
+            params.append(abc_class)
+        if xyz_class:
+            where.append("c.xyz_class = ?")
+            params.append(xyz_class)
+        if after is not None:
+            where.append("(c.consumption_value < ? OR (c.consumption_value = ? AND c.article_id > ?))")
+            params.extend((after[0], after[0], after[1]))
+        params.append(limit + 1)
+
+        with connection() as conn:
+            table = ResultSet.from_cursor(conn.execute(f"""
+                SELECT c.article_id, a.article_number, a.name, c.abc_class, c.xyz_class,
+                       c.consumption, c.consumption_value, ROUND(c.value_share * 100, 2) AS value_share,
+                       c.demand_cv
+                FROM article_classification c
+                JOIN articles a ON a.article_id = c.article_id
+                {"WHERE " + " AND ".join(where) if where else ""}
+                ORDER BY c.consumption_value DESC, c.article_id
+                LIMIT ?
+            """, params))
+
+        next_cursor = None
+        if len(table) > limit:
+            table = table.head(limit)
+            last = table.row(limit - 1)
+            next_cursor = (last[6], last[0])
+        return table, next_cursor
+
+    # --- 1.9.4.3 ABC/XYZ-Matrix (Anzahl und Wert je Feld) ---
+    @staticmethod
+    def matrix():
+        """Liefert ({(abc, xyz): (anzahl, wert)}, berechnet_am)"""
+        with connection() as conn:
+            cells = conn.execute("""
+                SELECT abc_class, xyz_class, COUNT(*), ROUND(SUM(consumption_value), 2)
+                FROM article_classification
+                GROUP BY abc_class, xyz_class
+            """).fetchall()
+            computed_at = conn.execute(
+                "SELECT computed_at FROM article_classification LIMIT 1"
+            ).fetchone()
+        cells = {(abc, xyz): (count, value) for abc, xyz, count, value in cells}
+        return cells, computed_at[0] if computed_at else None
@@ -0,0 +1,286 @@
+import sqlite3
+from datetime import date
+from models.base_model import BaseModel
+from models.result_set import ResultSet
+from models.stock_model import StockMovement
+from utils.database import connection, transaction
+from utils.bin_codes import normalize_bin_code
+from constants import PAGE_SIZE, PO_STATUSES, OPEN_PO_STATUSES
+
+
+# ----- 1.6 BESTELL-DATEN-MODELL -----
+# Eine Bestellung (purchase_orders) mit ihren Positionen (purchase_order_lines).
+# Wareneingänge erhöhen quantity_received der Positionen und buchen die
+# Lagerbewegungen (1.5) in derselben Transaktion. Teillieferungen bleiben
+# offen, bis jede Position vollständig geliefert ist.
+
+# Status nach einem Wareneingang aus den Positionen ableiten
+REFRESH_STATUS_SQL = """
+    UPDATE purchase_orders
+    SET status = CASE
+        WHEN NOT EXISTS (SELECT 1 FROM purchase_order_lines l
+                         WHERE l.po_id = purchase_orders.po_id
+                           AND l.quantity_received < l.quantity_ordered) THEN 'Geliefert'
+        ELSE 'Teilgeliefert'
+    END
+    WHERE po_id = ?
+"""
+
+
+# ---- 1.6.1 Bestellung ----
+class PurchaseOrder(BaseModel):
+    def __init__(self, po_id=None, po_number=None, supplier=None, status="Offen",
+                 order_date=None, expected_date=None, created_by=None, lines=None):
+        super().__init__()
+        self.po_id = po_id
+        self.po_number = po_number
+        self.supplier = supplier
+        self.status = status
+        self.order_date = order_date or date.today().isoformat()
+        self.expected_date = expected_date
+        self.created_by = created_by
+        # [{"article_id", "quantity_ordered", "unit_price"}] (+ line_id/line_no/quantity_received beim Laden)
+        self.lines = lines or []
+
+    # --- 1.6.2 Validierung ---
+    def validate(self):
+        errors = []
+        if not (self.po_number or "").strip():
+            errors.append("Bestellnummer ist erforderlich")
+        if not (self.supplier or "").strip():
+            errors.append("Lieferant ist erforderlich")
+        if self.status not in PO_STATUSES:
+            errors.append(f"Ungültiger Status: {self.status}")
+        if not self.lines:
+            errors.append("Mindestens eine Position ist erforderlich")
+
+        for line_no, line in enumerate(self.lines, start=1):
+            if not line.get("article_id"):
+                errors.append(f"Position {line_no}: Artikel ist erforderlich")
+            quantity = line.get("quantity_ordered")
+            if not isinstance(quantity, int) or quantity <= 0:
+                errors.append(f"Position {line_no}: Menge muss größer als 0 sein")
+            price = line.get("unit_price", 0)
+            if not isinstance(price, (int, float)) or price < 0:
+                errors.append(f"Position {line_no}: Preis darf nicht negativ sein")
+        return errors
+
+    # --- 1.6.3 Speichern (Kopf + alle Positionen in einer Transaktion) ---
+    def save(self):
+        if self.po_id is not None:
+            raise ValueError("Bestellungen können nach dem Anlegen nur storniert werden")
+
+        errors = self.validate()
+        if errors:
+            raise ValueError("; ".join(errors))
+
+        try:
+            with transaction() as conn:
+                cursor = conn.execute("""
+                    INSERT INTO purchase_orders (po_number, supplier, status, order_date, expected_date, created_by)
+                    VALUES (?, ?, ?, ?, ?, ?)
+                """, (self.po_number.strip(), self.supplier.strip(), self.status,
+                      self.order_date, self.expected_date, self.created_by))
+                self.po_id = cursor.lastrowid
+                conn.executemany("""
+                    INSERT INTO purchase_order_lines (po_id, line_no, article_id, quantity_ordered, unit_price)
+                    VALUES (?, ?, ?, ?, ?)
+                """, [(self.po_id, line_no, line["article_id"], line["quantity_ordered"],
+                       line.get("unit_price", 0))
+                      for line_no, line in enumerate(self.lines, start=1)])
+        except sqlite3.IntegrityError as e:
+            self.po_id = None
+            if "UNIQUE" in str(e):
+                raise ValueError(f"Bestellnummer {self.po_number} existiert bereits")
+            raise ValueError("Unbekannter Artikel in den Positionen")
+        return True
+
+    # --- 1.6.4 Bestellung mit Positionen laden ---
+    @classmethod
+    def find_by_id(cls, po_id):
+        with connection() as conn:
+            header = conn.execute("""
+                SELECT po_id, po_number, supplier, status, order_date, expected_date, created_by
+                FROM purchase_orders WHERE po_id = ?
+            """, (po_id,)).fetchone()
+            if header is None:
+                return None
+            lines = conn.execute("""
+                SELECT l.line_id, l.line_no, l.article_id, a.article_number, a.name,
+                       l.quantity_ordered, l.quantity_received, l.unit_price
+                FROM purchase_order_lines l
+                JOIN articles a ON a.article_id = l.article_id
+                WHERE l.po_id = ? ORDER BY l.line_no
+            """, (po_id,)).fetchall()
+
+        keys = ("line_id", "line_no", "article_id", "article_number", "name",
+                "quantity_ordered", "quantity_received", "unit_price")
+        return cls(*header, lines=[dict(zip(keys, line)) for line in lines])
+
+    # --- 1.6.5 Bestellungen seitenweise (mit Summen je Bestellung) ---
+    @staticmethod
+    def query(status=None, before=None, limit=PAGE_SIZE):
+        """Neueste zuerst; Summen werden nur für die Zeilen der Seite berechnet"""
+        where, params = [], []
+        if isinstance(status, (list, tuple)):
+            where.append(f"status IN ({', '.join('?' * len(status))})")
+            params.extend(status)
+        elif status:
+            where.append("status = ?")
+            params.append(status)
+        if before is not None:
+            where.append("po_id < ?")
+            params.append(before)
+        params.append(limit + 1)
+
+        with connection() as conn:
+            table = ResultSet.from_cursor(conn.execute(f"""
+                WITH page AS (
+                    SELECT po_id, po_number, supplier, status, order_date, expected_date
+                    FROM purchase_orders
+                    {"WHERE " + " AND ".join(where) if where else ""}
+                    ORDER BY po_id DESC
+                    LIMIT ?
+                )
+                SELECT p.po_id, p.po_number, p.supplier, p.status, p.order_date, p.expected_date,
+                       COUNT(l.line_id) AS lines,
+                       SUM(l.quantity_ordered) AS quantity_ordered,
+                       SUM(l.quantity_received) AS quantity_received,
+                       ROUND(SUM(l.quantity_ordered * l.unit_price), 2) AS order_value
+                FROM page p
+                LEFT JOIN purchase_order_lines l ON l.po_id = p.po_id
+                GROUP BY p.po_id
+                ORDER BY p.po_id DESC
+            """, params))
+
+        next_cursor = None
+        if len(table) > limit:
+            table = table.head(limit)
+            next_cursor = table.row(limit - 1)[0]
+        return table, next_cursor
+
+    # --- 1.6.6 Offene Positionen einer Bestellung (partieller Index) ---
+    @staticmethod
+    def open_lines(po_id):
+        with connection() as conn:
+            return ResultSet.from_cursor(conn.execute("""
+                SELECT l.line_id, l.line_no, a.article_number, a.name,
+                       l.quantity_ordered, l.quantity_received,
+                       l.quantity_ordered - l.quantity_received AS quantity_open
+                FROM purchase_order_lines l
+                JOIN articles a ON a.article_id = l.article_id
+                WHERE l.po_id = ? AND l.quantity_received < l.quantity_ordered
+                ORDER BY l.line_no
+            """, (po_id,)))
+
+    # --- 1.6.7 Wareneingang buchen ---
+    @staticmethod
+    def receive(po_id, receipts, reference=None, user_id=None):
+        """Bucht einen (Teil-)Wareneingang – alle Positionen oder keine.
+
+        receipts: [(line_id, menge, lagerplatz)]; Positionen mit Menge 0 werden
+        übersprungen. Liefert {"lines", "quantity", "status"}.
+        """
+        receipts = [(line_id, quantity, normalize_bin_code(bin_code))
+                    for line_id, quantity, bin_code in receipts if quantity]
+        if not receipts:
+            raise ValueError("Keine Eingangsmengen erfasst")
+
+        with transaction() as conn:
+            header = conn.execute(
+                "SELECT po_number, status FROM purchase_orders WHERE po_id = ?", (po_id,)
+            ).fetchone()
+            if header is None:
+                raise ValueError("Bestellung nicht gefunden")
+            po_number, status = header
+            if status not in OPEN_PO_STATUSES:
+                raise ValueError(f"Bestellung {po_number} ist {status.lower()} – kein Wareneingang möglich")
+
+            # Offene Mengen aller Positionen mit einer Abfrage holen
+            open_lines = {
+                row[0]: row[1:] for row in conn.execute("""
+                    SELECT line_id, line_no, article_id, quantity_ordered - quantity_received
+                    FROM purchase_order_lines
+                    WHERE po_id = ? AND quantity_received < quantity_ordered
+                """, (po_id,))
+            }
+
+            errors, movements, totals = [], [], {}
+            reference = f"{po_number} / {reference}" if reference else po_number
+            for line_id, quantity, bin_code in receipts:
+                line = open_lines.get(line_id)
+                if line is None:
+                    errors.append(f"Position {line_id} ist nicht offen")
+                    continue
+                line_no, article_id, quantity_open = line
+                if not isinstance(quantity, int) or quantity < 0:
+                    errors.append(f"Position {line_no}: Menge muss eine positive ganze Zahl sein")
+                else:
+                    # Eine Position kann auf mehrere Lagerplätze verteilt sein
+                    totals[line_id] = totals.get(line_id, 0) + quantity
+                if not bin_code:
+                    errors.append(f"Position {line_no}: Lagerplatz ist erforderlich")
+                movements.append(StockMovement(article_id=article_id, bin_code=bin_code, quantity=quantity,
+                                               movement_type="Eingang", reference=reference,
+                                               user_id=user_id))
+            for line_id, total in totals.items():
+                line_no, _, quantity_open = open_lines[line_id]
+                if total > quantity_open:
+                    errors.append(f"Position {line_no}: {total} geliefert, aber nur {quantity_open} offen")
+            if errors:
+                raise ValueError("; ".join(errors))
+
+            # Zusatzbedingung schützt vor parallel gebuchten Eingängen
+            cursor = conn.executemany("""
+                UPDATE purchase_order_lines
+                SET quantity_received = quantity_received + ?
+                WHERE line_id = ? AND quantity_received + ? <= quantity_ordered
+            """, [(quantity, line_id, quantity) for line_id, quantity, _ in receipts])
+            if cursor.rowcount != len(receipts):
+                raise ValueError("Positionen wurden zwischenzeitlich geändert – bitte neu laden")
+
+            StockMovement.book(movements)
+            conn.execute(REFRESH_STATUS_SQL, (po_id,))
+            status = conn.execute("SELECT status FROM purchase_orders WHERE po_id = ?", (po_id,)).fetchone()[0]
+
+        return {"lines": len(receipts), "quantity": sum(q for _, q, _ in receipts), "status": status}
+
+    # --- 1.6.8 Bestellung stornieren (nur ohne Wareneingang) ---
+    @staticmethod
+    def cancel(po_id):
+        with transaction() as conn:
+            cursor = conn.execute("""
+                UPDATE purchase_orders SET status = 'Storniert'
+                WHERE po_id = ? AND status = 'Offen'
+                  AND NOT EXISTS (SELECT 1 FROM purchase_order_lines
+                                  WHERE po_id = ? AND quantity_received > 0)
+            """, (po_id, po_id))
+        if cursor.rowcount == 0:
+            raise ValueError("Nur offene Bestellungen ohne Wareneingang können storniert werden")
+        return True
+
+    # --- 1.6.9 Nächste freie Bestellnummer vorschlagen ---
+    @staticmethod
+    def next_po_number(year=None):
+        prefix = f"PO-{year or date.today().year}-"
+        with connection() as conn:
+            row = conn.execute(
+                "SELECT MAX(po_number) FROM purchase_orders WHERE po_number LIKE ? || '%'", (prefix,)
+            ).fetchone()
+        last = row[0][len(prefix):] if row[0] else ""
+        number = int(last) + 1 if last.isdigit() else 1
+        return f"{prefix}{number:04d}"
+
+    # --- 1.6.10 Artikel-IDs zu Artikelnummern ---
+    @staticmethod
+    def resolve_article_numbers(article_numbers):
+        """Liefert {artikelnummer: article_id} für aktive Artikel (eine Abfrage)"""
+        article_numbers = list(set(article_numbers))
+        if not article_numbers:
+            return {}
+        placeholders = ", ".join("?" * len(article_numbers))
+        with connection() as conn:
+            return dict(conn.execute(f"""
+                SELECT article_number, article_id FROM articles
+                WHERE article_number IN ({placeholders}) AND status = 'aktiv'
+            """, article_numbers).fetchall())
@@ -0,0 +1,91 @@
+from constants import FETCH_BATCH_SIZE
+
+# ---- 1.3 Spaltenorientierte Ergebnismenge ----
+# Eine Abfrage wird batchweise (fetchmany) direkt in Spalten-Tupel übertragen.
+# Das spart pro Zeile ein Modell-Objekt samt __dict__ und lässt sich ohne
+# weiteres Umsortieren an st.dataframe übergeben. Die Ergebnismenge ist
+# unveränderlich und kann daher gefahrlos im Lese-Cache geteilt werden.
+
+_row_types = {}
+
+
+# --- 1.3.1 Zeilen-Basisklasse (ohne __dict__) ---
+class _Row:
+    __slots__ = ()
+
+    def __init__(self, values):
+        for name, value in zip(self.__slots__, values):
+            setattr(self, name, value)
+
+    def __iter__(self):
+        return (getattr(self, name) for name in self.__slots__)
+
+    def __repr__(self):
+        fields = ", ".join(f"{name}={getattr(self, name)!r}" for name in self.__slots__)
+        return f"Row({fields})"
+
+
+# --- 1.3.2 Zeilen-Klasse je Spaltensatz (einmal erzeugt, dann wiederverwendet) ---
+def row_type(columns):
+    row_cls = _row_types.get(columns)
+    if row_cls is None:
+        row_cls = type("Row", (_Row,), {"__slots__": columns})
+        _row_types[columns] = row_cls
+    return row_cls
+
+
+# --- 1.3.3 Ergebnismenge ---
+class ResultSet:
+    __slots__ = ("columns", "_data")
+
+    def __init__(self, columns, data):
+        self.columns = tuple(columns)
+        self._data = tuple(tuple(values) for values in data)
+
+    # --- 1.3.3.1 Direkt aus dem Cursor (batchweise) ---
+    @classmethod
+    def from_cursor(cls, cursor, batch_size=FETCH_BATCH_SIZE):
+        columns = tuple(description[0] for description in cursor.description)
+        data = [[] for _ in columns]
+
+        while True:
+            batch = cursor.fetchmany(batch_size)
+            if not batch:
+                break
+            for values, batch_values in zip(data, zip(*batch)):
+                values.extend(batch_values)
+
+        return cls(columns, data)
+
+    # --- 1.3.3.2 Größe und Zugriff ---
+    def __len__(self):
+        return len(self._data[0]) if self._data else 0
+
+    def __bool__(self):
+        return len(self) > 0
+
+    def __iter__(self):
+        """Iteriert über schlanke Zeilen-Objekte mit Attributzugriff"""
+        row_cls = row_type(self.columns)
+        return (row_cls(values) for values in self.rows())
+
+    def rows(self):
+        """Iteriert über die Zeilen als Tupel"""
+        return zip(*self._data)
+
+    def row(self, index):
+        return tuple(values[index] for values in self._data)
+
+    def column(self, name):
+        return self._data[self.columns.index(name)]
+
+    def head(self, count):
+        """Neue Ergebnismenge mit den ersten count Zeilen"""
+        return ResultSet(self.columns, (values[:count] for values in self._data))
+
+    # --- 1.3.3.3 Übergabe an st.dataframe ---
+    def to_dict(self, labels=None):
+        """Spalten als dict; labels benennt/filtert Spalten ({spalte: anzeigename})"""
+        if labels is None:
+            return dict(zip(self.columns, self._data))
+        return {label: self.column(name) for name, label in labels.items()}
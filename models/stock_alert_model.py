@@ -0,0 +1,111 @@
+import time
+from models.result_set import ResultSet
+from utils.database import connection, transaction
+from utils.settings import get_setting, set_setting, claim_interval
+from config import STOCK_ALERT_RECONCILE_SECONDS
+from constants import PAGE_SIZE
+
+# ----- 1.8 MINDESTBESTANDS-WARNUNGEN -----
+# stock_alerts wird per Trigger beim Buchen (stock_balances) und beim Ändern
+# von min_stock/status gepflegt (Migration 16) und enthält nur die Artikel
+# unter Mindestbestand. Dashboards lesen daher nur diese kleine Tabelle; der
+# volle Abgleich über alle Artikel läuft nur als Sicherheitsnetz (1.8.4).
+
+SETTING_STOCK_ALERTS_RECONCILED = "stock_alerts_reconciled_at"
+
+
+# ---- 1.8.1 Warnungen ----
+class StockAlert:
+    # --- 1.8.2 Warnungen seitenweise (neueste Unterschreitung zuerst) ---
+    @staticmethod
+    def query(before=None, limit=PAGE_SIZE):
+        """Keyset-Cursor (since, article_id); inkl. offener Bestellmenge je Artikel"""
+        where, params = "", []
+        if before is not None:
+            where = "WHERE (s.since, s.article_id) < (?, ?)"
+            params.extend(before)
+        params.append(limit + 1)
+
+        with connection() as conn:
+            table = ResultSet.from_cursor(conn.execute(f"""
+                SELECT s.article_id, a.article_number, a.name, s.on_hand, s.min_stock,
+                       s.min_stock - s.on_hand AS shortfall,
+                       (SELECT COALESCE(SUM(l.quantity_ordered - l.quantity_received), 0)
+                        FROM purchase_order_lines l
+                        JOIN purchase_orders p ON p.po_id = l.po_id
+                        WHERE l.article_id = s.article_id
+                          AND l.quantity_received < l.quantity_ordered
+                          AND p.status IN ('Offen', 'Teilgeliefert')) AS on_order,
+                       s.since
+                FROM stock_alerts s
+                JOIN articles a ON a.article_id = s.article_id
+                {where}
+                ORDER BY s.since DESC, s.article_id DESC
+                LIMIT ?
+            """, params))
+
+        next_cursor = None
+        if len(table) > limit:
+            table = table.head(limit)
+            last = table.row(limit - 1)
+            next_cursor = (last[7], last[0])
+        return table, next_cursor
+
+    # --- 1.8.3 Anzahl (Kennzahl fürs Dashboard) ---
+    @staticmethod
+    def count():
+        with connection() as conn:
+            return conn.execute("SELECT COUNT(*) FROM stock_alerts").fetchone()[0]
+
+    # --- 1.8.4 Voller Abgleich gegen Artikel und Bestände ---
+    @staticmethod
+    def reconcile(repair=False):
+        """Liefert [(article_id, gespeichert, tatsächlich)]; None = keine Warnung.
+
+        Einziger Lauf über den kompletten Artikelstamm – nur periodisch oder manuell.
+        """
+        with transaction() as conn:
+            expected = {row[0]: row[1:] for row in conn.execute("""
+                SELECT a.article_id, COALESCE(SUM(b.quantity), 0) AS on_hand, a.min_stock
+                FROM articles a
+                LEFT JOIN stock_balances b ON b.article_id = a.article_id
+                WHERE a.status = 'aktiv' AND a.min_stock > 0
+                GROUP BY a.article_id
+                HAVING on_hand < a.min_stock
+            """)}
+            stored = {row[0]: row[1:] for row in conn.execute(
+                "SELECT article_id, on_hand, min_stock FROM stock_alerts"
+            )}
+
+            mismatches = [(article_id, stored.get(article_id, (None,))[0],
+                           expected.get(article_id, (None,))[0])
+                          for article_id in expected.keys() | stored.keys()
+                          if expected.get(article_id) != stored.get(article_id)]
+
+            if mismatches and repair:
+                conn.executemany("DELETE FROM stock_alerts WHERE article_id = ?",
+                                 [(article_id,) for article_id in stored.keys() - expected.keys()])
+                conn.executemany("""
+                    INSERT INTO stock_alerts (article_id, on_hand, min_stock, since)
+                    VALUES (?, ?, ?, strftime('%Y-%m-%d %H:%M:%S', 'now'))
+                    ON CONFLICT(article_id) DO UPDATE SET
+                        on_hand = excluded.on_hand, min_stock = excluded.min_stock
+                """, [(article_id, *values) for article_id, values in expected.items()
+                      if stored.get(article_id) != values])
+
+        if repair:
+            set_setting(SETTING_STOCK_ALERTS_RECONCILED, time.time())
+        return sorted(mismatches)
+
+    # --- 1.8.5 Abgleich, wenn der letzte zu lange her ist ---
+    @classmethod
+    def reconcile_if_due(cls, max_age=STOCK_ALERT_RECONCILE_SECONDS):
+        """Liefert die korrigierten Abweichungen oder None, wenn kein Lauf fällig war"""
+        # Gecachter Vorab-Check, damit nicht jedes Dashboard eine Schreibtransaktion öffnet
+        last_run = float(get_setting(SETTING_STOCK_ALERTS_RECONCILED, 0))
+        if time.time() - last_run < max_age:
+            return None
+        # Nur die Session, die den Lauf übernimmt, gleicht ab
+        if not claim_interval(SETTING_STOCK_ALERTS_RECONCILED, max_age):
+            return None
+        return cls.reconcile(repair=True)
@@ -0,0 +1,236 @@
+import sqlite3
+from datetime import datetime, timezone
+from models.base_model import BaseModel
+from models.result_set import ResultSet
+from utils.database import connection, transaction
+from utils.bin_codes import normalize_bin_code
+from constants import PAGE_SIZE, STOCK_MOVEMENT_TYPES
+
+
+# ----- 1.5 LAGER-DATEN-MODELL -----
+# stock_movements ist das unveränderliche Journal aller Bewegungen,
+# stock_balances der daraus laufend fortgeschriebene Bestand je Artikel und
+# Lagerplatz. Beide werden in derselben Transaktion geschrieben; Bestände
+# werden daher nie aus dem Journal aufsummiert (außer in der Prüfung 1.5.9).
+
+# Kein INSERT ... ON CONFLICT: SQLite prüft den CHECK (quantity >= 0) schon
+# am einzufügenden Datensatz, ein negatives Delta würde also immer scheitern.
+BALANCE_UPDATE_SQL = """
+    UPDATE stock_balances
+    SET quantity = quantity + ?, last_movement_id = ?, updated_at = ?
+    WHERE article_id = ? AND bin_code = ?
+"""
+
+BALANCE_INSERT_SQL = """
+    INSERT INTO stock_balances (article_id, bin_code, quantity, last_movement_id, updated_at)
+    VALUES (?, ?, ?, ?, ?)
+"""
+
+
+# ---- 1.5.1 Lagerbewegung ----
+class StockMovement(BaseModel):
+    def __init__(self, movement_id=None, article_id=None, bin_code=None, quantity=0,
+                 movement_type="Eingang", reference=None, user_id=None, created_at=None):
+        super().__init__()
+        self.movement_id = movement_id
+        self.article_id = article_id
+        self.bin_code = bin_code
+        self.quantity = quantity
+        self.movement_type = movement_type
+        self.reference = reference
+        self.user_id = user_id
+        self.created_at = created_at
+
+    # --- 1.5.2 Validierung ---
+    def validate(self):
+        """Menge mit Vorzeichen: Zugang positiv, Abgang negativ"""
+        errors = []
+        if not self.article_id:
+            errors.append("Artikel ist erforderlich")
+        if not (self.bin_code or "").strip():
+            errors.append("Lagerplatz ist erforderlich")
+        if not isinstance(self.quantity, int) or self.quantity == 0:
+            errors.append("Menge muss eine ganze Zahl ungleich 0 sein")
+        if self.movement_type not in STOCK_MOVEMENT_TYPES:
+            errors.append(f"Ungültige Bewegungsart: {self.movement_type}")
+        elif isinstance(self.quantity, int) and self.quantity * STOCK_MOVEMENT_TYPES[self.movement_type] < 0:
+            errors.append(f"Falsches Vorzeichen für {self.movement_type}: {self.quantity}")
+        return errors
+
+    # --- 1.5.3 Speichern (eine Bewegung) ---
+    def save(self):
+        self.book([self])
+        return True
+
+    # --- 1.5.4 Mehrere Bewegungen atomar buchen ---
+    @classmethod
+    def book(cls, movements):
+        """Schreibt Journal und Bestände in einer Transaktion – alle oder keine.
+
+        Läuft innerhalb einer bereits offenen Transaktion mit (z. B. Wareneingang).
+        Ein Bestand unter 0 bricht die gesamte Buchung mit ValueError ab.
+        """
+        for movement in movements:
+            errors = movement.validate()
+            if errors:
+                raise ValueError("; ".join(errors))
+
+        now = datetime.now(timezone.utc).strftime("%Y-%m-%d %H:%M:%S.%f")[:-3]
+        with transaction() as conn:
+            for movement in movements:
+                movement.bin_code = normalize_bin_code(movement.bin_code)
+                try:
+                    cursor = conn.execute("""
+                        INSERT INTO stock_movements
+                            (article_id, bin_code, quantity, movement_type, reference, user_id, created_at)
+                        VALUES (?, ?, ?, ?, ?, ?, ?)
+                    """, (movement.article_id, movement.bin_code, movement.quantity,
+                          movement.movement_type, movement.reference, movement.user_id, now))
+                    movement.movement_id = cursor.lastrowid
+                    movement.created_at = now
+                    updated = conn.execute(BALANCE_UPDATE_SQL, (
+                        movement.quantity, movement.movement_id, now, movement.article_id, movement.bin_code
+                    )).rowcount
+                    if not updated:
+                        conn.execute(BALANCE_INSERT_SQL, (movement.article_id, movement.bin_code,
+                                                          movement.quantity, movement.movement_id, now))
+                except sqlite3.IntegrityError as e:
+                    if "FOREIGN KEY" in str(e):
+                        raise ValueError(f"Artikel {movement.article_id} nicht gefunden")
+                    if "bin_capacity" in str(e):
+                        raise ValueError(f"Lagerplatz {movement.bin_code} hat nicht genug freie Kapazität "
+                                         f"({movement.quantity:+d})")
+                    raise ValueError(f"Bestand reicht nicht: Artikel {movement.article_id} "
+                                     f"auf {movement.bin_code} ({movement.quantity:+d})")
+        return movements
+
+    # --- 1.5.5 Umlagerung (Abgang + Zugang in einer Buchung) ---
+    @classmethod
+    def transfer(cls, article_id, from_bin, to_bin, quantity, reference=None, user_id=None):
+        if normalize_bin_code(from_bin) == normalize_bin_code(to_bin):
+            raise ValueError("Quell- und Ziel-Lagerplatz müssen sich unterscheiden")
+        if not isinstance(quantity, int) or quantity <= 0:
+            raise ValueError("Menge muss größer als 0 sein")
+        return cls.book([
+            cls(article_id=article_id, bin_code=from_bin, quantity=-quantity,
+                movement_type="Umlagerung", reference=reference, user_id=user_id),
+            cls(article_id=article_id, bin_code=to_bin, quantity=quantity,
+                movement_type="Umlagerung", reference=reference, user_id=user_id),
+        ])
+
+    # --- 1.5.6 Bestand lesen (Primärschlüssel, O(1)) ---
+    @staticmethod
+    def get_balance(article_id, bin_code):
+        with connection() as conn:
+            row = conn.execute(
+                "SELECT quantity FROM stock_balances WHERE article_id = ? AND bin_code = ?",
+                (article_id, bin_code)
+            ).fetchone()
+        return row[0] if row else 0
+
+    @staticmethod
+    def get_article_stock(article_id):
+        """{lagerplatz: menge} eines Artikels (Präfix des Primärschlüssels)"""
+        with connection() as conn:
+            rows = conn.execute(
+                "SELECT bin_code, quantity FROM stock_balances WHERE article_id = ? AND quantity > 0",
+                (article_id,)
+            ).fetchall()
+        return dict(rows)
+
+    # --- 1.5.7 Bestände seitenweise ---
+    @staticmethod
+    def query_balances(article_id=None, bin_code=None, after=None, limit=PAGE_SIZE):
+        """Bestände > 0 mit Artikeldaten; Keyset-Cursor (article_id, bin_code)"""
+        where, params = ["b.quantity > 0"], []
+        if article_id:
+            where.append("b.article_id = ?")
+            params.append(article_id)
+        if bin_code:
+            where.append("b.bin_code = ?")
+            params.append(bin_code)
+        if after is not None:
+            where.append("(b.article_id, b.bin_code) > (?, ?)")
+            params.extend(after)
+        params.append(limit + 1)
+
+        with connection() as conn:
+            table = ResultSet.from_cursor(conn.execute(f"""
+                SELECT b.article_id, a.article_number, a.name, b.bin_code, b.quantity, b.updated_at
+                FROM stock_balances b
+                JOIN articles a ON a.article_id = b.article_id
+                WHERE {" AND ".join(where)}
+                ORDER BY b.article_id, b.bin_code
+                LIMIT ?
+            """, params))
+
+        next_cursor = None
+        if len(table) > limit:
+            table = table.head(limit)
+            last = table.row(limit - 1)
+            next_cursor = (last[0], last[3])
+        return table, next_cursor
+
+    # --- 1.5.8 Journal seitenweise (neueste zuerst) ---
+    @staticmethod
+    def query_movements(article_id=None, before=None, limit=PAGE_SIZE):
+        where, params = [], []
+        if article_id:
+            where.append("m.article_id = ?")
+            params.append(article_id)
+        if before is not None:
+            where.append("m.movement_id < ?")
+            params.append(before)
+        params.append(limit + 1)
+
+        with connection() as conn:
+            table = ResultSet.from_cursor(conn.execute(f"""
+                SELECT m.movement_id, m.created_at, a.article_number, m.bin_code, m.quantity,
+                       m.movement_type, m.reference, u.username
+                FROM stock_movements m
+                JOIN articles a ON a.article_id = m.article_id
+                LEFT JOIN users u ON u.user_id = m.user_id
+                {"WHERE " + " AND ".join(where) if where else ""}
+                ORDER BY m.movement_id DESC
+                LIMIT ?
+            """, params))
+
+        next_cursor = None
+        if len(table) > limit:
+            table = table.head(limit)
+            next_cursor = table.row(limit - 1)[0]
+        return table, next_cursor
+
+    # --- 1.5.9 Bestände gegen das Journal prüfen (und neu aufbauen) ---
+    @staticmethod
+    def verify_balances(repair=False):
+        """Liefert [(article_id, bin_code, bestand, summe_journal)] für Abweichungen"""
+        with transaction() as conn:
+            mismatches = conn.execute("""
+                WITH ledger AS (
+                    SELECT article_id, bin_code, SUM(quantity) AS quantity
+                    FROM stock_movements
+                    GROUP BY article_id, bin_code
+                )
+                SELECT l.article_id, l.bin_code, COALESCE(b.quantity, 0), l.quantity
+                FROM ledger l
+                LEFT JOIN stock_balances b
+                       ON b.article_id = l.article_id AND b.bin_code = l.bin_code
+                WHERE COALESCE(b.quantity, 0) <> l.quantity
+                UNION ALL
+                SELECT b.article_id, b.bin_code, b.quantity, 0
+                FROM stock_balances b
+                WHERE b.quantity <> 0
+                  AND NOT EXISTS (SELECT 1 FROM stock_movements m
+                                  WHERE m.article_id = b.article_id AND m.bin_code = b.bin_code)
+            """).fetchall()
+
+            if mismatches and repair:
+                conn.execute("DELETE FROM stock_balances")
+                conn.execute("""
+                    INSERT INTO stock_balances (article_id, bin_code, quantity, last_movement_id, updated_at)
+                    SELECT article_id, bin_code, SUM(quantity), MAX(movement_id), MAX(created_at)
+                    FROM stock_movements
+                    GROUP BY article_id, bin_code
+                """)
+        return mismatches
@@ -0,0 +1,232 @@
+import sqlite3
+from models.base_model import BaseModel
+from models.result_set import ResultSet
+from utils.database import connection, transaction
+from utils.bin_codes import normalize_bin_code, parse_bin_code, format_bin_code, prefix_range, prefix_aisle
+from constants import PAGE_SIZE, PUTAWAY_SUGGESTIONS, MAX_BINS_PER_GENERATE
+
+
+# ----- 1.7 LAGERPLATZ-DATEN-MODELL -----
+# storage_bins hält die Hierarchie (Zone/Gang/Regal/Ebene) als indizierte
+# Spalten sowie Kapazität und Belegung. occupied wird per Trigger aus
+# stock_balances fortgeschrieben (Migration 15), free_capacity ist eine
+# generierte Spalte – Einlagerungsvorschläge sind damit reine Index-Bereichssuchen.
+
+BIN_COLUMNS = "bin_code, zone, aisle, shelf, level, capacity, occupied, free_capacity, active"
+
+
+# ---- 1.7.0 Präfix-Filter (Code-Bereich, bei vollständigem Gang auch zone/aisle) ----
+def _prefix_filter(prefix, alias=""):
+    """Liefert ([bedingung], [parameter]); "A1" trifft so nicht zusätzlich A10-A19"""
+    low, high = prefix_range(prefix)
+    where, params = [f"{alias}bin_code >= ? AND {alias}bin_code < ?"], [low, high]
+    aisle = prefix_aisle(prefix)
+    if aisle:
+        where.append(f"{alias}zone = ? AND {alias}aisle = ?")
+        params.extend(aisle)
+    return where, params
+
+
+# ---- 1.7.1 Lagerplatz ----
+class StorageBin(BaseModel):
+    def __init__(self, bin_code=None, capacity=None, active=True, occupied=0):
+        super().__init__()
+        self.bin_code = normalize_bin_code(bin_code)
+        self.zone, self.aisle, self.shelf, self.level = parse_bin_code(self.bin_code)
+        self.capacity = capacity
+        self.active = active
+        self.occupied = occupied
+
+    # --- 1.7.2 Validierung ---
+    def validate(self):
+        errors = []
+        if not self.bin_code:
+            errors.append("Lagerplatz-Code ist erforderlich")
+        if self.capacity is not None and (not isinstance(self.capacity, int) or self.capacity < 0):
+            errors.append("Kapazität muss eine ganze Zahl ≥ 0 sein (leer = unbegrenzt)")
+        return errors
+
+    # --- 1.7.3 Speichern (anlegen oder Kapazität/Status ändern) ---
+    def save(self):
+        errors = self.validate()
+        if errors:
+            raise ValueError("; ".join(errors))
+
+        with transaction() as conn:
+            occupied = conn.execute(
+                "SELECT occupied FROM storage_bins WHERE bin_code = ?", (self.bin_code,)
+            ).fetchone()
+            if occupied is None:
+                conn.execute("""
+                    INSERT INTO storage_bins (bin_code, zone, aisle, shelf, level, capacity, active, occupied)
+                    VALUES (?, ?, ?, ?, ?, ?, ?,
+                            COALESCE((SELECT SUM(quantity) FROM stock_balances WHERE bin_code = ?), 0))
+                """, (self.bin_code, self.zone, self.aisle, self.shelf, self.level,
+                      self.capacity, int(self.active), self.bin_code))
+                return True
+
+            if self.capacity is not None and self.capacity < occupied[0]:
+                raise ValueError(f"Kapazität {self.capacity} kleiner als aktuelle Belegung ({occupied[0]})")
+            conn.execute(
+                "UPDATE storage_bins SET capacity = ?, active = ? WHERE bin_code = ?",
+                (self.capacity, int(self.active), self.bin_code)
+            )
+        return True
+
+    # --- 1.7.4 Bereich anlegen (Zone x Gänge x Regale x Ebenen) ---
+    @staticmethod
+    def generate(zone, aisles, shelves, levels, capacity=None):
+        """Legt alle Kombinationen an; vorhandene Codes bleiben unverändert.
+
+        aisles/shelves/levels: range oder Liste. Liefert die Anzahl neu angelegter Plätze.
+        """
+        zone = normalize_bin_code(zone)
+        if not zone.isalpha():
+            raise ValueError("Zone muss aus Buchstaben bestehen, z. B. 'A'")
+        if capacity is not None and capacity < 0:
+            raise ValueError("Kapazität darf nicht negativ sein")
+        rows = [(format_bin_code(zone, aisle, shelf, level), zone, aisle, shelf, level, capacity)
+                for aisle in aisles for shelf in shelves for level in levels]
+        if not rows:
+            raise ValueError("Bereich ist leer")
+        if len(rows) > MAX_BINS_PER_GENERATE:
+            raise ValueError(f"Höchstens {MAX_BINS_PER_GENERATE:,} Lagerplätze auf einmal")
+
+        try:
+            with transaction() as conn:
+                # Belegung wie in save() aus bereits gebuchten Beständen übernehmen;
+                # nur Duplikate überspringen, Kapazitätsverletzungen melden
+                cursor = conn.executemany("""
+                    INSERT INTO storage_bins (bin_code, zone, aisle, shelf, level, capacity, occupied)
+                    VALUES (?, ?, ?, ?, ?, ?,
+                            COALESCE((SELECT SUM(quantity) FROM stock_balances WHERE bin_code = ?), 0))
+                    ON CONFLICT(bin_code) DO NOTHING
+                """, [(*row, row[0]) for row in rows])
+        except sqlite3.IntegrityError:
+            raise ValueError(f"Bestand übersteigt Kapazität {capacity}: "
+                             f"{', '.join(StorageBin._overfilled(zone, capacity, rows))}")
+        return cursor.rowcount
+
+    # --- 1.7.4.1 Neue Codes, deren Bestand die Kapazität übersteigt ---
+    @staticmethod
+    def _overfilled(zone, capacity, rows):
+        """Codes aus rows, deren gebuchter Bestand die Kapazität übersteigt (max. 10)"""
+        codes = {row[0] for row in rows}
+        low, high = prefix_range(zone)
+        with connection() as conn:
+            overfilled = conn.execute("""
+                SELECT s.bin_code, SUM(s.quantity) FROM stock_balances s
+                WHERE s.bin_code >= ? AND s.bin_code < ?
+                  AND NOT EXISTS (SELECT 1 FROM storage_bins b WHERE b.bin_code = s.bin_code)
+                GROUP BY s.bin_code
+                HAVING SUM(s.quantity) > ?
+                ORDER BY s.bin_code
+            """, (low, high, capacity)).fetchall()
+        return [f"{code} ({quantity})" for code, quantity in overfilled if code in codes][:10]
+
+    # --- 1.7.5 Lagerplätze seitenweise (Präfix oder Zone) ---
+    @staticmethod
+    def query(prefix=None, zone=None, only_free=False, after=None, limit=PAGE_SIZE):
+        """Sortiert nach Code; Präfix nutzt den Primärschlüssel als Bereich"""
+        where, params = [], []
+        if prefix:
+            prefix_where, prefix_params = _prefix_filter(prefix)
+            where.extend(prefix_where)
+            params.extend(prefix_params)
+        if zone:
+            where.append("zone = ?")
+            params.append(normalize_bin_code(zone))
+        if only_free:
+            where.append("active = 1 AND (capacity IS NULL OR free_capacity > 0)")
+        if after is not None:
+            where.append("bin_code > ?")
+            params.append(after)
+        params.append(limit + 1)
+
+        with connection() as conn:
+            table = ResultSet.from_cursor(conn.execute(f"""
+                SELECT {BIN_COLUMNS}
+                FROM storage_bins
+                {"WHERE " + " AND ".join(where) if where else ""}
+                ORDER BY bin_code
+                LIMIT ?
+            """, params))
+
+        next_cursor = None
+        if len(table) > limit:
+            table = table.head(limit)
+            next_cursor = table.row(limit - 1)[0]
+        return table, next_cursor
+
+    # --- 1.7.6 Einlagerungsvorschläge für einen Artikel ---
+    @staticmethod
+    def suggest_putaway(article_id, quantity, zone=None, prefix=None, limit=PUTAWAY_SUGGESTIONS):
+        """Zuerst Plätze, auf denen der Artikel schon liegt (zusammenlegen), dann leere Plätze.
+
+        Beide Teile sind Index-Zugriffe: stock_balances über den Primärschlüssel
+        (article_id, ...), leere Plätze über idx_storage_bins_free bzw. den Code-Bereich.
+        CROSS JOIN legt die Reihenfolge fest – sonst läuft SQLite ggf. alle freien
+        Plätze der Zone ab und sucht zu jedem den Bestand.
+        Innerhalb eines Teils gilt "kleinste passende Lücke zuerst".
+        """
+        where, params = ["b.active = 1", "b.free_capacity > 0", "b.free_capacity >= ?"], [quantity]
+        if zone:
+            where.append("b.zone = ?")
+            params.append(normalize_bin_code(zone))
+        if prefix:
+            prefix_where, prefix_params = _prefix_filter(prefix, "b.")
+            where.extend(prefix_where)
+            params.extend(prefix_params)
+        filters = " AND ".join(where)
+
+        with connection() as conn:
+            return ResultSet.from_cursor(conn.execute(f"""
+                SELECT * FROM (
+                    SELECT b.bin_code, b.zone, b.capacity, b.occupied, b.free_capacity,
+                           s.quantity AS article_quantity, 'Zusammenlegen' AS reason
+                    FROM stock_balances s
+                    CROSS JOIN storage_bins b ON b.bin_code = s.bin_code
+                    WHERE s.article_id = ? AND s.quantity > 0 AND {filters}
+                    ORDER BY b.free_capacity, b.bin_code
+                    LIMIT ?
+                )
+                UNION ALL
+                SELECT * FROM (
+                    SELECT b.bin_code, b.zone, b.capacity, b.occupied, b.free_capacity,
+                           0, 'Leer'
+                    FROM storage_bins b
+                    WHERE b.occupied = 0 AND {filters}
+                    ORDER BY b.free_capacity, b.bin_code
+                    LIMIT ?
+                )
+                LIMIT ?
+            """, [article_id, *params, limit, *params, limit, limit]))
+
+    # --- 1.7.7 Belegung gegen Bestände prüfen (und reparieren) ---
+    @staticmethod
+    def check_occupancy(repair=False):
+        """Liefert [(bin_code, belegung, summe_bestände)] für Abweichungen"""
+        with transaction() as conn:
+            mismatches = conn.execute("""
+                SELECT b.bin_code, b.occupied, COALESCE(SUM(s.quantity), 0) AS actual
+                FROM storage_bins b
+                LEFT JOIN stock_balances s ON s.bin_code = b.bin_code
+                GROUP BY b.bin_code
+                HAVING b.occupied <> actual
+            """).fetchall()
+            if mismatches and repair:
+                conn.executemany(
+                    "UPDATE storage_bins SET occupied = ? WHERE bin_code = ?",
+                    [(actual, bin_code) for bin_code, _, actual in mismatches]
+                )
+        return mismatches
+
+    # --- 1.7.8 Einzelnen Lagerplatz laden ---
+    @classmethod
+    def find_by_code(cls, bin_code):
+        with connection() as conn:
+            row = conn.execute(
+                "SELECT bin_code, capacity, active, occupied FROM storage_bins WHERE bin_code = ?",
+                (normalize_bin_code(bin_code),)
+            ).fetchone()
+        return cls(row[0], capacity=row[1], active=bool(row[2]), occupied=row[3]) if row else None
@@ -1,18 +1,43 @@
-from models.base_model import BaseModel
 import sqlite3
-from config import DB_NAME
+from models.base_model import BaseModel, ConflictError
+from utils.database import connection, transaction
+from utils.cache import cached_query, bump_version
+from utils.session_epochs import epoch_registry
+from models.result_set import ResultSet
+from constants import PAGE_SIZE
+
+
+# ---- 1.4.0 Gecachte User-Abfrage (liefert unveränderliche ResultSets) ----
+@cached_query("users")
+def _fetch_user_table(sql, params=()):
+    with connection() as conn:
+        return ResultSet.from_cursor(conn.execute(sql, params))
+
+
+# ---- 1.4.0.1 Gecachte Rollen-Zuordnung (Rollen ändern sich praktisch nie) ----
+@cached_query("roles")
+def _fetch_role_table():
+    with connection() as conn:
+        return ResultSet.from_cursor(conn.execute("SELECT role_name, role_id FROM roles"))
+
+
+def get_role_ids():
+    """{role_name: role_id} aus dem Lese-Cache"""
+    return dict(_fetch_role_table().rows())
 
 
 # ----- 1.4 USER-Daten-Modell -----
 # ---- 1.4.1 User-Klassen-Initialisierung ----
 class User(BaseModel):
-    def __init__(self, user_id=None, username=None, hashed_password=None, role_id= None, role_name=None):
+    def __init__(self, user_id=None, username=None, hashed_password=None, role_id= None, role_name=None,
+                 row_version=1):
         super().__init__()
         self.user_id = user_id
         self.username = username
         self.hashed_password = hashed_password
         self.role_id = role_id
         self.role_name = role_name
+        self.row_version = row_version
 
     # ---- 1.4.2 User-Validierung ----
     def validate(self):
@@ -27,82 +52,286 @@ class User(BaseModel):
     # ---- 1.4.3 User-Daten-Änderung ----
     def save(self):
         """Speichert User-Änderungen(erstmal Nur Rollenänderung)"""
-        conn = self.get_connection()
-        c = conn.cursor()
-        try:
-            c.execute("""
-                    UPDATE users SET role_id = ? WHERE user_id = ?
-                    """, (self.role_id, self.user_id))
-            
-            conn.commit()
-            return True
-        except Exception as e:
-            conn.rollback()
-            raise e
-        finally:
-            conn.close()
+        with self.transaction() as conn:
+            self._update_role_id(conn, self.role_id)
+            epoch = epoch_registry.bump(conn, self.user_id)
+        bump_version("users")
+        epoch_registry.publish(self.user_id, epoch)
+        return True
+
+    # ---- 1.4.3.1 Bedingtes Rollen-Update (optimistische Sperre) ----
+    def _update_role_id(self, conn, role_id):
+        """Schreibt nur, wenn row_version noch dem geladenen Stand entspricht"""
+        cursor = conn.execute("""
+                UPDATE users SET role_id = ?, row_version = row_version + 1
+                WHERE user_id = ? AND row_version = ?
+                """, (role_id, self.user_id, self.row_version))
+        if cursor.rowcount == 0:
+            current = self.find_by_id(self.user_id)
+            if current is None:
+                raise ValueError("User nicht gefunden")
+            raise ConflictError(
+                f"{current.username} wurde zwischenzeitlich geändert "
+                f"(aktuelle Rolle: {current.role_name})",
+                current, ["role_name"]
+            )
+        self.row_version += 1
 
     # ---- 1.4.4 Generierung aller User samt Rollen aus DB ----
     @classmethod
     def get_all_with_roles(cls):
         """Lädt alle User mit Rollen-Namen"""
-        conn = sqlite3.connect(DB_NAME)
-        c = conn.cursor()
-        try:
-            c.execute("""
-                    SELECT u.user_id, u.username, u.hashed_password, u.role_id, r.role_name
+        table = _fetch_user_table("""
+                    SELECT u.user_id, u.username, u.hashed_password, u.role_id, r.role_name, u.row_version
                     FROM users u
                     JOIN roles r ON u.role_id = r.role_id
                     ORDER BY u.username
                     """)
-            results = c.fetchall()
-
-            users = []
-            for result in results:
-                user = cls()
-                (user.user_id, user.username, user.hashed_password,
-                user.role_id, user.role_name) = result
-                users.append(user)
-            return users
-        finally:
-            conn.close()
+        return [cls(*result) for result in table.rows()]
+
+    # ---- 1.4.4.1 User nach User-ID finden ----
+    @classmethod
+    def find_by_id(cls, user_id):
+        """Sucht einen User samt Rolle anhand seiner ID"""
+        with connection() as conn:
+            result = conn.execute("""
+                    SELECT u.user_id, u.username, u.hashed_password, u.role_id, r.role_name, u.row_version
+                    FROM users u
+                    JOIN roles r ON u.role_id = r.role_id
+                    WHERE u.user_id = ?
+                    """, (user_id,)).fetchone()
+        return cls(*result) if result else None
 
     # ---- 1.4.5 Generierung aller User mit Rolle "Wartend" aus DB ----
     @classmethod
     def get_waiting_users(cls):
         """Lädt nur User mit der Rolle 'wartend'"""
-        all_users = cls.get_all_with_roles()
-        return [user for user in all_users if user.role_name == "Wartend"]
+        waiting_users, _ = cls.query(role="Wartend", limit=None)
+        return waiting_users
 
     # ---- 1.4.6 Änderung der Rolle eines Users ---- 
     def update_role(self, new_role_name):
         """Ändert die Rolle eines Users"""
-        conn = self.get_connection()
-        c = conn.cursor()
+        # role_id für role_name aus der gecachten Zuordnung
+        new_role_id = get_role_ids().get(new_role_name)
+        if new_role_id is None:
+            raise ValueError(f"Rolle '{new_role_name}' nicht gefunden")
+
+        with self.transaction() as conn:
+            # Update user role (nur wenn seit dem Laden unverändert)
+            self._update_role_id(conn, new_role_id)
+
+            # Laufende Sessions des Users über die neue Rolle informieren
+            epoch = epoch_registry.bump(conn, self.user_id)
+        bump_version("users")
+        epoch_registry.publish(self.user_id, epoch)
+
+        # Update object
+        self.role_id = new_role_id
+        self.role_name = new_role_name
+
+        return True
+
+    # ---- 1.4.6.1 Rollen mehrerer User in einer Transaktion ändern ----
+    @classmethod
+    def update_roles_bulk(cls, assignments):
+        """assignments: [(user_id, role_name, erwartete_version oder None)].
+
+        Jede Zuweisung wird einzeln geprüft (User per ID, Rolle aus dem Cache);
+        fehlerhafte Zeilen werden übersprungen, alle übrigen gemeinsam committet.
+        Liefert [(user_id, username, alte_rolle, neue_rolle, fehler oder None)].
+        """
+        role_ids = get_role_ids()
+        results, epochs = [], []
+
+        with transaction() as conn:
+            for user_id, role_name, expected_version in assignments:
+                row = conn.execute("""
+                    SELECT u.username, r.role_name, u.row_version
+                    FROM users u
+                    JOIN roles r ON u.role_id = r.role_id
+                    WHERE u.user_id = ?
+                """, (user_id,)).fetchone()
+                if row is None:
+                    results.append((user_id, None, None, role_name, "User nicht gefunden"))
+                    continue
+
+                username, old_role, row_version = row
+                role_id = role_ids.get(role_name)
+                if role_id is None:
+                    results.append((user_id, username, old_role, role_name,
+                                    f"Rolle '{role_name}' nicht gefunden"))
+                    continue
+                if expected_version is not None and expected_version != row_version:
+                    results.append((user_id, username, old_role, role_name,
+                                    f"Zwischenzeitlich geändert (aktuelle Rolle: {old_role})"))
+                    continue
+
+                conn.execute("""
+                    UPDATE users SET role_id = ?, row_version = row_version + 1
+                    WHERE user_id = ?
+                """, (role_id, user_id))
+                epochs.append((user_id, epoch_registry.bump(conn, user_id)))
+                results.append((user_id, username, old_role, role_name, None))
+
+        if epochs:
+            bump_version("users")
+            for user_id, epoch in epochs:
+                epoch_registry.publish(user_id, epoch)
+        return results
+
+    # ---- 1.4.7 User gefiltert und seitenweise laden ----
+    @classmethod
+    def query_table(cls, role=None, search=None, after=None, limit=PAGE_SIZE):
+        """Filtert nach Rolle/Namensteil in SQL, blättert per Keyset auf username.
+
+        Liefert (ResultSet, next_cursor); next_cursor ist None auf der letzten Seite.
+        limit=None lädt alle Treffer ohne Paging.
+        """
+        where, params = [], []
+
+        if role:
+            where.append("r.role_name = ?")
+            params.append(role)
+
+        if search:
+            where.append("u.username LIKE ? ESCAPE '\\'")
+            escaped = search.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+            params.append(f"%{escaped}%")
+
+        if after is not None:
+            where.append("u.username > ?")
+            params.append(after)
+
+        sql = """
+            SELECT u.user_id, u.username, u.hashed_password, u.role_id, r.role_name, u.row_version
+            FROM users u
+            JOIN roles r ON u.role_id = r.role_id
+        """
+        if where:
+            sql += " WHERE " + " AND ".join(where)
+        sql += " ORDER BY u.username"
+        if limit is not None:
+            # Einen Datensatz mehr laden, um das Seitenende zu erkennen
+            sql += " LIMIT ?"
+            params.append(limit + 1)
+
+        table = _fetch_user_table(sql, tuple(params))
+
+        next_cursor = None
+        if limit is not None and len(table) > limit:
+            table = table.head(limit)
+            next_cursor = table.row(limit - 1)[1]
+
+        return table, next_cursor
+
+    # ---- 1.4.8 Wie query_table, aber als User-Objekte ----
+    @classmethod
+    def query(cls, role=None, search=None, after=None, limit=PAGE_SIZE):
+        """Liefert (users, next_cursor) – siehe query_table"""
+        table, next_cursor = cls.query_table(role=role, search=search, after=after, limit=limit)
+        return [cls(*result) for result in table.rows()], next_cursor
+
+    # ---- 1.4.9 Benutzernamen-Suche (indexgestützt, gedeckelt und seitenweise) ----
+    # Ab dieser Länge Teilstring-Suche per Trigram-Index, darunter Präfix-Suche
+    TRIGRAM_MIN_LENGTH = 3
+
+    @classmethod
+    def search(cls, term, role=None, limit=PAGE_SIZE, cursor=None):
+        """Sucht User nach Namensteil; blättert per Keyset auf username.
+
+        Liefert (users, next_cursor) wie query(); ohne Suchbegriff wie query().
+        """
+        term = (term or "").strip()
+        if not term:
+            return cls.query(role=role, after=cursor, limit=limit)
+
+        where, params = [], []
+        if len(term) >= cls.TRIGRAM_MIN_LENGTH:
+            # Phrase in Anführungszeichen: keine FTS5-Syntax aus der Eingabe
+            source = "users_fts JOIN users u ON u.user_id = users_fts.rowid"
+            where.append("users_fts MATCH ?")
+            params.append('"' + term.replace('"', '""') + '"')
+            order = "u.username"
+        else:
+            # Bereich auf idx_users_username_nocase, in Indexreihenfolge (ohne Sortieren)
+            source = "users u"
+            where.append("u.username >= ? COLLATE NOCASE AND u.username < ? COLLATE NOCASE")
+            params.extend([term, term + "\U0010ffff"])
+            order = "u.username COLLATE NOCASE"
+
+        if role:
+            where.append("r.role_name = ?")
+            params.append(role)
+
+        if cursor is not None:
+            where.append(f"{order} > ?")
+            params.append(cursor)
+
+        params.append(limit + 1)
+        table = _fetch_user_table(f"""
+            SELECT u.user_id, u.username, u.hashed_password, u.role_id, r.role_name, u.row_version
+            FROM {source}
+            JOIN roles r ON u.role_id = r.role_id
+            WHERE {" AND ".join(where)}
+            ORDER BY {order}
+            LIMIT ?
+        """, tuple(params))
+
+        next_cursor = None
+        if len(table) > limit:
+            table = table.head(limit)
+            next_cursor = table.row(limit - 1)[1]
+
+        return [cls(*result) for result in table.rows()], next_cursor
+
+    # ---- 1.4.10 User je Rolle zählen ----
+    ROLE_COUNTS_SQL = """
+        SELECT r.role_name, rc.user_count
+        FROM role_counts rc
+        JOIN roles r ON rc.role_id = r.role_id
+        ORDER BY r.role_id
+    """
+
+    ROLE_COUNTS_GROUPED_SQL = """
+        SELECT r.role_name, COUNT(u.user_id)
+        FROM roles r
+        LEFT JOIN users u ON u.role_id = r.role_id
+        GROUP BY r.role_id
+        ORDER BY r.role_id
+    """
+
+    @classmethod
+    def count_by_role(cls):
+        """{rolle: anzahl} aus der per Trigger gepflegten Tabelle role_counts.
+
+        Liest nur eine Zeile je Rolle; fehlt die Tabelle (alte DB), wird per
+        GROUP BY über users gezählt.
+        """
         try:
-            # Hole role_id für role_name
-            c.execute("SELECT role_id FROM roles WHERE role_name = ?", (new_role_name,))
-            result = c.fetchone()
-
-            if not result:
-                raise ValueError(f"Rolle '{new_role_name}' nicht gefunden")
-            
-            new_role_id = result[0]
-
-            # Update user role
-            c.execute("""
-                    UPDATE users SET role_id = ? WHERE user_id = ?
-                    """, (new_role_id, self.user_id))
-            
-            conn.commit()
-
-            # Update object
-            self.role_id = new_role_id
-            self.role_name = new_role_name
-
-            return True
-        except Exception as e:
-            conn.rollback()
-            raise e
-        finally:
-            conn.close()
\ No newline at end of file
+            table = _fetch_user_table(cls.ROLE_COUNTS_SQL)
+        except sqlite3.OperationalError:
+            table = _fetch_user_table(cls.ROLE_COUNTS_GROUPED_SQL)
+        return dict(table.rows())
+
+    # ---- 1.4.11 Zähler gegen echte Zählung prüfen (und reparieren) ----
+    @classmethod
+    def check_role_counts(cls, repair=False):
+        """Liefert [(rolle, gezählt_in_role_counts, tatsächlich)] für Abweichungen"""
+        with transaction() as conn:
+            stored = dict(conn.execute(cls.ROLE_COUNTS_SQL).fetchall())
+            actual = dict(conn.execute(cls.ROLE_COUNTS_GROUPED_SQL).fetchall())
+            mismatches = [(role, stored.get(role), count)
+                          for role, count in actual.items() if stored.get(role) != count]
+
+            if mismatches and repair:
+                conn.execute("""
+                    INSERT OR REPLACE INTO role_counts (role_id, user_count)
+                    SELECT r.role_id, COUNT(u.user_id)
+                    FROM roles r
+                    LEFT JOIN users u ON u.role_id = r.role_id
+                    GROUP BY r.role_id
+                """)
+        if mismatches and repair:
+            bump_version("users")
+        return mismatches
@@ -0,0 +1,182 @@
+import atexit
+import logging
+import queue
+import threading
+import time
+from datetime import datetime, timezone
+import streamlit as st
+from config import AUDIT_QUEUE_SIZE, AUDIT_BATCH_SIZE, AUDIT_FLUSH_SECONDS
+from utils.database import get_database_name, connection, transaction
+from constants import PAGE_SIZE
+
+# ----- 0.11 AUDIT-LOG -----
+# Admin-Aktionen landen zuerst in einer prozessweiten Queue (nur ein put im
+# Klickpfad). Ein Hintergrund-Thread schreibt sie gesammelt in admin_logs:
+# spätestens AUDIT_FLUSH_SECONDS nach dem ersten wartenden Eintrag oder bei
+# AUDIT_BATCH_SIZE Einträgen, jeweils in EINER Transaktion. Benutzernamen
+# werden über eine gecachte Zuordnung username -> user_id aufgelöst.
+
+logger = logging.getLogger("synageion.audit")
+
+MAX_WRITE_ATTEMPTS = 3
+
+
+# ---- 0.11.1 Hintergrund-Writer ----
+class AuditWriter:
+    def __init__(self, max_queue=AUDIT_QUEUE_SIZE, batch_size=AUDIT_BATCH_SIZE,
+                 flush_seconds=AUDIT_FLUSH_SECONDS):
+        self.batch_size = batch_size
+        self.flush_seconds = flush_seconds
+        self._queue = queue.Queue(maxsize=max_queue)
+        self._user_ids = {}
+        self._thread = None
+        self._start_lock = threading.Lock()
+        self._stats = {"queued": 0, "written": 0, "batches": 0, "direct": 0, "failed": 0}
+
+    # --- 0.11.1.1 Eintrag einreihen (Klickpfad) ---
+    def enqueue(self, admin_username, action, target):
+        entry = (get_database_name(), admin_username, action, target,
+                 datetime.now(timezone.utc).strftime("%Y-%m-%d %H:%M:%S"))
+        self._ensure_started()
+        try:
+            self._queue.put_nowait(entry)
+            self._stats["queued"] += 1
+            return
+        except queue.Full:
+            self._stats["direct"] += 1
+
+        # Überlast: lieber einmal synchron schreiben als Einträge verlieren. Die
+        # protokollierte Aktion ist bereits gespeichert – Fehler nur loggen.
+        try:
+            self._write([entry])
+        except Exception:
+            self._stats["failed"] += 1
+            logger.exception("Audit-Eintrag verworfen (%s: %s)", action, target)
+
+    def _ensure_started(self):
+        if self._thread is not None and self._thread.is_alive():
+            return
+        with self._start_lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name="audit-writer", daemon=True)
+                self._thread.start()
+
+    # --- 0.11.1.2 Queue in Batches leeren ---
+    def _run(self):
+        while True:
+            batch = [self._queue.get()]
+            deadline = time.monotonic() + self.flush_seconds
+            while len(batch) < self.batch_size:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(self._queue.get(timeout=remaining))
+                except queue.Empty:
+                    break
+
+            for attempt in range(1, MAX_WRITE_ATTEMPTS + 1):
+                try:
+                    self._write(batch)
+                    break
+                except Exception:
+                    if attempt == MAX_WRITE_ATTEMPTS:
+                        self._stats["failed"] += len(batch)
+                        logger.exception("Audit-Batch mit %d Einträgen verworfen", len(batch))
+                    else:
+                        time.sleep(self.flush_seconds)
+
+            for _ in batch:
+                self._queue.task_done()
+
+    # --- 0.11.1.3 Batch schreiben (Group-Commit je Datenbank) ---
+    def _write(self, batch):
+        by_db = {}
+        for db_name, *entry in batch:
+            by_db.setdefault(db_name, []).append(entry)
+
+        for db_name, entries in by_db.items():
+            with transaction(db_name) as conn:
+                user_ids = self._resolve_user_ids(conn, db_name, {entry[0] for entry in entries})
+                conn.executemany("""
+                    INSERT INTO admin_logs (admin_id, action, target, timestamp)
+                    VALUES (?, ?, ?, ?)
+                """, [(user_ids.get(username), action, target, timestamp)
+                      for username, action, target, timestamp in entries])
+            self._stats["written"] += len(entries)
+            self._stats["batches"] += 1
+
+    # --- 0.11.1.4 Benutzernamen auflösen (gecacht) ---
+    def _resolve_user_ids(self, conn, db_name, usernames):
+        cache = self._user_ids.setdefault(db_name, {})
+        missing = [name for name in usernames if name not in cache]
+        if missing:
+            placeholders = ", ".join("?" * len(missing))
+            cache.update(conn.execute(
+                f"SELECT username, user_id FROM users WHERE username IN ({placeholders})", missing
+            ).fetchall())
+        return cache
+
+    # --- 0.11.1.5 Auf geschriebene Einträge warten (Tests, Shutdown) ---
+    def flush(self, timeout=5.0):
+        """Wartet, bis alle eingereihten Einträge geschrieben sind"""
+        deadline = time.monotonic() + timeout
+        while self._queue.unfinished_tasks and time.monotonic() < deadline:
+            time.sleep(0.01)
+        return not self._queue.unfinished_tasks
+
+    # --- 0.11.1.6 Statistiken ---
+    def stats(self):
+        stats = dict(self._stats)
+        stats.update({
+            "pending": self._queue.qsize(),
+            "batch_size": self.batch_size,
+            "flush_seconds": self.flush_seconds,
+        })
+        return stats
+
+
+# ---- 0.11.2 Prozessweite Instanz ----
+audit_writer = AuditWriter()
+atexit.register(audit_writer.flush)
+
+
+# ---- 0.11.3 Aktion protokollieren ----
+def audit(action, target, actor=None):
+    """Reiht eine Aktion ein; actor = Benutzername (Standard: angemeldeter User)"""
+    actor = actor or st.session_state.get("username")
+    audit_writer.enqueue(actor, action, target)
+
+
+# ---- 0.11.4 Protokoll seitenweise lesen (neueste zuerst) ----
+def query_admin_logs(action=None, admin_username=None, before=None, limit=PAGE_SIZE):
+    """Keyset-Paging über log_id; liefert (zeilen, next_cursor)"""
+    where, params = [], []
+    if action:
+        where.append("l.action = ?")
+        params.append(action)
+    if admin_username:
+        where.append("l.admin_id = (SELECT user_id FROM users WHERE username = ?)")
+        params.append(admin_username)
+    if before is not None:
+        where.append("l.log_id < ?")
+        params.append(before)
+
+    sql = """
+        SELECT l.log_id, l.timestamp, u.username, l.action, l.target
+        FROM admin_logs l
+        LEFT JOIN users u ON l.admin_id = u.user_id
+    """
+    if where:
+        sql += " WHERE " + " AND ".join(where)
+    sql += " ORDER BY l.log_id DESC LIMIT ?"
+    params.append(limit + 1)
+
+    with connection() as conn:
+        rows = conn.execute(sql, params).fetchall()
+
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = rows[-1][0]
+    return rows, next_cursor
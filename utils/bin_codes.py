@@ -0,0 +1,48 @@
+import re
+
+# ----- 0.12 LAGERPLATZ-CODES -----
+# Aufbau: <Zone><Gang>-<Regal>-<Ebene>, z. B. "A1-01-02" = Zone A, Gang 1,
+# Regal 1, Ebene 2. Codes, die nicht diesem Schema folgen (z. B. "WE-01" für
+# die Wareneingangszone), sind erlaubt; dann ist nur die Zone bekannt.
+
+BIN_CODE_PATTERN = re.compile(r"^([A-Z]+)(\d+)-(\d+)-(\d+)$")
+# Präfix mit vollständigem Gang ("A1", "A1-0", "A1-02-01"); Gangnummern sind nicht
+# aufgefüllt, "A1" ist als Text also auch Präfix von "A10-..."
+AISLE_PREFIX_PATTERN = re.compile(r"^([A-Z]+)(\d+)(?:-|$)")
+ZONE_PATTERN = re.compile(r"^([A-Z]+)")
+
+
+# ---- 0.12.1 Code normalisieren ----
+def normalize_bin_code(code):
+    return (code or "").strip().upper()
+
+
+# ---- 0.12.2 Code in Hierarchie zerlegen ----
+def parse_bin_code(code):
+    """Liefert (zone, gang, regal, ebene); unbekannte Teile sind None"""
+    code = normalize_bin_code(code)
+    match = BIN_CODE_PATTERN.match(code)
+    if match:
+        zone, aisle, shelf, level = match.groups()
+        return zone, int(aisle), int(shelf), int(level)
+    zone = ZONE_PATTERN.match(code)
+    return (zone.group(1) if zone else code), None, None, None
+
+
+# ---- 0.12.3 Code aus Hierarchie bilden ----
+def format_bin_code(zone, aisle, shelf, level):
+    return f"{normalize_bin_code(zone)}{aisle}-{shelf:02d}-{level:02d}"
+
+
+# ---- 0.12.4 Präfix als Bereich (für Index-Suche über den Primärschlüssel) ----
+def prefix_range(prefix):
+    """Präfix "A1-0" -> (low, high) für bin_code >= low AND bin_code < high"""
+    prefix = normalize_bin_code(prefix)
+    return prefix, prefix + "\uffff"
+
+
+# ---- 0.12.5 Gang aus einem Präfix ----
+def prefix_aisle(prefix):
+    """"A1-0" -> ("A", 1); None, wenn der Präfix keinen vollständigen Gang nennt"""
+    match = AISLE_PREFIX_PATTERN.match(normalize_bin_code(prefix))
+    return (match.group(1), int(match.group(2))) if match else None
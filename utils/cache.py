@@ -0,0 +1,105 @@
+import threading
+import time
+from collections import OrderedDict
+from functools import wraps
+from config import CACHE_MAX_ENTRIES, CACHE_TTL_SECONDS
+from utils.database import get_database_name
+
+# ----- 0.3 LESE-CACHE -----
+# Prozessweiter LRU-Cache für Abfrageergebnisse, den alle Sessions teilen.
+# Jeder Eintrag ist an den Datenstand (Versionszähler) seines Namensraums
+# gebunden. Schreibende Methoden erhöhen den Zähler nach dem Commit; alte
+# Einträge werden damit nie wieder getroffen und altern per LRU heraus.
+# Die TTL begrenzt die Veralterung bei Schreibzugriffen anderer Prozesse.
+
+
+# ---- 0.3.1 Versionierter LRU-Cache ----
+class VersionedCache:
+    def __init__(self, max_entries=CACHE_MAX_ENTRIES, ttl_seconds=CACHE_TTL_SECONDS):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._entries = OrderedDict()
+        self._versions = {}
+        self._lock = threading.Lock()
+        self._stats = {"hits": 0, "misses": 0, "evictions": 0, "invalidations": 0}
+
+    # --- 0.3.1.1 Datenstand eines Namensraums ---
+    def get_version(self, namespace):
+        return self._versions.get(namespace, 0)
+
+    # --- 0.3.1.2 Datenstand erhöhen (nach Commit aufrufen!) ---
+    def bump_version(self, *namespaces):
+        with self._lock:
+            for namespace in namespaces:
+                self._versions[namespace] = self._versions.get(namespace, 0) + 1
+                self._stats["invalidations"] += 1
+
+    # --- 0.3.1.3 Lesen oder laden ---
+    def get_or_load(self, namespace, key, loader):
+        """Liefert den Cache-Wert oder ruft loader() auf und speichert das Ergebnis"""
+        # Version VOR dem Laden festhalten: ein parallel committeter Schreiber
+        # erhöht sie danach, sodass ein evtl. veraltetes Ergebnis nie getroffen wird
+        full_key = (namespace, self.get_version(namespace), key)
+        now = time.monotonic()
+
+        with self._lock:
+            entry = self._entries.get(full_key)
+            if entry is not None and now - entry[0] < self.ttl_seconds:
+                self._entries.move_to_end(full_key)
+                self._stats["hits"] += 1
+                return entry[1]
+            self._stats["misses"] += 1
+
+        value = loader()
+
+        with self._lock:
+            self._entries[full_key] = (now, value)
+            self._entries.move_to_end(full_key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self._stats["evictions"] += 1
+
+        return value
+
+    # --- 0.3.1.4 Alles verwerfen ---
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    # --- 0.3.1.5 Statistiken ---
+    def stats(self):
+        with self._lock:
+            stats = dict(self._stats)
+            stats.update({
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "versions": dict(self._versions),
+            })
+        lookups = stats["hits"] + stats["misses"]
+        stats["hit_rate"] = round(stats["hits"] / lookups, 3) if lookups else 0.0
+        return stats
+
+
+# ---- 0.3.2 Prozessweite Instanz ----
+read_cache = VersionedCache()
+
+
+# ---- 0.3.3 Decorator für Lese-Abfragen ----
+def cached_query(namespace):
+    """Cacht das Ergebnis einer Lese-Funktion unter ihren Argumenten.
+
+    Die Funktion muss unveränderliche Werte liefern (z.B. Tupel von Zeilen),
+    da alle Sessions dasselbe Objekt erhalten.
+    """
+    def decorator(fetch):
+        @wraps(fetch)
+        def wrapper(*args, **kwargs):
+            key = (get_database_name(), fetch.__qualname__, args, tuple(sorted(kwargs.items())))
+            return read_cache.get_or_load(namespace, key, lambda: fetch(*args, **kwargs))
+        return wrapper
+    return decorator
+
+
+def bump_version(*namespaces):
+    """Invalidiert alle Cache-Einträge der Namensräume (nach dem Commit)"""
+    read_cache.bump_version(*namespaces)
@@ -0,0 +1,40 @@
+import ipaddress
+
+# ----- 0.13 CLIENT-ADRESSE (LOGIN-THROTTLE) -----
+# X-Forwarded-For setzt der Client selbst – ausgewertet wird der Header nur,
+# wenn die Verbindung von einem konfigurierten Proxy (TRUSTED_PROXIES) kommt.
+# Dann gilt der rechteste Eintrag, der kein vertrauenswürdiger Proxy ist:
+# alles links davon kann der Client frei wählen.
+
+
+# ---- 0.13.1 Proxy-Liste aus der Konfiguration ----
+def parse_trusted_proxies(value):
+    """"10.0.0.1, 172.16.0.0/12" -> [ip_network, ...]; ungültige Einträge -> ValueError"""
+    return [ipaddress.ip_network(entry.strip(), strict=False)
+            for entry in (value or "").split(",") if entry.strip()]
+
+
+# ---- 0.13.2 Adresse gegen Proxy-Liste prüfen ----
+def _is_trusted(address, trusted_proxies):
+    try:
+        ip = ipaddress.ip_address(address)
+    except ValueError:
+        return False
+    return any(ip in network for network in trusted_proxies)
+
+
+# ---- 0.13.3 Client-IP ermitteln ----
+def resolve_client_ip(peer_ip, forwarded_for, trusted_proxies):
+    """Liefert die Client-IP aus Socket-Adresse und X-Forwarded-For.
+
+    Ohne vertrauenswürdigen Proxy als Gegenstelle zählt nur peer_ip.
+    """
+    if not peer_ip or not forwarded_for or not _is_trusted(peer_ip, trusted_proxies):
+        return peer_ip
+
+    hops = [hop.strip() for hop in forwarded_for.split(",") if hop.strip()]
+    for hop in reversed(hops):
+        if not _is_trusted(hop, trusted_proxies):
+            return hop
+    # Nur Proxys in der Kette: der äußerste ist die beste bekannte Adresse
+    return hops[0] if hops else peer_ip
@@ -0,0 +1,211 @@
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from config import (DB_NAME, DB_POOL_SIZE, DB_POOL_TIMEOUT,
+                    DB_BUSY_TIMEOUT_MS, DB_CACHED_STATEMENTS)
+
+# ----- 0.1 DB-VERBINDUNGSMANAGER -----
+# Ein Pool pro Datenbankdatei und Streamlit-Serverprozess. Verbindungen werden
+# einmalig mit PRAGMAs konfiguriert und danach zwischen Sessions/Threads
+# wiederverwendet. Innerhalb eines Threads ist die Ausleihe reentrant, d.h.
+# verschachtelte Aufrufe teilen sich dieselbe Verbindung (und Transaktion).
+
+_pools = {}
+_pools_lock = threading.Lock()
+_default_db = DB_NAME
+
+
+# ---- 0.1.1 Connection-Pool ----
+class ConnectionPool:
+    def __init__(self, db_name, max_size=DB_POOL_SIZE, timeout=DB_POOL_TIMEOUT):
+        self.db_name = db_name
+        self.max_size = max_size
+        self.timeout = timeout
+        self._idle = []  # LIFO: zuletzt genutzte Verbindung hat den wärmsten Cache
+        self._available = threading.Condition(threading.Lock())
+        self._local = threading.local()
+        self._created = 0
+        self._stats = {
+            "acquired": 0,
+            "reused": 0,
+            "waits": 0,
+            "wait_time_ms": 0.0,
+            "transactions": 0,
+            "rollbacks": 0,
+        }
+
+    # --- 0.1.1.1 Verbindung erstellen und konfigurieren ---
+    def _create_connection(self):
+        """Öffnet eine neue Verbindung und setzt die PRAGMAs genau einmal"""
+        conn = sqlite3.connect(
+            self.db_name,
+            timeout=DB_BUSY_TIMEOUT_MS / 1000,
+            isolation_level=None,  # Transaktionen explizit über transaction()
+            check_same_thread=False,  # Pool serialisiert die Nutzung
+            cached_statements=DB_CACHED_STATEMENTS
+        )
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.execute(f"PRAGMA busy_timeout={int(DB_BUSY_TIMEOUT_MS)}")
+        conn.execute("PRAGMA foreign_keys=ON")
+        return conn
+
+    # --- 0.1.1.2 Verbindung ausleihen ---
+    def _acquire(self):
+        with self._available:
+            started = None
+            while True:
+                if self._idle:
+                    self._stats["acquired"] += 1
+                    self._stats["reused"] += 1
+                    break
+                if self._created < self.max_size:
+                    # Slot reservieren, Verbindung außerhalb des Locks öffnen
+                    self._created += 1
+                    self._stats["acquired"] += 1
+                    break
+
+                if started is None:
+                    started = time.perf_counter()
+                    self._stats["waits"] += 1
+                remaining = self.timeout - (time.perf_counter() - started)
+                if remaining <= 0 or not self._available.wait(remaining):
+                    if not self._idle and self._created >= self.max_size:
+                        raise sqlite3.OperationalError(
+                            f"Keine freie DB-Verbindung nach {self.timeout}s (Pool erschöpft)"
+                        )
+
+            if started is not None:
+                self._stats["wait_time_ms"] += (time.perf_counter() - started) * 1000
+            if self._idle:
+                return self._idle.pop()
+
+        try:
+            return self._create_connection()
+        except Exception:
+            with self._available:
+                self._created -= 1
+                self._available.notify()
+            raise
+
+    # --- 0.1.1.3 Verbindung zurückgeben ---
+    def _release(self, conn):
+        if conn.in_transaction:
+            # Nie eine offene Transaktion an die nächste Session weiterreichen
+            conn.rollback()
+        with self._available:
+            self._idle.append(conn)
+            self._available.notify()
+
+    # --- 0.1.1.4 Verbindung als Context-Manager ---
+    @contextmanager
+    def connection(self):
+        """Leiht eine Verbindung für die Dauer des with-Blocks aus"""
+        held = getattr(self._local, "conn", None)
+        if held is not None:
+            yield held
+            return
+
+        conn = self._acquire()
+        self._local.conn = conn
+        try:
+            yield conn
+        finally:
+            self._local.conn = None
+            self._release(conn)
+
+    # --- 0.1.1.5 Transaktion als Context-Manager ---
+    @contextmanager
+    def transaction(self, immediate=True):
+        """Commit bei Erfolg, Rollback bei Fehler; verschachtelt = äußere Transaktion"""
+        with self.connection() as conn:
+            if conn.in_transaction:
+                yield conn
+                return
+
+            # IMMEDIATE holt die Schreibsperre sofort und vermeidet
+            # SQLITE_BUSY beim späteren Upgrade von Lese- auf Schreibsperre
+            conn.execute("BEGIN IMMEDIATE" if immediate else "BEGIN")
+            self._stats["transactions"] += 1
+            try:
+                yield conn
+            except BaseException:
+                conn.rollback()
+                self._stats["rollbacks"] += 1
+                raise
+            else:
+                conn.commit()
+
+    # --- 0.1.1.6 Pool-Statistiken ---
+    def stats(self):
+        """Momentaufnahme der Pool-Auslastung"""
+        with self._available:
+            stats = dict(self._stats)
+            stats.update({
+                "db_name": self.db_name,
+                "max_size": self.max_size,
+                "created": self._created,
+                "idle": len(self._idle),
+                "in_use": self._created - len(self._idle),
+            })
+        return stats
+
+    # --- 0.1.1.7 Pool schließen ---
+    def close(self):
+        """Schließt alle freien Verbindungen (z.B. bei Tests/Benchmarks)"""
+        with self._available:
+            while self._idle:
+                self._idle.pop().close()
+                self._created -= 1
+
+
+# ---- 0.1.2 Modul-Schnittstelle ----
+def get_database_name():
+    """Aktuelle Standard-Datenbank des Prozesses"""
+    return _default_db
+
+
+def set_default_database(db_name):
+    """Setzt die Standard-Datenbank (z.B. für Benchmarks mit Temp-DBs)"""
+    global _default_db
+    _default_db = db_name
+
+
+def get_pool(db_name=None):
+    """Liefert den prozessweiten Pool für eine Datenbankdatei"""
+    db_name = db_name or _default_db
+    pool = _pools.get(db_name)
+    if pool is None:
+        with _pools_lock:
+            pool = _pools.get(db_name)
+            if pool is None:
+                pool = ConnectionPool(db_name)
+                _pools[db_name] = pool
+    return pool
+
+
+def connection(db_name=None):
+    """with connection() as conn: ... (nur lesen oder eigene Transaktion)"""
+    return get_pool(db_name).connection()
+
+
+def transaction(db_name=None, immediate=True):
+    """with transaction() as conn: ... (atomar, Commit/Rollback automatisch)"""
+    return get_pool(db_name).transaction(immediate=immediate)
+
+
+def get_pool_stats():
+    """Statistiken aller Pools dieses Prozesses"""
+    with _pools_lock:
+        pools = list(_pools.values())
+    return [pool.stats() for pool in pools]
+
+
+def close_all_pools():
+    """Schließt alle Pools und vergisst sie"""
+    with _pools_lock:
+        pools = list(_pools.values())
+        _pools.clear()
+    for pool in pools:
+        pool.close()
@@ -0,0 +1,103 @@
+import csv
+import os
+import tempfile
+import time
+from constants import FETCH_BATCH_SIZE, EXPORT_MAX_AGE_SECONDS
+from utils.database import connection
+
+# ----- 0.9 DATEI-EXPORT -----
+# Streamt Abfrageergebnisse batchweise (fetchmany) in eine temporäre Datei,
+# damit auch sehr große Exporte mit konstantem Speicher laufen. Die Datei
+# wird anschließend per st.download_button ausgeliefert.
+# Spaltentypen: "int", "real" oder "text" (für das Parquet-Schema).
+
+EXPORT_DIR = os.path.join(tempfile.gettempdir(), "synageion_exports")
+
+
+# ---- 0.9.1 Verfügbare Formate ----
+def available_formats():
+    """CSV immer, Parquet nur mit installiertem pyarrow"""
+    try:
+        import pyarrow  # noqa: F401
+        return ["csv", "parquet"]
+    except ImportError:
+        return ["csv"]
+
+
+# ---- 0.9.2 Alte Exporte aufräumen ----
+def _cleanup_old_exports(now):
+    for entry in os.scandir(EXPORT_DIR):
+        try:
+            if entry.is_file() and now - entry.stat().st_mtime > EXPORT_MAX_AGE_SECONDS:
+                os.unlink(entry.path)
+        except OSError:
+            pass  # Datei wird evtl. gerade von einer anderen Session ausgeliefert
+
+
+# ---- 0.9.3 CSV schreiben ----
+def _write_csv(cursor, columns, path, batch_size):
+    rows = 0
+    # utf-8-sig + Semikolon: öffnet sich in deutschem Excel direkt korrekt
+    with open(path, "w", encoding="utf-8-sig", newline="") as f:
+        writer = csv.writer(f, delimiter=";")
+        writer.writerow([label for _, label, _ in columns])
+        while True:
+            batch = cursor.fetchmany(batch_size)
+            if not batch:
+                break
+            writer.writerows(batch)
+            rows += len(batch)
+    return rows
+
+
+# ---- 0.9.4 Parquet schreiben (ein Row-Group je Batch) ----
+def _write_parquet(cursor, columns, path, batch_size):
+    try:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+    except ImportError:
+        raise ValueError("Für Parquet-Export muss das Paket 'pyarrow' installiert sein")
+
+    types = {"int": pa.int64(), "real": pa.float64(), "text": pa.string()}
+    schema = pa.schema([(label, types[column_type]) for _, label, column_type in columns])
+
+    rows = 0
+    with pq.ParquetWriter(path, schema) as writer:
+        while True:
+            batch = cursor.fetchmany(batch_size)
+            if not batch:
+                break
+            arrays = [pa.array(values, type=field.type) for values, field in zip(zip(*batch), schema)]
+            writer.write_table(pa.Table.from_arrays(arrays, schema=schema))
+            rows += len(batch)
+    return rows
+
+
+# ---- 0.9.5 Export ausführen ----
+def export_query(from_sql, params, columns, export_format, basename, batch_size=FETCH_BATCH_SIZE):
+    """Schreibt SELECT <columns> <from_sql> in eine Temp-Datei.
+
+    columns: [(sql_ausdruck, überschrift, typ)], from_sql: "FROM ... [WHERE/ORDER BY]".
+    Liefert (pfad, anzahl_zeilen).
+    """
+    writers = {"csv": _write_csv, "parquet": _write_parquet}
+    if export_format not in writers:
+        raise ValueError(f"Nicht unterstütztes Exportformat: {export_format}")
+
+    os.makedirs(EXPORT_DIR, exist_ok=True)
+    now = time.time()
+    _cleanup_old_exports(now)
+
+    fd, path = tempfile.mkstemp(prefix=f"{basename}_", suffix=f".{export_format}", dir=EXPORT_DIR)
+    os.close(fd)
+
+    try:
+        with connection() as conn:
+            select_list = ", ".join(expression for expression, _, _ in columns)
+            cursor = conn.execute(f"SELECT {select_list} {from_sql}", params)
+            rows = writers[export_format](cursor, columns, path, batch_size)
+    except Exception:
+        os.unlink(path)
+        raise
+
+    return path, rows
@@ -0,0 +1,107 @@
+import csv
+import io
+import os
+from abc import ABC, abstractmethod
+
+# ----- 0.8 DATEI-IMPORT -----
+# Liest CSV- und XLSX-Dateien zeilenweise (streamend) als Dicts
+# {Spaltenüberschrift: Wert}. Die Überschriften werden kleingeschrieben
+# und getrimmt; die Fachlogik (Spalten-Zuordnung, Validierung) bleibt im
+# Controller bzw. Model.
+
+SUPPORTED_EXTENSIONS = (".csv", ".xlsx")
+
+
+# ---- 0.8.1 Basis-Reader ----
+class TableReader(ABC):
+    def __init__(self):
+        self.headers = []
+
+    @property
+    def progress(self):
+        """Geschätzter Fortschritt 0..1 (None = unbekannt)"""
+        return None
+
+    @abstractmethod
+    def __iter__(self):
+        """Liefert (zeilennummer, {überschrift: wert}) je Datenzeile"""
+        pass
+
+
+# ---- 0.8.2 CSV (Trennzeichen ; , oder Tab, UTF-8 mit/ohne BOM) ----
+class CsvReader(TableReader):
+    def __init__(self, file):
+        super().__init__()
+        self._raw = file
+        self._raw.seek(0, os.SEEK_END)
+        self._size = self._raw.tell() or 1
+        self._raw.seek(0)
+
+        self._text = io.TextIOWrapper(self._raw, encoding="utf-8-sig", newline="")
+        sample = self._text.read(8192)
+        self._text.seek(0)
+        try:
+            dialect = csv.Sniffer().sniff(sample, delimiters=";,\t")
+        except csv.Error:
+            dialect = csv.excel
+        self._reader = csv.reader(self._text, dialect)
+        self.headers = [h.strip().lower() for h in next(self._reader, [])]
+
+    @property
+    def progress(self):
+        return min(1.0, self._raw.tell() / self._size)
+
+    def __iter__(self):
+        # Zeilennummer wie in der Datei (Überschrift = Zeile 1)
+        for row_number, values in enumerate(self._reader, start=2):
+            if not any(value.strip() for value in values):
+                continue
+            yield row_number, dict(zip(self.headers, values))
+
+    def detach(self):
+        """Gibt die Binärdatei wieder frei (TextIOWrapper schließt sie sonst)"""
+        self._text.detach()
+
+
+# ---- 0.8.3 XLSX (openpyxl im read_only-Modus, erstes Tabellenblatt) ----
+class XlsxReader(TableReader):
+    def __init__(self, file):
+        super().__init__()
+        try:
+            from openpyxl import load_workbook
+        except ImportError:
+            raise ValueError("Für XLSX-Import muss das Paket 'openpyxl' installiert sein")
+
+        self._workbook = load_workbook(file, read_only=True, data_only=True)
+        self._sheet = self._workbook.worksheets[0]
+        self._rows = self._sheet.iter_rows(values_only=True)
+        self._max_row = self._sheet.max_row
+        self._current = 1
+        first = next(self._rows, ())
+        self.headers = [str(h).strip().lower() if h is not None else "" for h in first]
+
+    @property
+    def progress(self):
+        if not self._max_row:
+            return None
+        return min(1.0, self._current / self._max_row)
+
+    def __iter__(self):
+        for row_number, values in enumerate(self._rows, start=2):
+            self._current = row_number
+            if all(value is None or str(value).strip() == "" for value in values):
+                continue
+            yield row_number, dict(zip(self.headers, values))
+
+    def detach(self):
+        self._workbook.close()
+
+
+# ---- 0.8.4 Reader anhand der Dateiendung ----
+def open_table(file, filename):
+    extension = os.path.splitext(filename.lower())[1]
+    if extension == ".csv":
+        return CsvReader(file)
+    if extension == ".xlsx":
+        return XlsxReader(file)
+    raise ValueError(f"Nicht unterstütztes Dateiformat: {extension or filename}")
@@ -0,0 +1,188 @@
+import multiprocessing
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor, TimeoutError as FutureTimeoutError
+import bcrypt
+from config import (BCRYPT_MAX_WORKERS, BCRYPT_MAX_QUEUE, BCRYPT_TIMEOUT_SECONDS,
+                    BCRYPT_TARGET_MS, BCRYPT_MIN_ROUNDS, BCRYPT_MAX_ROUNDS, BCRYPT_ROUNDS)
+from utils.settings import get_setting, set_setting
+
+# ----- 0.4 PASSWORT-HASHING-SERVICE -----
+# bcrypt ist absichtlich teuer. Die Hashes laufen daher in einem begrenzten
+# Prozess-Pool statt im Streamlit-Skript-Thread, damit andere Sessions im
+# selben Prozess weiter rendern. Ist der Pool samt Warteschlange voll, wird
+# sofort mit HashingBusyError abgelehnt statt Anfragen aufzustauen.
+
+
+# ---- 0.4.1 Fehler bei Überlast ----
+class HashingBusyError(RuntimeError):
+    """Pool ausgelastet oder Zeitlimit überschritten – später erneut versuchen"""
+
+
+# ---- 0.4.2 Worker-Funktionen (laufen im Kindprozess) ----
+def _hash(password, rounds):
+    return bcrypt.hashpw(password, bcrypt.gensalt(rounds))
+
+
+def _check(password, hashed_password):
+    return bcrypt.checkpw(password, hashed_password)
+
+
+# ---- 0.4.3 Hashing-Service ----
+class PasswordHasher:
+    def __init__(self, max_workers=BCRYPT_MAX_WORKERS, max_queue=BCRYPT_MAX_QUEUE,
+                 timeout=BCRYPT_TIMEOUT_SECONDS):
+        self.max_workers = max_workers
+        self.max_queue = max_queue
+        self.timeout = timeout
+        self._executor = None
+        self._executor_lock = threading.Lock()
+        # Zulassung: laufende + wartende Hashes zusammen begrenzt
+        self._slots = threading.BoundedSemaphore(max_workers + max_queue)
+        self._stats_lock = threading.Lock()
+        self._stats = {
+            "completed": 0,
+            "rejected": 0,
+            "timeouts": 0,
+            "in_flight": 0,
+            "total_ms": 0.0,
+            "max_ms": 0.0,
+        }
+
+    # --- 0.4.3.1 Pool erst bei Bedarf starten ---
+    def _get_executor(self):
+        if self._executor is None:
+            with self._executor_lock:
+                if self._executor is None:
+                    # spawn statt fork: der Streamlit-Prozess ist multithreaded
+                    self._executor = ProcessPoolExecutor(
+                        max_workers=self.max_workers,
+                        mp_context=multiprocessing.get_context("spawn")
+                    )
+        return self._executor
+
+    # --- 0.4.3.2 Aufgabe mit Zulassungskontrolle ausführen ---
+    def _run(self, func, *args):
+        if not self._slots.acquire(blocking=False):
+            with self._stats_lock:
+                self._stats["rejected"] += 1
+            raise HashingBusyError("Zu viele gleichzeitige Anfragen")
+
+        started = time.perf_counter()
+        try:
+            future = self._get_executor().submit(func, *args)
+        except Exception:
+            self._slots.release()
+            raise
+
+        with self._stats_lock:
+            self._stats["in_flight"] += 1
+        # Slot erst freigeben, wenn der Hash wirklich fertig ist (auch nach Timeout)
+        future.add_done_callback(self._on_done)
+
+        try:
+            result = future.result(timeout=self.timeout)
+        except FutureTimeoutError:
+            with self._stats_lock:
+                self._stats["timeouts"] += 1
+            raise HashingBusyError("Zeitlimit beim Passwort-Hashing überschritten")
+
+        elapsed_ms = (time.perf_counter() - started) * 1000
+        with self._stats_lock:
+            self._stats["completed"] += 1
+            self._stats["total_ms"] += elapsed_ms
+            self._stats["max_ms"] = max(self._stats["max_ms"], elapsed_ms)
+        return result
+
+    def _on_done(self, future):
+        with self._stats_lock:
+            self._stats["in_flight"] -= 1
+        self._slots.release()
+
+    # --- 0.4.3.3 Öffentliche Schnittstelle ---
+    def hash_password(self, password, rounds=None):
+        """Erzeugt einen bcrypt-Hash (bytes) mit den Ziel-Kosten des Hosts"""
+        return self._run(_hash, password.encode("utf-8"), rounds or get_target_rounds())
+
+    def check_password(self, password, hashed_password):
+        """Prüft ein Klartext-Passwort gegen einen bcrypt-Hash"""
+        return self._run(_check, password.encode("utf-8"), hashed_password)
+
+    # --- 0.4.3.4 Statistiken ---
+    def stats(self):
+        with self._stats_lock:
+            stats = dict(self._stats)
+        stats["avg_ms"] = round(stats["total_ms"] / stats["completed"], 1) if stats["completed"] else 0.0
+        stats["max_ms"] = round(stats["max_ms"], 1)
+        stats["total_ms"] = round(stats["total_ms"], 1)
+        stats["max_workers"] = self.max_workers
+        stats["max_queue"] = self.max_queue
+        return stats
+
+    # --- 0.4.3.5 Pool beenden ---
+    def shutdown(self):
+        with self._executor_lock:
+            if self._executor is not None:
+                self._executor.shutdown(wait=True)
+                self._executor = None
+
+
+# ---- 0.4.4 Prozessweite Instanz ----
+password_hasher = PasswordHasher()
+
+
+# ---- 0.4.5 Ziel-Kosten (Env > kalibrierter Wert > bcrypt-Standard) ----
+SETTING_BCRYPT_ROUNDS = "bcrypt_rounds"
+DEFAULT_BCRYPT_ROUNDS = 12
+
+
+def get_target_rounds():
+    if BCRYPT_ROUNDS:
+        return BCRYPT_ROUNDS
+    return int(get_setting(SETTING_BCRYPT_ROUNDS, DEFAULT_BCRYPT_ROUNDS))
+
+
+# ---- 0.4.6 Kosten eines gespeicherten Hashes ----
+def get_hash_rounds(hashed_password):
+    """Liest den Kostenfaktor aus einem Hash der Form $2b$12$..."""
+    if isinstance(hashed_password, str):
+        hashed_password = hashed_password.encode("utf-8")
+    try:
+        return int(hashed_password.split(b"$")[2])
+    except (IndexError, ValueError):
+        return None
+
+
+def needs_rehash(hashed_password):
+    """True, wenn der Hash nicht mit den aktuellen Ziel-Kosten erzeugt wurde"""
+    return get_hash_rounds(hashed_password) != get_target_rounds()
+
+
+# ---- 0.4.7 Kalibrierung auf dem aktuellen Host ----
+def calibrate_bcrypt_rounds(target_ms=BCRYPT_TARGET_MS, min_rounds=BCRYPT_MIN_ROUNDS,
+                            max_rounds=BCRYPT_MAX_ROUNDS, save=True):
+    """Misst bcrypt auf diesem Host und wählt die höchsten Kosten unter target_ms.
+
+    Jede zusätzliche Runde verdoppelt die Laufzeit; die Messung bricht daher
+    ab, sobald das Ziel überschritten ist. min_rounds gilt als Sicherheits-
+    untergrenze, auch wenn der Host dafür zu langsam ist.
+    Liefert (gewählte Kosten, {kosten: gemessene ms}).
+    """
+    password = b"calibration-benchmark"
+    measurements = {}
+    chosen = min_rounds
+
+    for rounds in range(min_rounds, max_rounds + 1):
+        salt = bcrypt.gensalt(rounds)
+        started = time.perf_counter()
+        bcrypt.hashpw(password, salt)
+        elapsed_ms = (time.perf_counter() - started) * 1000
+        measurements[rounds] = round(elapsed_ms, 1)
+
+        if elapsed_ms > target_ms:
+            break
+        chosen = rounds
+
+    if save:
+        set_setting(SETTING_BCRYPT_ROUNDS, chosen)
+    return chosen, measurements
@@ -1,8 +1,6 @@
-import sqlite3
 from functools import wraps
 import streamlit as st
-
-DB_NAME = "users.db"
+from utils.audit import audit_writer
 
 def requires_role(required_role):
     def decorator(f):
@@ -16,15 +14,5 @@ def requires_role(required_role):
     return decorator
 
 def log_admin_action(admin_username: str, action: str, target: str):
-    conn = sqlite3.connect(DB_NAME)
-    c = conn.cursor()
-    
-    try:
-        c.execute("""
-            INSERT INTO admin_logs (admin_id, action, target)
-            SELECT user_id, ?, ? 
-            FROM users WHERE username = ?
-        """, (action, target, admin_username))
-        conn.commit()
-    finally:
-        conn.close()
\ No newline at end of file
+    # Asynchron über den Audit-Writer (gebündelte Commits im Hintergrund)
+    audit_writer.enqueue(admin_username, action, target)
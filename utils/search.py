@@ -0,0 +1,42 @@
+import re
+
+# ----- 0.10 VOLLTEXTSUCHE (FTS5) -----
+# Deutsche Umlaute werden vor dem Indexieren und vor der Suche gleich
+# gefaltet (ä -> ae, ß -> ss), damit "Mueller" und "Müller" dasselbe finden.
+# Übrige Akzente entfernt der FTS5-Tokenizer (unicode61 remove_diacritics 2).
+
+UMLAUT_FOLDING = [
+    ("ä", "ae"), ("ö", "oe"), ("ü", "ue"),
+    ("Ä", "Ae"), ("Ö", "Oe"), ("Ü", "Ue"),
+    ("ß", "ss"), ("ẞ", "SS"),
+]
+
+_FOLD_TABLE = str.maketrans(dict(UMLAUT_FOLDING))
+_TOKEN_PATTERN = re.compile(r"\w+")
+
+
+# ---- 0.10.1 Faltung in Python (Suchbegriffe) ----
+def fold_text(text):
+    return (text or "").translate(_FOLD_TABLE)
+
+
+# ---- 0.10.2 Faltung in SQL (Trigger und Backfill) ----
+def fold_sql(expression):
+    """Verschachteltes replace() mit derselben Faltung wie fold_text"""
+    for source, target in UMLAUT_FOLDING:
+        expression = f"replace({expression}, '{source}', '{target}')"
+    return expression
+
+
+# ---- 0.10.3 Suchbegriff -> FTS5-MATCH-Ausdruck ----
+def build_match_query(term):
+    """Jedes Wort als Präfix-Suche, alle Wörter müssen vorkommen (AND).
+
+    Sonderzeichen werden verworfen, damit Nutzereingaben keine
+    FTS5-Syntax (NEAR, Spaltenfilter, ...) auslösen. Liefert None,
+    wenn kein Wort übrig bleibt.
+    """
+    tokens = _TOKEN_PATTERN.findall(fold_text(term).lower())
+    if not tokens:
+        return None
+    return " ".join(f'"{token}"*' for token in tokens)
@@ -0,0 +1,80 @@
+import threading
+import time
+from config import ROLE_EPOCH_SYNC_SECONDS
+from utils.database import connection
+
+# ----- 0.7 ROLLEN-EPOCHEN -----
+# Jede Rollenänderung erhöht die Epoche des betroffenen Users. Sessions merken
+# sich beim Login ihre Epoche und vergleichen sie bei jedem Rerun mit dem
+# Registry-Wert (ein dict-Zugriff). Erst bei Abweichung wird die Rolle neu
+# aus der DB geladen. Die Tabelle user_epochs spiegelt die Epochen für
+# weitere Serverprozesse; die Registry holt dort höchstens alle
+# ROLE_EPOCH_SYNC_SECONDS nur die seit dem letzten Abgleich geänderten Zeilen.
+
+
+# ---- 0.7.1 Epochen-Registry ----
+class EpochRegistry:
+    def __init__(self, sync_seconds=ROLE_EPOCH_SYNC_SECONDS):
+        self.sync_seconds = sync_seconds
+        self._epochs = {}
+        self._last_seq = 0
+        self._last_sync = 0.0
+        self._lock = threading.Lock()
+
+    # --- 0.7.1.1 Epoche erhöhen (innerhalb der Schreib-Transaktion!) ---
+    @staticmethod
+    def bump(conn, user_id):
+        """Erhöht die Epoche in der DB; nach dem Commit publish() aufrufen"""
+        conn.execute("""
+            INSERT INTO user_epochs (user_id, epoch, seq)
+            VALUES (?, 1, (SELECT COALESCE(MAX(seq), 0) + 1 FROM user_epochs))
+            ON CONFLICT(user_id) DO UPDATE SET
+                epoch = epoch + 1,
+                seq = (SELECT COALESCE(MAX(seq), 0) + 1 FROM user_epochs)
+        """, (user_id,))
+        return conn.execute("SELECT epoch FROM user_epochs WHERE user_id = ?", (user_id,)).fetchone()[0]
+
+    # --- 0.7.1.2 Neue Epoche im eigenen Prozess sofort sichtbar machen ---
+    def publish(self, user_id, epoch):
+        with self._lock:
+            if epoch > self._epochs.get(user_id, 0):
+                self._epochs[user_id] = epoch
+
+    # --- 0.7.1.3 Abgleich mit anderen Prozessen (nur Änderungen) ---
+    def _sync(self, now):
+        with self._lock:
+            if now - self._last_sync < self.sync_seconds:
+                return
+            self._last_sync = now
+            last_seq = self._last_seq
+
+        with connection() as conn:
+            rows = conn.execute(
+                "SELECT user_id, epoch, seq FROM user_epochs WHERE seq > ? ORDER BY seq",
+                (last_seq,)
+            ).fetchall()
+
+        with self._lock:
+            for user_id, epoch, seq in rows:
+                if epoch > self._epochs.get(user_id, 0):
+                    self._epochs[user_id] = epoch
+                self._last_seq = max(self._last_seq, seq)
+
+    # --- 0.7.1.4 Aktuelle Epoche (O(1) im Normalfall) ---
+    def get_epoch(self, user_id):
+        now = time.monotonic()
+        if now - self._last_sync >= self.sync_seconds:
+            self._sync(now)
+        return self._epochs.get(user_id, 0)
+
+    # --- 0.7.1.5 Epoche direkt aus der DB (beim Login) ---
+    def load_epoch(self, user_id):
+        with connection() as conn:
+            row = conn.execute("SELECT epoch FROM user_epochs WHERE user_id = ?", (user_id,)).fetchone()
+        epoch = row[0] if row else 0
+        self.publish(user_id, epoch)
+        return epoch
+
+
+# ---- 0.7.2 Prozessweite Instanz ----
+epoch_registry = EpochRegistry()
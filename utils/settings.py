@@ -0,0 +1,50 @@
+import time
+from utils.database import connection, transaction
+from utils.cache import cached_query, bump_version
+
+# ----- 0.5 LAUFZEIT-EINSTELLUNGEN -----
+# Schlüssel/Wert-Einstellungen in der Tabelle app_settings, die zur Laufzeit
+# ermittelt werden (z.B. kalibrierte bcrypt-Kosten). Statische Werte bleiben
+# in config.py bzw. der .env-Datei.
+
+
+# ---- 0.5.1 Alle Einstellungen (gecacht) ----
+@cached_query("settings")
+def _fetch_settings():
+    with connection() as conn:
+        return dict(conn.execute("SELECT key, value FROM app_settings").fetchall())
+
+
+# ---- 0.5.2 Einstellung lesen ----
+def get_setting(key, default=None):
+    return _fetch_settings().get(key, default)
+
+
+# ---- 0.5.3 Einstellung speichern ----
+def set_setting(key, value):
+    with transaction() as conn:
+        conn.execute("""
+            INSERT INTO app_settings (key, value, updated_at) VALUES (?, ?, CURRENT_TIMESTAMP)
+            ON CONFLICT(key) DO UPDATE SET value = excluded.value, updated_at = excluded.updated_at
+        """, (key, str(value)))
+    bump_version("settings")
+
+
+# ---- 0.5.4 Periodischen Lauf atomar übernehmen ----
+def claim_interval(key, interval):
+    """Setzt key auf jetzt, falls der gespeicherte Zeitpunkt älter als interval Sekunden ist.
+
+    Bedingtes Upsert in einer Transaktion: von mehreren gleichzeitigen Aufrufern
+    erhält genau einer True und führt den Lauf aus.
+    """
+    now = time.time()
+    with transaction() as conn:
+        cursor = conn.execute("""
+            INSERT INTO app_settings (key, value, updated_at) VALUES (?, ?, CURRENT_TIMESTAMP)
+            ON CONFLICT(key) DO UPDATE SET value = excluded.value, updated_at = excluded.updated_at
+            WHERE CAST(app_settings.value AS REAL) <= ?
+        """, (key, str(now), now - interval))
+    claimed = cursor.rowcount == 1
+    if claimed:
+        bump_version("settings")
+    return claimed
@@ -0,0 +1,142 @@
+import threading
+import time
+from config import LOGIN_THROTTLE_BACKEND, LOGIN_MAX_ATTEMPTS, LOGIN_REFILL_SECONDS
+from utils.database import connection, transaction
+
+# ----- 0.6 LOGIN-THROTTLE -----
+# Token-Bucket je Benutzername und je Client. Jeder Login-Versuch kostet ein
+# Token aus BEIDEN Buckets, sonst wird er abgelehnt – bevor bcrypt läuft.
+# Alle LOGIN_REFILL_SECONDS kommt ein Token zurück; volle Buckets werden
+# verworfen, der Zustand baut sich also von selbst ab.
+# Backend "memory" gilt pro Prozess, "sqlite" teilt den Zustand über die
+# Tabelle login_throttle zwischen mehreren Serverprozessen.
+
+PRUNE_INTERVAL_SECONDS = 60
+
+
+# ---- 0.6.1 Token-Bucket-Throttle ----
+class LoginThrottle:
+    def __init__(self, capacity=LOGIN_MAX_ATTEMPTS, refill_seconds=LOGIN_REFILL_SECONDS,
+                 backend=LOGIN_THROTTLE_BACKEND):
+        if backend not in ("memory", "sqlite"):
+            raise ValueError(f"Unbekanntes Throttle-Backend: {backend}")
+        self.capacity = capacity
+        self.rate = 1.0 / refill_seconds  # Tokens pro Sekunde
+        self.backend = backend
+        self._buckets = {}
+        self._lock = threading.Lock()
+        self._last_prune = time.time()
+        self._rejected = 0
+
+    # --- 0.6.1.1 Schlüssel eines Login-Versuchs ---
+    @staticmethod
+    def _keys(username, client_id):
+        keys = [f"user:{username.lower()}"]
+        if client_id:
+            keys.append(f"client:{client_id}")
+        return keys
+
+    # --- 0.6.1.2 Bucket auffüllen ---
+    def _refill(self, tokens, updated_at, now):
+        return min(self.capacity, tokens + (now - updated_at) * self.rate)
+
+    # --- 0.6.1.3 Versuch zulassen oder ablehnen ---
+    def allow(self, username, client_id=None):
+        """Verbraucht ein Token; liefert (erlaubt, Sekunden bis zum nächsten Versuch)"""
+        now = time.time()
+        keys = self._keys(username, client_id)
+
+        if self.backend == "sqlite":
+            retry_after = self._consume_sqlite(keys, now)
+        else:
+            retry_after = self._consume_memory(keys, now)
+
+        if now - self._last_prune > PRUNE_INTERVAL_SECONDS:
+            self._prune(now)
+
+        if retry_after > 0:
+            self._rejected += 1
+            return False, retry_after
+        return True, 0.0
+
+    def _consume(self, buckets, now):
+        """Gemeinsame Logik: buckets = {key: (tokens, updated_at)} -> neue Werte, Wartezeit"""
+        refilled = {key: self._refill(tokens, updated_at, now)
+                    for key, (tokens, updated_at) in buckets.items()}
+        lowest = min(refilled.values())
+        if lowest >= 1:
+            return {key: tokens - 1 for key, tokens in refilled.items()}, 0.0
+        return refilled, (1 - lowest) / self.rate
+
+    def _consume_memory(self, keys, now):
+        with self._lock:
+            buckets = {key: self._buckets.get(key, (self.capacity, now)) for key in keys}
+            new_tokens, retry_after = self._consume(buckets, now)
+            for key, tokens in new_tokens.items():
+                self._buckets[key] = (tokens, now)
+        return retry_after
+
+    def _consume_sqlite(self, keys, now):
+        with transaction() as conn:
+            placeholders = ",".join("?" for _ in keys)
+            rows = conn.execute(
+                f"SELECT bucket_key, tokens, updated_at FROM login_throttle WHERE bucket_key IN ({placeholders})",
+                keys
+            ).fetchall()
+            stored = {key: (tokens, updated_at) for key, tokens, updated_at in rows}
+            buckets = {key: stored.get(key, (self.capacity, now)) for key in keys}
+            new_tokens, retry_after = self._consume(buckets, now)
+            conn.executemany("""
+                INSERT INTO login_throttle (bucket_key, tokens, updated_at) VALUES (?, ?, ?)
+                ON CONFLICT(bucket_key) DO UPDATE SET tokens = excluded.tokens, updated_at = excluded.updated_at
+            """, [(key, tokens, now) for key, tokens in new_tokens.items()])
+        return retry_after
+
+    # --- 0.6.1.4 Volle Buckets verwerfen (Zustand abbauen) ---
+    def _prune(self, now):
+        self._last_prune = now
+        # Nach dieser Zeit ist jeder Bucket sicher wieder voll
+        full_after = self.capacity / self.rate
+        if self.backend == "sqlite":
+            with transaction() as conn:
+                conn.execute("DELETE FROM login_throttle WHERE updated_at < ?", (now - full_after,))
+        else:
+            with self._lock:
+                for key in [key for key, (_, updated_at) in self._buckets.items()
+                            if now - updated_at > full_after]:
+                    del self._buckets[key]
+
+    # --- 0.6.1.5 Aktueller Zustand für das Admin-Panel ---
+    def state(self):
+        """Alle nicht vollen Buckets mit Tokens und Sperrdauer"""
+        now = time.time()
+        if self.backend == "sqlite":
+            with connection() as conn:
+                rows = conn.execute("SELECT bucket_key, tokens, updated_at FROM login_throttle").fetchall()
+        else:
+            with self._lock:
+                rows = [(key, tokens, updated_at) for key, (tokens, updated_at) in self._buckets.items()]
+
+        state = []
+        for key, tokens, updated_at in rows:
+            tokens = self._refill(tokens, updated_at, now)
+            if tokens >= self.capacity:
+                continue
+            state.append({
+                "key": key,
+                "tokens": round(tokens, 2),
+                "retry_after": round(max(0.0, (1 - tokens) / self.rate), 1),
+            })
+        return sorted(state, key=lambda entry: entry["tokens"])
+
+    def stats(self):
+        return {
+            "backend": self.backend,
+            "capacity": self.capacity,
+            "refill_seconds": round(1 / self.rate, 1),
+            "rejected": self._rejected,
+        }
+
+
+# ---- 0.6.2 Prozessweite Instanz ----
+login_throttle = LoginThrottle()
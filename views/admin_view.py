@@ -1,7 +1,8 @@
 import streamlit as st
 from controllers.admin_controller import AdminController
-from constants import ACTIVE_ROLES
+from constants import ACTIVE_ROLES, AUDIT_ACTIONS
 from views.base_view import BaseView  # ← HINZUFÜGEN
+from models.base_model import ConflictError
 
 # ----- 3.3 ADMIN-View -----
 class AdminView(BaseView):  # ← (BaseView) hinzufügen
@@ -22,10 +23,11 @@ class AdminView(BaseView):  # ← (BaseView) hinzufügen
         self.render_user_info()
         
         # Tab-Navigation
-        tab1, tab2, tab3, tab4 = st.tabs([
+        tab1, tab2, tab3, tab4, tab5 = st.tabs([
             "👥 User-Verwaltung", 
             "⏳ Wartende User", 
             "📊 Statistiken",
+            "📜 Audit-Log",
             "🔧 System"
         ])
 
@@ -40,6 +42,9 @@ class AdminView(BaseView):  # ← (BaseView) hinzufügen
             self._render_statistics()
 
         with tab4:
+            self._render_audit_log()
+
+        with tab5:
             self._render_system_info()
 
     # ---- 3.3.3 Wartende User anzeigen ----
@@ -47,6 +52,17 @@ class AdminView(BaseView):  # ← (BaseView) hinzufügen
         """Zeigt User mit Rolle 'Wartend' zur Freischaltung"""
         st.subheader("⏳ Wartende User freischalten")
 
+        # Ergebnisbericht der letzten Freischaltung (bleibt bis zur nächsten stehen)
+        report = st.session_state.get("approval_report")
+        if report:
+            approved = sum(1 for entry in report if entry["success"])
+            st.success(f"🎉 {approved} von {len(report)} User freigeschaltet")
+            st.dataframe({
+                "User": [entry["username"] or f"ID {entry['user_id']}" for entry in report],
+                "Ergebnis": ["✅" if entry["success"] else "❌" for entry in report],
+                "Details": [entry["message"] for entry in report]
+            }, use_container_width=True)
+
         # Wartende User vom Controller holen
         waiting_users, error = self.controller.get_waiting_users()
 
@@ -62,64 +78,51 @@ class AdminView(BaseView):  # ← (BaseView) hinzufügen
         # Wartende User anzeigen
         st.warning(f"📋 {len(waiting_users)} User warten auf Freischaltung:")
 
-        # Für jeden wartenden User ein Freischaltungs-Formular
-        for user in waiting_users:
-            col1, col2, col3 = st.columns([2, 2, 1])
-
-            with col1:
-                st.write(f"**👤 {user.username}**")
-                st.caption(f"User-ID: {user.user_id}")
-
-            with col2:
-                # Rolle-Auswahl für diesen User
-                selected_role = st.selectbox(
-                    "Neue Rolle zuweisen:",
-                    options=ACTIVE_ROLES,
-                    key=f"role_select_{user.user_id}",
-                    help=f"Wählen Sie eine aktive Rolle für {user.username}"
-                )
+        # Mehrfachauswahl: eine Rolle für alle ausgewählten User
+        users_by_id = {user.user_id: user for user in waiting_users}
+        select_all = st.checkbox("Alle wartenden User auswählen", key="approve_select_all")
 
-            with col3:
-                # Freischalten-Button
-                if st.button(
-                    "✅ Freischalten",
-                    key=f"activate_{user.user_id}",
-                    type="primary"
-                ):
-                    self._handle_user_activation(user.user_id, user.username, selected_role)
+        col1, col2 = st.columns([3, 1])
 
-            st.divider()  # Trennung zwischen Usern
+        with col1:
+            selected_ids = st.multiselect(
+                "User auswählen:",
+                options=list(users_by_id),
+                default=list(users_by_id) if select_all else [],
+                format_func=lambda user_id: f"👤 {users_by_id[user_id].username} (ID {user_id})",
+                key=f"approve_selection_{select_all}"
+            )
+
+        with col2:
+            selected_role = st.selectbox(
+                "Rolle zuweisen:",
+                options=ACTIVE_ROLES,
+                key="approve_role",
+                help="Diese Rolle erhalten alle ausgewählten User"
+            )
 
-    # ---- 3.3.4 User-Freischaltung verarbeiten ----
-    def _handle_user_activation(self, user_id, username, new_role):
-        """Verarbeitet die Freischaltung eines Users"""
+        if st.button(f"✅ {len(selected_ids)} User freischalten", type="primary",
+                     disabled=not selected_ids, key="approve_selected"):
+            self._handle_bulk_activation(
+                [(user_id, selected_role, users_by_id[user_id].row_version) for user_id in selected_ids]
+            )
 
-        # Controller aufrufen
-        success, message = self.controller.change_user_role(user_id, new_role)
+    # ---- 3.3.4 Freischaltung verarbeiten (alle Ausgewählten auf einmal) ----
+    def _handle_bulk_activation(self, assignments):
+        """Schaltet alle ausgewählten User in einer Transaktion frei"""
+        success, result = self.controller.change_user_roles_bulk(assignments)
 
         if success:
-            st.success(f"🎉 {username} wurde als '{new_role}' freigeschaltet!")
-            st.balloons()
+            st.session_state.approval_report = result
             st.rerun()
         else:
-            if isinstance(message, list):
-                for error in message:
-                    st.error(error)
-            else:
-                st.error(message)
+            self._show_change_errors(result)
 
     # ---- 3.3.5 User-Verwaltung anzeigen ----
     def _render_user_management(self):
         """Zeigt alle User mit Rollen-Management"""
         st.subheader("👥 User-Verwaltung")
 
-        # Alle User vom Controller holen
-        all_users, error = self.controller.get_all_users()
-
-        if error:
-            st.error(f"Fehler beim Laden der User: {error}")
-            return
-        
         # Filter-Option
         col1, col2 = st.columns(2)
 
@@ -136,22 +139,23 @@ class AdminView(BaseView):  # ← (BaseView) hinzufügen
             search_term = st.text_input(
                 "User suchen:",
                 placeholder="Benutzername eingeben...",
-                help="Suche nach Benutzername"
+                help="Ab 3 Zeichen: beliebiger Namensteil, sonst Namensanfang"
             )
 
-        # User filtern
-        filtered_users = all_users
-
-        # Nach Rollen filtern
-        if filter_role != "Alle":
-            filtered_users = [user for user in filtered_users if user.role_name == filter_role]
+        # User gefiltert und seitenweise vom Controller holen (Filter in SQL)
+        role = None if filter_role == "Alle" else filter_role
+        search = search_term.strip() or None
+        cursor = self.get_page_cursor("user_list", filters=(role, search))
+        filtered_users, next_cursor, error = self.controller.get_users_page(
+            role=role, search=search, after=cursor
+        )
 
-        # Nach Suchbegriff filtern
-        if search_term:
-            filtered_users = [user for user in filtered_users if search_term.lower() in user.username.lower()]
+        if error:
+            st.error(f"Fehler beim Laden der User: {error}")
+            return
         
         # Gefilterte User anzeigen
-        st.write(f"**Gefundene User: {len(filtered_users)}**")
+        st.write(f"**Gefundene User (diese Seite): {len(filtered_users)}**")
 
         if not filtered_users:
             st.info("Keine User entsprechen den Filterkriterien")
@@ -192,7 +196,8 @@ class AdminView(BaseView):  # ← (BaseView) hinzufügen
                                 key=f"save_role_{user.user_id}",
                                 help="Rolle speichern"
                             ):
-                                self._handle_role_change(user.user_id, user.username, new_role)
+                                self._handle_role_change(user.user_id, user.username, new_role,
+                                                         user.row_version)
                 
                 with col4:
                     # Deaktivieren-Button (nur wenn nicht Admin und nicht der eigene Account)
@@ -206,39 +211,46 @@ class AdminView(BaseView):  # ← (BaseView) hinzufügen
                             help=f"{user.username} deaktivieren",
                             type="secondary"
                         ):
-                            self._handle_user_deactivation(user.user_id, user.username)
+                            self._handle_user_deactivation(user.user_id, user.username, user.row_version)
 
                 st.divider()
 
+        self.render_pager("user_list", next_cursor)
+
     # ---- 3.3.6 Rollen-Änderung verarbeiten ----
-    def _handle_role_change(self, user_id, username, new_role):
+    def _handle_role_change(self, user_id, username, new_role, expected_version=None):
         """Verarbeitet Rollen-Änderung eines Users"""
-        success, message = self.controller.change_user_role(user_id, new_role)
+        success, message = self.controller.change_user_role(user_id, new_role, expected_version)
 
         if success:
             st.success(f"✅ Rolle von {username} wurde auf '{new_role}' geändert!")
             st.rerun()
         else:
-            if isinstance(message, list):
-                for error in message:
-                    st.error(error)
-            else:
-                st.error(message)
+            self._show_change_errors(message)
     
     # ---- 3.3.7 User-Deaktivierung verarbeiten ----
-    def _handle_user_deactivation(self, user_id, username):
+    def _handle_user_deactivation(self, user_id, username, expected_version=None):
         """Verarbeitet die Deaktivierung eines Users"""
-        success, message = self.controller.deactivate_user(user_id)
+        success, message = self.controller.deactivate_user(user_id, expected_version)
 
         if success:
             st.warning(f"⚠️ {username} wurde deaktiviert!")
             st.rerun()
         else:
-            if isinstance(message, list):
-                for error in message:
-                    st.error(error)
-            else:
-                st.error(message)
+            self._show_change_errors(message)
+
+    # ---- 3.3.7.1 Fehler/Konflikte einer Rollenänderung anzeigen ----
+    def _show_change_errors(self, message):
+        """Konflikt = jemand anderes war schneller; die Liste zeigt nach Rerun den neuen Stand"""
+        if isinstance(message, ConflictError):
+            st.warning(f"⚠️ {message} – die Änderung wurde nicht gespeichert.")
+            if st.button("🔄 Aktuellen Stand laden", key=f"reload_after_conflict_{message.current.user_id}"):
+                st.rerun()
+        elif isinstance(message, list):
+            for error in message:
+                st.error(error)
+        else:
+            st.error(message)
 
     # ---- 3.3.8 User-Statistiken ----
     def _render_statistics(self):
@@ -256,14 +268,15 @@ class AdminView(BaseView):  # ← (BaseView) hinzufügen
             return
         
         # Gesamt-User-Zahl
-        total_users = sum(stats.values())
+        total_users = stats["total"]
         st.metric("👥 Gesamt-User", total_users)
 
         # Statistiken in Spalten anzeigen
         st.subheader("📈 User-Verteilung nach Rollen")
 
         # Dynamische Spalten je nach Anzahl Rollen
-        roles = list(stats.keys())
+        by_role = stats["by_role"]
+        roles = list(by_role.keys())
         cols = st.columns(len(roles))
 
         # Farb-Mapping für Rollen
@@ -278,7 +291,7 @@ class AdminView(BaseView):  # ← (BaseView) hinzufügen
         for i, role in enumerate(roles):
             with cols[i]:
                 color = role_colors.get(role, "⚪")
-                count = stats[role]
+                count = by_role[role]
                 percentage = (count / total_users * 100) if total_users > 0 else 0
 
                 st.metric(
@@ -292,8 +305,8 @@ class AdminView(BaseView):  # ← (BaseView) hinzufügen
 
         # Chart-Daten vorbereiten
         chart_data = {
-            "Rolle": list(stats.keys()),
-            "Anzahl": list(stats.values())
+            "Rolle": list(by_role.keys()),
+            "Anzahl": list(by_role.values())
         }
 
         # Bar-Chart
@@ -303,7 +316,7 @@ class AdminView(BaseView):  # ← (BaseView) hinzufügen
         st.subheader("⚠️ System-Hinweise")
 
         # Warning wenn zu viele wartende User
-        waiting_count = stats.get("Wartend", 0)
+        waiting_count = stats["waiting"]
         if waiting_count > 5:
             st.warning(f"🚨 {waiting_count} User warten auf Freischaltung!")
         elif waiting_count > 0:
@@ -312,12 +325,65 @@ class AdminView(BaseView):  # ← (BaseView) hinzufügen
             st.success("✅ Keine wartenden User")
 
         # Warnung wenn nur ein Administrator
-        admin_count = stats.get("Administrator", 0)
+        admin_count = stats["admins"]
         if admin_count <= 1:
             st.warning("⚠️ Nur ein Administrator vorhanden - Backup-Admin empfohlen!")
         else:
             st.success(f"✅ {admin_count} Administrator vorhanden")
 
+    # ---- 3.3.8.2 Audit-Log anzeigen ----
+    def _render_audit_log(self):
+        """Protokoll der Admin- und Artikel-Aktionen, neueste zuerst, seitenweise"""
+        st.subheader("📜 Audit-Log")
+
+        col1, col2 = st.columns(2)
+        with col1:
+            filter_action = st.selectbox("Aktion:", options=["Alle"] + AUDIT_ACTIONS, key="audit_action")
+        with col2:
+            filter_admin = st.text_input("Ausgeführt von:", placeholder="Benutzername (exakt)",
+                                         key="audit_admin")
+
+        action = None if filter_action == "Alle" else filter_action
+        admin_username = filter_admin.strip() or None
+        cursor = self.get_page_cursor("audit_log", filters=(action, admin_username))
+        rows, next_cursor, error = self.controller.get_admin_logs_page(
+            action=action, admin_username=admin_username, before=cursor
+        )
+
+        if error:
+            st.error(f"Fehler beim Laden des Audit-Logs: {error}")
+            return
+
+        if not rows:
+            st.info("Keine Einträge vorhanden")
+            return
+
+        st.dataframe({
+            "Zeitpunkt (UTC)": [row[1] for row in rows],
+            "Ausgeführt von": [row[2] or "–" for row in rows],
+            "Aktion": [row[3] for row in rows],
+            "Ziel": [row[4] for row in rows]
+        }, use_container_width=True)
+        self.render_pager("audit_log", next_cursor)
+        st.caption("Neue Einträge werden im Hintergrund gebündelt geschrieben und erscheinen nach spätestens einer Sekunde.")
+
+    # ---- 3.3.8.1 bcrypt-Kalibrierung verarbeiten ----
+    def _handle_password_calibration(self):
+        """Startet die Kalibrierung und zeigt die Messwerte"""
+        with st.spinner("Messe bcrypt-Laufzeiten..."):
+            success, result = self.controller.calibrate_password_cost()
+
+        if success:
+            rounds, measurements = result
+            st.success(f"✅ Neue Ziel-Kosten: {rounds}. Bestehende Hashes werden beim nächsten Login erneuert.")
+            st.dataframe({
+                "Kosten": list(measurements.keys()),
+                "Dauer (ms)": list(measurements.values())
+            }, use_container_width=True)
+        else:
+            for error in result:
+                st.error(error)
+
     # ----  3.3.9 System-Informationen anzeigen ----
     def _render_system_info(self):
         """Zeigt System- und Datenbank-Informationen"""
@@ -340,6 +406,113 @@ class AdminView(BaseView):  # ← (BaseView) hinzufügen
             st.write("- ✅ Artikel-Verwaltung")
             st.write("- ✅ Rollen-System")
 
+        # Connection-Pool-Auslastung
+        with st.expander("🔌 DB-Connection-Pool"):
+            pool_stats, error = self.controller.get_database_stats()
+            if error:
+                st.error(f"Fehler beim Laden der Pool-Statistiken: {error}")
+            elif pool_stats:
+                st.dataframe(pool_stats, use_container_width=True)
+            else:
+                st.info("Noch keine Verbindungen geöffnet")
+
+        # Lese-Cache-Auslastung
+        with st.expander("🗃️ Lese-Cache"):
+            cache_stats, error = self.controller.get_cache_stats()
+            if error:
+                st.error(f"Fehler beim Laden der Cache-Statistiken: {error}")
+            else:
+                col1, col2, col3 = st.columns(3)
+                with col1:
+                    st.metric("Treffer", cache_stats["hits"])
+                with col2:
+                    st.metric("Fehlzugriffe", cache_stats["misses"])
+                with col3:
+                    st.metric("Trefferquote", f"{cache_stats['hit_rate'] * 100:.1f}%")
+                st.caption(f"Einträge: {cache_stats['entries']}/{cache_stats['max_entries']} · "
+                           f"Verdrängt: {cache_stats['evictions']} · Datenstände: {cache_stats['versions']}")
+
+        # Passwort-Hashing-Auslastung
+        with st.expander("🔐 Passwort-Hashing"):
+            hashing_stats, error = self.controller.get_hashing_stats()
+            if error:
+                st.error(f"Fehler beim Laden der Hashing-Statistiken: {error}")
+            else:
+                col1, col2, col3, col4 = st.columns(4)
+                with col1:
+                    st.metric("Ausgeführt", hashing_stats["completed"])
+                with col2:
+                    st.metric("Ø Dauer", f"{hashing_stats['avg_ms']} ms")
+                with col3:
+                    st.metric("Abgelehnt", hashing_stats["rejected"])
+                with col4:
+                    st.metric("Laufend", hashing_stats["in_flight"])
+                st.caption(f"Worker: {hashing_stats['max_workers']} · Warteschlange: {hashing_stats['max_queue']} · "
+                           f"Max: {hashing_stats['max_ms']} ms · Timeouts: {hashing_stats['timeouts']} · "
+                           f"Ziel-Kosten: {hashing_stats['target_rounds']}")
+
+            if st.button("⏱️ bcrypt-Kosten kalibrieren",
+                         help="Misst diesen Host und wählt die höchsten Kosten unter dem Latenz-Ziel"):
+                self._handle_password_calibration()
+
+        # Rollen-Zähler (role_counts) gegen echte Zählung prüfen
+        with st.expander("🧮 User-Zähler je Rolle"):
+            st.caption("Die Statistik liest per Trigger gepflegte Zähler statt alle User zu zählen.")
+            if st.button("🔍 Zähler prüfen und reparieren", key="check_role_counts"):
+                mismatches, error = self.controller.check_role_counts(repair=True)
+                if error:
+                    st.error(f"Fehler bei der Prüfung: {error}")
+                elif mismatches:
+                    st.warning(f"⚠️ {len(mismatches)} Abweichung(en) gefunden und korrigiert")
+                    st.dataframe({
+                        "Rolle": [role for role, _, _ in mismatches],
+                        "Zähler": [stored for _, stored, _ in mismatches],
+                        "Tatsächlich": [actual for _, _, actual in mismatches]
+                    }, use_container_width=True)
+                else:
+                    st.success("✅ Zähler stimmen mit den User-Daten überein")
+
+        # Audit-Writer
+        with st.expander("📜 Audit-Writer"):
+            audit_stats, error = self.controller.get_audit_stats()
+            if error:
+                st.error(f"Fehler beim Laden der Audit-Statistiken: {error}")
+            else:
+                col1, col2, col3 = st.columns(3)
+                with col1:
+                    st.metric("Geschrieben", audit_stats["written"])
+                with col2:
+                    st.metric("Batches", audit_stats["batches"])
+                with col3:
+                    st.metric("Wartend", audit_stats["pending"])
+                st.caption(f"Batch bis {audit_stats['batch_size']} Einträge / {audit_stats['flush_seconds']} s · "
+                           f"Synchron (Queue voll): {audit_stats['direct']} · Verworfen: {audit_stats['failed']}")
+
+        # Login-Throttle
+        with st.expander("🚦 Login-Throttle"):
+            (throttle_stats, throttle_state), error = self.controller.get_throttle_state()
+            if error:
+                st.error(f"Fehler beim Laden des Throttle-Zustands: {error}")
+            else:
+                st.caption(f"Backend: {throttle_stats['backend']} · {throttle_stats['capacity']} Versuche, "
+                           f"1 neuer alle {throttle_stats['refill_seconds']} s · "
+                           f"Abgelehnt: {throttle_stats['rejected']}")
+                if throttle_state:
+                    st.dataframe({
+                        "Schlüssel": [entry["key"] for entry in throttle_state],
+                        "Verbleibende Versuche": [entry["tokens"] for entry in throttle_state],
+                        "Gesperrt für (s)": [entry["retry_after"] for entry in throttle_state]
+                    }, use_container_width=True)
+                else:
+                    st.success("✅ Aktuell keine gedrosselten Logins")
+
+        # Exporte
+        with st.expander("📤 Daten exportieren"):
+            st.write("**User** (ohne Passwort-Hashes)")
+            self.render_export("user_export", self.controller.export_users)
+            st.write("**Admin-Protokoll**")
+            self.render_export("admin_log_export", self.controller.export_admin_logs)
+
         # Aktueller Admin
         st.write("**👤 Aktueller Administrator:**")
         st.success(f"Angemeldet als: {st.session_state.username}")
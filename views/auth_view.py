@@ -1,7 +1,13 @@
 import streamlit as st
+from streamlit import runtime
+from streamlit.runtime.scriptrunner import get_script_run_ctx
 from controllers.auth_controller import AuthController
+from utils.client_address import parse_trusted_proxies, resolve_client_ip
+from config import TRUSTED_PROXIES
 from constants import VALID_ROLES, DEFAULT_ROLE, MIN_PASSWORD_LENGTH, MIN_USERNAME_LENGTH
 
+TRUSTED_PROXY_NETWORKS = parse_trusted_proxies(TRUSTED_PROXIES)
+
 # ----- 3.2 Authentifikations-View -----
 class AuthView:
     # --- 3.2.1 Auth-View Initialisierung ---
@@ -94,7 +100,9 @@ class AuthView:
             return
         
         # Controller aufrufen
-        success, role, message = self.controller.login_user(username.strip(), password)
+        success, role, message = self.controller.login_user(
+            username.strip(), password, client_id=self._get_client_id()
+        )
 
         if success:
             # Session-State setzen
@@ -108,6 +116,22 @@ class AuthView:
         else:
             st.error(message)
 
+    # --- 3.2.5.1 Client-Kennung für den Login-Throttle ---
+    def _get_client_id(self):
+        """Socket-Adresse der Verbindung; X-Forwarded-For nur von TRUSTED_PROXIES"""
+        ctx = get_script_run_ctx()
+        if ctx is None:
+            return None
+
+        client = runtime.get_instance().get_client(ctx.session_id) if runtime.exists() else None
+        request = getattr(client, "request", None)
+        if request is None:
+            # Ohne Server-Verbindung (z. B. Skript-Ausführung) bleibt nur die Session
+            return ctx.session_id
+
+        return resolve_client_ip(request.remote_ip, request.headers.get("X-Forwarded-For"),
+                                 TRUSTED_PROXY_NETWORKS)
+
     # --- 3.2.6 Register-Handler ---
     def _handle_register(self, username, password, confirm_password, role):
         """Verarbeitet Registrierungs-Anfrage"""
@@ -1,5 +1,17 @@
+import os
 import streamlit as st
 from controllers.auth_controller import AuthController
+from utils.file_export import available_formats
+
+STOCK_ALERT_LABELS = {
+    "article_number": "Artikelnummer",
+    "name": "Bezeichnung",
+    "on_hand": "Bestand",
+    "min_stock": "Mindestbestand",
+    "shortfall": "Fehlmenge",
+    "on_order": "Bestellt (offen)",
+    "since": "Unterschritten seit",
+}
 
 # ----- 3.4 Basis-Ansicht -----
 class BaseView:
@@ -117,4 +129,75 @@ class BaseView:
         else:
             st.error(message)
 
+    # ---- 3.4.7 Keyset-Blättern: aktueller Cursor ----
+    def get_page_cursor(self, key, filters=None):
+        """Cursor der aktuellen Seite (None = erste Seite); Filterwechsel setzt zurück"""
+        if st.session_state.get(f"{key}_filters") != filters:
+            st.session_state[f"{key}_filters"] = filters
+            st.session_state[f"{key}_cursors"] = []
+
+        cursors = st.session_state.setdefault(f"{key}_cursors", [])
+        return cursors[-1] if cursors else None
+
+    # ---- 3.4.8 Keyset-Blättern: Navigation ----
+    def render_pager(self, key, next_cursor):
+        """Zeigt Zurück/Weiter-Buttons für eine blätterbare Liste"""
+        cursors = st.session_state.setdefault(f"{key}_cursors", [])
+        col1, col2, col3 = st.columns([1, 2, 1])
+
+        with col1:
+            if st.button("⬅️ Zurück", key=f"{key}_prev", disabled=not cursors):
+                cursors.pop()
+                st.rerun()
+
+        with col2:
+            st.caption(f"Seite {len(cursors) + 1}")
+
+        with col3:
+            if st.button("Weiter ➡️", key=f"{key}_next", disabled=next_cursor is None):
+                cursors.append(next_cursor)
+                st.rerun()
+
+    # ---- 3.4.9 Export (CSV/Parquet) mit Download ----
+    def render_export(self, key, export_func, label="Export erstellen"):
+        """Format wählen, Export erzeugen lassen und die Temp-Datei zum Download anbieten"""
+        col1, col2 = st.columns([1, 2])
+
+        with col1:
+            export_format = st.selectbox("Format", available_formats(), key=f"{key}_format")
+
+        with col2:
+            if st.button(f"📤 {label}", key=f"{key}_export"):
+                with st.spinner("Export läuft..."):
+                    result, error = export_func(export_format)
+                if error:
+                    st.error(f"Fehler beim Export: {error}")
+                else:
+                    st.session_state[f"{key}_export_file"] = result
+
+        exported = st.session_state.get(f"{key}_export_file")
+        if exported and os.path.exists(exported[0]):
+            path, rows = exported
+            # Datei-Handle statt bytes: Streamlit liest die Datei selbst
+            with open(path, "rb") as f:
+                st.download_button(
+                    f"⬇️ {os.path.basename(path)} herunterladen ({rows:,} Zeilen)",
+                    data=f,
+                    file_name=os.path.basename(path),
+                    key=f"{key}_download"
+                )
 
+    # ---- 3.4.10 Mindestbestands-Warnungen ----
+    def render_stock_alerts(self, key):
+        """Tabelle der Artikel unter Mindestbestand (self.controller.get_stock_alerts_page)"""
+        cursor = self.get_page_cursor(key)
+        alerts, next_cursor, total, error = self.controller.get_stock_alerts_page(before=cursor)
+
+        if error:
+            st.error(f"Fehler beim Laden der Warnungen: {error}")
+        elif alerts:
+            st.caption(f"{total:,} Artikel unter Mindestbestand – zuletzt unterschrittene zuerst")
+            st.dataframe(alerts.to_dict(STOCK_ALERT_LABELS), use_container_width=True, hide_index=True)
+            self.render_pager(key, next_cursor)
+        else:
+            st.success("✅ Kein Artikel unter Mindestbestand")
@@ -1,12 +1,71 @@
 import streamlit as st
 from views.base_view import BaseView
+from controllers.logistics_controller import LogisticsController
+from constants import SEARCH_MIN_LENGTH, ABC_THRESHOLDS, CLASSIFICATION_MONTHS
+
+BALANCE_LABELS = {
+    "article_number": "Artikelnummer",
+    "name": "Bezeichnung",
+    "bin_code": "Lagerplatz",
+    "quantity": "Menge",
+    "updated_at": "Letzte Bewegung",
+}
+
+ORDER_LABELS = {
+    "po_number": "Bestellnummer",
+    "supplier": "Lieferant",
+    "status": "Status",
+    "expected_date": "Liefertermin",
+    "lines": "Positionen",
+    "quantity_ordered": "Bestellt",
+    "quantity_received": "Geliefert",
+}
+
+BIN_LABELS = {
+    "bin_code": "Lagerplatz",
+    "zone": "Zone",
+    "aisle": "Gang",
+    "shelf": "Regal",
+    "level": "Ebene",
+    "capacity": "Kapazität",
+    "occupied": "Belegt",
+    "free_capacity": "Frei",
+}
+
+PUTAWAY_LABELS = {
+    "bin_code": "Lagerplatz",
+    "reason": "Grund",
+    "article_quantity": "Bestand Artikel",
+    "occupied": "Belegt",
+    "free_capacity": "Frei",
+}
+
+CLASSIFICATION_LABELS = {
+    "article_number": "Artikelnummer",
+    "name": "Bezeichnung",
+    "abc_class": "ABC",
+    "xyz_class": "XYZ",
+    "consumption": "Verbrauch",
+    "consumption_value": "Verbrauchswert (€)",
+    "value_share": "Wertanteil (%)",
+    "demand_cv": "Variationskoeff.",
+}
+
+MOVEMENT_LABELS = {
+    "created_at": "Zeitpunkt",
+    "bin_code": "Lagerplatz",
+    "quantity": "Menge",
+    "movement_type": "Art",
+    "reference": "Referenz",
+    "username": "Benutzer",
+}
 
 # ----- 3.5 LOGISTIK-VIEW -----
 class LogisticsView(BaseView):
     """Initialisierung der Logistik Ansicht"""
     # ---- 3.5.1 Logistik-Ansicht-Initialisierung 
     def __init__(self):
-        pass
+        self.controller = LogisticsController()
 
     # ---- 3.5.2 Hauptansicht rendern ----
     def render(self):
@@ -20,11 +79,12 @@ class LogisticsView(BaseView):
         self.render_user_info()
 
         # Tab-Navigation
-        tab1, tab2, tab3, tab4 = st.tabs([
+        tab1, tab2, tab3, tab4, tab5 = st.tabs([
             "📋 Wareneingang",
             "🏭 Lagerverschiebung",
             "📊 Lagerstatistik",
-            "📦 Aufträge"
+            "📦 Aufträge",
+            "🏷️ Lagerplätze"
         ])
 
         with tab1:
@@ -38,119 +98,415 @@ class LogisticsView(BaseView):
 
         with tab4:
             self._render_orders_management()
+
+        with tab5:
+            self._render_storage_bins()
     
     # ---- 3.5.3 Wareneingang ----
     def _render_goods_receipt(self):
-        """Wareneingang über Bestellungen buchen"""
+        """Wareneingang gegen offene Bestellpositionen buchen (auch Teillieferungen)"""
         st.subheader("📋 Wareneingang")
 
-        # Placeholder für Wareneingangs-Funktionalität
-        st.info("🚧 **Kommende Funktionen:**")
-        st.write("- 📦 Eingangsbuchungen erstellen")
-        st.write("- 📋 Bestellungen abgleichen")
-        st.write("- ✅ Lieferungen bestätigen")
-        st.write("- 📊 Wareneingangsliste")
+        cursor = self.get_page_cursor("receipt_orders")
+        orders, next_cursor, error = self.controller.get_open_purchase_orders(before=cursor)
+        if error:
+            st.error(f"Fehler beim Laden der Bestellungen: {error}")
+            return
+        if not orders:
+            st.info("Keine offenen Bestellungen")
+            return
 
-        # Demo-Formular (nicht funktional)
-        with st.expander("🔮 Vorschau: Wareneingangs-Formular"):
-            col1, col2 = st.columns(2)
+        options = {f"{number} – {supplier} ({status})": po_id
+                   for po_id, number, supplier, status in zip(
+                       orders.column("po_id"), orders.column("po_number"),
+                       orders.column("supplier"), orders.column("status"))}
+        selected = st.selectbox("Bestellung auswählen", list(options), key="receipt_order")
+        self.render_pager("receipt_orders", next_cursor)
+        po_id = options[selected]
 
-            with col1:
-                st.selectbox("Bestellung auswählen", ["PO-2024-001", "PO-2024-002"], disabled=True)
-                st.text_input("Lieferscheinnummer", disabled=True)
+        lines, error = self.controller.get_open_lines(po_id)
+        if error:
+            st.error(f"Fehler beim Laden der Positionen: {error}")
+            return
 
-            with col2:
-                st.date_input("Eingangsdatum", disabled=True)
-                st.number_input("Menge", disabled=True)
+        col1, col2, col3 = st.columns(3)
+        with col1:
+            delivery_note = st.text_input("Lieferscheinnummer", key=f"receipt_note_{po_id}")
+        with col2:
+            default_bin = st.text_input("Lagerplatz (Standard)", placeholder="z. B. WE-01",
+                                        key=f"receipt_bin_{po_id}").strip()
+        with col3:
+            prefill = st.checkbox("Offene Mengen vorbelegen", value=True, key=f"receipt_prefill_{po_id}")
+
+        # Neuer Key nach jeder Buchung: Grid zeigt dann die verbleibenden Mengen
+        revision = st.session_state.setdefault("receipt_revision", 0)
+        grid = st.data_editor(
+            [{"line_id": line.line_id, "line_no": line.line_no, "article_number": line.article_number,
+              "name": line.name, "quantity_open": line.quantity_open,
+              "quantity": line.quantity_open if prefill else 0, "bin_code": default_bin}
+             for line in lines],
+            key=f"receipt_grid_{po_id}_{prefill}_{default_bin}_{revision}",
+            use_container_width=True,
+            hide_index=True,
+            column_config={
+                "line_id": None,
+                "line_no": st.column_config.NumberColumn("Pos", disabled=True),
+                "article_number": st.column_config.TextColumn("Artikelnummer", disabled=True),
+                "name": st.column_config.TextColumn("Artikel", disabled=True),
+                "quantity_open": st.column_config.NumberColumn("Offen", disabled=True),
+                "quantity": st.column_config.NumberColumn("Geliefert", min_value=0, step=1),
+                "bin_code": st.column_config.TextColumn("Lagerplatz"),
+            }
+        )
+
+        receipts = [(row["line_id"], row["quantity"], row["bin_code"] or default_bin)
+                    for row in grid if row["quantity"]]
+        st.caption(f"{len(receipts)} von {len(lines)} offenen Positionen werden gebucht; "
+                   "Positionen mit Menge 0 bleiben offen.")
 
-            st.button("Wareneingang buchen", disabled=True, help="Wird mit LogisticsController implementiert")
+        # Eine Buchung für die komplette Lieferung – alle Positionen oder keine
+        if st.button("✅ Wareneingang buchen", type="primary", disabled=not receipts,
+                     key=f"receipt_submit_{po_id}"):
+            success, result = self.controller.receive_goods(po_id, receipts, delivery_note)
+            if success:
+                st.session_state.receipt_revision += 1
+                st.session_state.receipt_result = result
+                st.rerun()
+            else:
+                self._show_result(success, result)
+
+        result = st.session_state.pop("receipt_result", None)
+        if result:
+            st.success(f"✅ {result}")
 
     # ---- 3.5.4 Lagerverschiebung ----
     def _render_stock_movement(self):
-        """Artikel im Lager verschieben"""
+        """Bewegungen buchen und Artikel zwischen Lagerplätzen verschieben"""
         st.subheader("🏭 Lagerverschiebung")
 
-        st.info("🚧 **Kommende Funktionen:**")
-        st.write("- 📦 Artikel zwischen Lagerplätzen verschieben")
-        st.write("- 🏷️ Lagerplatz-Verwaltung")
-        st.write("- 📊 Bewegungshistorie")
-        st.write("- 🔍 Artikel-Suche im Lager")
+        article_id = self._select_article("movement")
+        if not article_id:
+            return
 
-        # Demo-Interface
-        with st.expander("🔮 Vorschau: Lagerverschiebung"):
-            col1, col2, col3 = st.columns(3)
+        stock, error = self.controller.get_article_stock(article_id)
+        if error:
+            st.error(f"Fehler beim Laden des Bestands: {error}")
+            return
 
-            with col1:
-                st.selectbox("Artikel", ["Laptop Dell XPS", "Monitor Samsung"], disabled=True)
-                st.selectbox("Von Lagerplatz", ["A1-01-02", "B2-03-02"], disabled=True)
+        if stock:
+            st.write("**Bestand je Lagerplatz:**")
+            st.dataframe({"Lagerplatz": list(stock), "Menge": list(stock.values())},
+                         use_container_width=True, hide_index=True)
+        else:
+            st.info("Kein Bestand vorhanden")
 
+        # Einlagerungsvorschläge: Plätze mit diesem Artikel zuerst, dann leere Plätze
+        with st.expander("🎯 Freie Lagerplätze vorschlagen"):
+            col1, col2 = st.columns(2)
+            with col1:
+                putaway_quantity = st.number_input("Einzulagernde Menge", min_value=1, step=1, value=1,
+                                                   key=f"putaway_quantity_{article_id}")
             with col2:
-                st.selectbox("Nach Lagerplatz", ["A1-01-03", "B2-03-02"], disabled=True)
-                st.number_input("Menge verschieben", disabled=True)
+                putaway_area = st.text_input("Zone oder Präfix", placeholder="z. B. A oder A1-02",
+                                             key=f"putaway_area_{article_id}").strip()
+            zone, prefix = (putaway_area, None) if putaway_area.isalpha() else (None, putaway_area)
+            suggestions, error = self.controller.suggest_putaway(
+                article_id, int(putaway_quantity), zone=zone or None, prefix=prefix or None
+            )
+            if error:
+                st.error(f"Fehler bei den Vorschlägen: {error}")
+            elif suggestions:
+                st.dataframe(suggestions.to_dict(PUTAWAY_LABELS), use_container_width=True, hide_index=True)
+            else:
+                st.info("Kein Lagerplatz mit ausreichend freier Kapazität")
+
+        col1, col2 = st.columns(2)
+
+        # Umlagerung: Abgang und Zugang in einer Buchung
+        with col1, st.form(f"transfer_form_{article_id}", clear_on_submit=True):
+            st.write("**Umlagern**")
+            from_bin = st.selectbox("Von Lagerplatz", list(stock), disabled=not stock)
+            to_bin = st.text_input("Nach Lagerplatz", placeholder="z. B. A1-01-03")
+            quantity = st.number_input("Menge", min_value=1, step=1, value=1)
+            reference = st.text_input("Grund der Verschiebung")
 
-            with col3:
-                st.text_area("Grund der Verschiebung", disabled=True)
-                st.button("Verschiebung durchführen", disabled=True)
+            if st.form_submit_button("🔀 Verschiebung durchführen", disabled=not stock):
+                self._show_result(*self.controller.transfer_stock(
+                    article_id, from_bin, to_bin, int(quantity), reference
+                ))
+
+        # Einzelbuchung (Menge wird je nach Bewegungsart mit Vorzeichen gebucht)
+        with col2, st.form(f"movement_form_{article_id}", clear_on_submit=True):
+            st.write("**Bewegung buchen**")
+            movement_type = st.selectbox("Bewegungsart", ["Eingang", "Ausgang", "Korrektur"])
+            bin_code = st.text_input("Lagerplatz", placeholder="z. B. A1-01-02")
+            quantity = st.number_input("Menge", step=1, value=1,
+                                       help="Bei Korrekturen negativ für Abgänge")
+            reference = st.text_input("Referenz", placeholder="Lieferschein, Inventur...")
+
+            if st.form_submit_button("✅ Buchen"):
+                quantity = int(quantity)
+                if movement_type == "Ausgang":
+                    quantity = -abs(quantity)
+                self._show_result(*self.controller.book_movement(
+                    article_id, bin_code, quantity, movement_type, reference
+                ))
+
+        # Bewegungshistorie des Artikels
+        with st.expander("📜 Bewegungshistorie"):
+            key = f"movements_{article_id}"
+            cursor = self.get_page_cursor(key)
+            movements, next_cursor, error = self.controller.get_movements_page(
+                article_id=article_id, before=cursor
+            )
+            if error:
+                st.error(f"Fehler beim Laden der Bewegungen: {error}")
+            elif movements:
+                st.dataframe(movements.to_dict(MOVEMENT_LABELS), use_container_width=True, hide_index=True)
+                self.render_pager(key, next_cursor)
+            else:
+                st.info("Noch keine Bewegungen")
 
     # ---- 3.5.5 Lagerstatistik ----
     def _render_warehouse_statistics(self):
-        """Lagerstatistik anzeigen"""
+        """Mindestbestands-Warnungen und Bestände je Artikel und Lagerplatz"""
         st.subheader("📊 Lagerstatistik")
 
-        st.info("🚧 **Kommende Funktionen:**")
-        st.write("- 📈 Lagerbestand-Übersicht")
-        st.write("- 🚨 Mindestbestand-Warnungen")
-        st.write("- 📊 Lagerumsatz-Statistiken")
-        st.write("- 🎯 ABC-Analyse")
+        with st.expander("🚨 Kritische Bestände", expanded=True):
+            self.render_stock_alerts("stock_alerts")
 
-        # Demo-Statistiken
-        with st.expander("🔮 Vorschau: Lager-Dashboard"):
-            col1, col2, col3, col4 = st.columns(4)
+        bin_code = st.text_input("Lagerplatz filtern", placeholder="z. B. A1-01-02").strip() or None
 
+        cursor = self.get_page_cursor("stock_list", filters=bin_code)
+        balances, next_cursor, error = self.controller.get_stock_page(bin_code=bin_code, after=cursor)
+
+        if error:
+            st.error(f"Fehler beim Laden der Bestände: {error}")
+        elif balances:
+            st.dataframe(balances.to_dict(BALANCE_LABELS), use_container_width=True, hide_index=True)
+            self.render_pager("stock_list", next_cursor)
+        else:
+            st.info("Keine Bestände vorhanden")
+
+        # Bestände gegen das Bewegungsjournal prüfen
+        with st.expander("🔧 Bestände prüfen"):
+            st.caption("Summiert das komplette Journal und vergleicht es mit den gespeicherten Beständen")
+            col1, col2 = st.columns(2)
             with col1:
-                st.metric("Gesamt-Artikel", "247", "+12")
+                check = st.button("🔍 Prüfen", key="stock_verify")
             with col2:
-                st.metric("Lagerplätze", "156", "+3")
-            with col3:
-                st.metric("Lagerwert", "€89.432", "+€2.145")
-            with col4:
-                st.metric("Kritische Bestände", "8", "-2")
-        
-        # Demo-Chart
-        st.write("**Bestandsentwicklung (Demo-Daten):**")
-        chart_data = {
-            "Woche": ["KW1", "KW2", "KW3", "KW4"],
-            "Eingang": [45, 52, 48, 60],
-            "Ausgang": [38, 41, 44, 51]
-        }
-        st.line_chart(chart_data, x="Woche")
+                repair = st.button("🛠️ Prüfen und neu aufbauen", key="stock_repair")
+
+            if check or repair:
+                mismatches, error = self.controller.verify_balances(repair=repair)
+                if error:
+                    st.error(f"Fehler bei der Prüfung: {error}")
+                elif not mismatches:
+                    st.success("✅ Alle Bestände stimmen mit dem Journal überein")
+                else:
+                    st.warning(f"{len(mismatches)} Abweichung(en)" + (" – neu aufgebaut" if repair else ""))
+                    st.dataframe(
+                        [{"Artikel-ID": a, "Lagerplatz": b, "Bestand": q, "Journal": l}
+                         for a, b, q, l in mismatches],
+                        use_container_width=True, hide_index=True
+                    )
+
+        with st.expander("🎯 ABC/XYZ-Analyse"):
+            self._render_classification()
+
+        # Warnungen werden beim Buchen gepflegt; der volle Abgleich läuft zusätzlich periodisch
+        with st.expander("🔧 Warnungen abgleichen"):
+            st.caption("Vergleicht alle Artikel mit Mindestbestand gegen ihre Bestände")
+            if st.button("🛠️ Jetzt abgleichen", key="stock_alerts_reconcile"):
+                mismatches, error = self.controller.reconcile_stock_alerts(repair=True)
+                if error:
+                    st.error(f"Fehler beim Abgleich: {error}")
+                elif not mismatches:
+                    st.success("✅ Warnungen sind aktuell")
+                else:
+                    st.warning(f"{len(mismatches)} Warnung(en) korrigiert")
+                    st.dataframe(
+                        [{"Artikel-ID": a, "Gespeichert": stored, "Tatsächlich": actual}
+                         for a, stored, actual in mismatches],
+                        use_container_width=True, hide_index=True
+                    )
 
     # ---- 3.5.6 Aufträge ----
     def _render_orders_management(self):
-        """Auftrags-Management für Logistiker"""
+        """Offene und teilgelieferte Bestellungen mit Lieferfortschritt"""
         st.subheader("📦 Aufträge")
 
-        st.info("🚧 **Kommende Funktionen:**")
-        st.write("- 📋 Offene Aufträge anzeigen")
-        st.write("- 🚚 Lieferstatus verfolgen")
-        st.write("- ✅ Bestellungen als geliefert markieren")
-        st.write("- 📊 Lieferanten-Performance")
-
-        # Demo-Auftragsliste
-        with st.expander("🔮 Vorschau: Auftragsübersicht"):
-            demo_orders = {
-                "Auftragsnummer": ["PO-2024-001", "PO-2024-002", "PO-2024-003"],
-                "Lieferant": ["Tech-Supplier GmbH", "Office-World AG", "IT-Solutions"],
-                "Status": ["Unterwegs", "Bestellt", "Geliefert"],
-                "Wert": ["€2.450", "€890", "€1.200"]
-            }
-            st.dataframe(demo_orders, use_container_width=True)
+        cursor = self.get_page_cursor("open_orders")
+        orders, next_cursor, error = self.controller.get_open_purchase_orders(before=cursor)
+
+        if error:
+            st.error(f"Fehler beim Laden der Bestellungen: {error}")
+        elif orders:
+            st.dataframe(orders.to_dict(ORDER_LABELS), use_container_width=True, hide_index=True)
+            self.render_pager("open_orders", next_cursor)
+        else:
+            st.info("Keine offenen Bestellungen")
+
+    # ---- 3.5.7 Artikel per Suche auswählen ----
+    def _select_article(self, key):
+        """Type-ahead-Suche; liefert die gewählte article_id oder None"""
+        search_term = st.text_input(
+            "Artikel suchen:",
+            placeholder="Artikelnummer oder Name...",
+            key=f"{key}_article_search"
+        )
+
+        if len(search_term.strip()) < SEARCH_MIN_LENGTH:
+            st.info(f"Mindestens {SEARCH_MIN_LENGTH} Zeichen eingeben")
+            return None
+
+        articles, error = self.controller.search_articles(search_term)
+        if error:
+            st.error(f"Fehler bei der Suche: {error}")
+            return None
+        if not articles:
+            st.info("Keine passenden Artikel gefunden")
+            return None
+
+        options = {f"{a.article_number} - {a.name}": a.article_id for a in articles}
+        selected = st.selectbox("Artikel auswählen:", list(options), key=f"{key}_article_select")
+        return options[selected]
+
+    # ---- 3.5.8 Buchungsergebnis anzeigen ----
+    def _show_result(self, success, result):
+        if success:
+            st.success(f"✅ {result}")
+        else:
+            for error in result:
+                st.error(f"❌ {error}")
+
+    # ---- 3.5.9 Lagerplätze ----
+    def _render_storage_bins(self):
+        """Lagerplatz-Stamm: Bereiche anlegen, Belegung ansehen, Kapazität pflegen"""
+        st.subheader("🏷️ Lagerplätze")
+
+        col1, col2 = st.columns([2, 1])
+        with col1:
+            prefix = st.text_input("Code beginnt mit", placeholder="z. B. A1-02",
+                                   key="bins_prefix").strip() or None
+        with col2:
+            only_free = st.checkbox("Nur mit freier Kapazität", key="bins_only_free")
 
-            st.write("**Aktionen (Demo):**")
-            col1, col2, col3 = st.columns(3)
+        cursor = self.get_page_cursor("bins_list", filters=(prefix, only_free))
+        bins, next_cursor, error = self.controller.get_bins_page(prefix=prefix, only_free=only_free,
+                                                                 after=cursor)
+        if error:
+            st.error(f"Fehler beim Laden der Lagerplätze: {error}")
+        elif bins:
+            st.dataframe(bins.to_dict(BIN_LABELS), use_container_width=True, hide_index=True)
+            self.render_pager("bins_list", next_cursor)
+        else:
+            st.info("Keine Lagerplätze gefunden")
+
+        with st.expander("➕ Lagerplatz-Bereich anlegen"):
+            with st.form("bins_generate_form"):
+                zone = st.text_input("Zone", placeholder="A", max_chars=3)
+                col1, col2, col3 = st.columns(3)
+                with col1:
+                    aisles = (st.number_input("Gang von", min_value=1, value=1, step=1),
+                              st.number_input("Gang bis", min_value=1, value=1, step=1))
+                with col2:
+                    shelves = (st.number_input("Regal von", min_value=1, value=1, step=1),
+                               st.number_input("Regal bis", min_value=1, value=10, step=1))
+                with col3:
+                    levels = (st.number_input("Ebene von", min_value=1, value=1, step=1),
+                              st.number_input("Ebene bis", min_value=1, value=4, step=1))
+                capacity = st.number_input("Kapazität je Platz (0 = unbegrenzt)", min_value=0, value=100, step=1)
+                st.caption("Codes nach dem Schema <Zone><Gang>-<Regal>-<Ebene>, z. B. A1-01-02")
+
+                if st.form_submit_button("Lagerplätze anlegen"):
+                    self._show_result(*self.controller.create_bins(
+                        zone,
+                        tuple(int(v) for v in aisles),
+                        tuple(int(v) for v in shelves),
+                        tuple(int(v) for v in levels),
+                        capacity=int(capacity) or None
+                    ))
+
+        with st.expander("✏️ Einzelnen Lagerplatz anlegen/ändern"):
+            with st.form("bin_edit_form"):
+                bin_code = st.text_input("Lagerplatz-Code", placeholder="z. B. WE-01 oder A1-01-02")
+                capacity = st.number_input("Kapazität (0 = unbegrenzt)", min_value=0, value=0, step=1)
+                active = st.checkbox("Aktiv (für Einlagerungsvorschläge)", value=True)
+                if st.form_submit_button("Speichern"):
+                    self._show_result(*self.controller.save_bin(bin_code, int(capacity) or None, active))
+
+        with st.expander("🔧 Belegung prüfen"):
+            col1, col2 = st.columns(2)
             with col1:
-                st.button("📦 Wareneingang buchen", disabled=True)
+                check = st.button("🔍 Prüfen", key="bins_verify")
             with col2:
-                st.button("🔍 Details anzeigen", disabled=True)
-            with col3:
-                st.button("📞 Lieferant kontaktieren", disabled=True)
\ No newline at end of file
+                repair = st.button("🛠️ Prüfen und korrigieren", key="bins_repair")
+
+            if check or repair:
+                mismatches, error = self.controller.check_bin_occupancy(repair=repair)
+                if error:
+                    st.error(f"Fehler bei der Prüfung: {error}")
+                elif not mismatches:
+                    st.success("✅ Belegung stimmt mit den Beständen überein")
+                else:
+                    st.warning(f"{len(mismatches)} Abweichung(en)" + (" – korrigiert" if repair else ""))
+                    st.dataframe(
+                        [{"Lagerplatz": b, "Belegung": o, "Bestände": a} for b, o, a in mismatches],
+                        use_container_width=True, hide_index=True
+                    )
+
+    # ---- 3.5.10 ABC/XYZ-Analyse ----
+    def _render_classification(self):
+        """Matrix der letzten Analyse, gefilterte Artikelliste und Neuberechnung"""
+        st.caption(f"ABC nach Anteil am Verbrauchswert (A bis {ABC_THRESHOLDS[0]:.0%}, "
+                   f"B bis {ABC_THRESHOLDS[1]:.0%}), XYZ nach Schwankung der Monatsverbräuche "
+                   f"der letzten {CLASSIFICATION_MONTHS} Monate")
+
+        if st.button("🔄 Neu berechnen", key="classification_run"):
+            with st.spinner("Analyse läuft..."):
+                result, error = self.controller.run_classification()
+            if error:
+                st.error(f"Fehler bei der Analyse: {error}")
+            else:
+                st.success(f"✅ {result['articles']:,} Artikel klassifiziert "
+                           f"({result['consumers']:,} mit Verbrauch seit {result['since']}) "
+                           f"in {result['seconds']} s")
+
+        cells, computed_at, error = self.controller.get_classification_matrix()
+        if error:
+            st.error(f"Fehler beim Laden der Analyse: {error}")
+            return
+        if not computed_at:
+            st.info("Noch keine Analyse berechnet")
+            return
+
+        st.write(f"**Stand:** {computed_at} (UTC)")
+        # Zeilen A/B/C, Spalten X/Y/Z: Anzahl Artikel je Feld
+        st.dataframe(
+            [{"ABC": abc,
+              **{xyz: cells.get((abc, xyz), (0, 0))[0] for xyz in "XYZ"},
+              "Wert (€)": round(sum(cells.get((abc, xyz), (0, 0))[1] or 0 for xyz in "XYZ"), 2)}
+             for abc in "ABC"],
+            use_container_width=True, hide_index=True
+        )
+
+        col1, col2 = st.columns(2)
+        with col1:
+            abc_class = st.selectbox("ABC", ["Alle", "A", "B", "C"], key="classification_abc")
+        with col2:
+            xyz_class = st.selectbox("XYZ", ["Alle", "X", "Y", "Z"], key="classification_xyz")
+        abc_class = None if abc_class == "Alle" else abc_class
+        xyz_class = None if xyz_class == "Alle" else xyz_class
+
+        cursor = self.get_page_cursor("classification_list", filters=(abc_class, xyz_class, computed_at))
+        articles, next_cursor, error = self.controller.get_classification_page(
+            abc_class=abc_class, xyz_class=xyz_class, after=cursor
+        )
+        if error:
+            st.error(f"Fehler beim Laden der Artikel: {error}")
+        elif articles:
+            st.dataframe(articles.to_dict(CLASSIFICATION_LABELS), use_container_width=True, hide_index=True)
+            self.render_pager("classification_list", next_cursor)
+        else:
+            st.info("Keine Artikel in diesem Feld")
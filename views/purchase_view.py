@@ -1,6 +1,21 @@
+from datetime import datetime, timedelta, timezone
 import streamlit as st
 from controllers.purchase_controller import PurchaseController
 from views.base_view import BaseView
+from models.base_model import ConflictError
+from constants import SEARCH_MIN_LENGTH, ARTICLE_STATUSES, PO_STATUSES
+
+PO_LIST_LABELS = {
+    "po_number": "Bestellnummer",
+    "supplier": "Lieferant",
+    "status": "Status",
+    "order_date": "Bestelldatum",
+    "expected_date": "Liefertermin",
+    "lines": "Positionen",
+    "quantity_ordered": "Bestellt",
+    "quantity_received": "Geliefert",
+    "order_value": "Wert (€)",
+}
 
 # ----- 3.0 VIEWS -----
 # ---- 3.1 Einkaufs-View ----
@@ -21,7 +36,13 @@ class PurchaseView(BaseView):
         # Sidebar mit User-Info
         self.render_user_info()
 
-        tab1, tab2, tab3 = st.tabs(["📦 Artikelübersicht", "➕ Neuer Artikel anlegen", "✏️ Artikel bearbeiten"])
+        tab1, tab2, tab3, tab4, tab5 = st.tabs([
+            "📦 Artikelübersicht",
+            "➕ Neuer Artikel anlegen",
+            "✏️ Artikel bearbeiten",
+            "📥 Massenimport",
+            "🧾 Bestellungen"
+        ])
 
         with tab1:
             self._render_article_list()
@@ -32,6 +53,12 @@ class PurchaseView(BaseView):
         with tab3:
             self._render_edit_article_form()
 
+        with tab4:
+            self._render_article_import()
+
+        with tab5:
+            self._render_purchase_orders()
+
     # --- 3.1.3 Artikelübersicht anzeigen ---
     def _render_article_list(self):
         """Zeigt alle Artikel in einer Tabelle an"""
@@ -40,29 +67,27 @@ class PurchaseView(BaseView):
         # Filter für aktive/alle Artikel
         show_inactive = st.checkbox("Inaktive Artikel anzeigen", value=False)
 
-        # Artikel vom Controller holen
-        if show_inactive:
-            articles, error = self.controller.get_all_articles()
-        else:
-            articles, error = self.controller.get_active_articles()
+        # Artikel seitenweise vom Controller holen (Filter in SQL)
+        status = None if show_inactive else "aktiv"
+        cursor = self.get_page_cursor("article_list", filters=status)
+        articles, next_cursor, error = self.controller.get_articles_page(status=status, after=cursor)
 
         # Fehlerbehandlung
         if error:
             st.error(f"Fehler beim Laden der Artikel: {error}")
             return
         
-        # Artikel anzeigen
+        # Artikel als editierbares Grid anzeigen
         if articles:
-            # DataFrame für Streamlit erstellen
-            articles_dict = {
-                "ID": [a.article_id for a in articles],
-                "Artikelnummer": [a.article_number for a in articles],
-                "Name": [a.name for a in articles],
-                "Beschreibung": [a.description for a in articles],
-                "Mindestbestand": [a.min_stock for a in articles],
-                "Status": [a.status for a in articles]
-            }
-            st.dataframe(articles_dict, use_container_width=True)
+            self._render_article_grid(articles, status)
+            self.render_pager("article_list", next_cursor)
+
+            # Export aller Artikel mit dem aktuellen Filter (nicht nur dieser Seite)
+            with st.expander("📤 Artikel exportieren"):
+                self.render_export(
+                    "article_list",
+                    lambda export_format: self.controller.export_articles(export_format, status=status)
+                )
         else:
             st.info("Keine Artikel vorhanden")
 
@@ -164,18 +189,28 @@ class PurchaseView(BaseView):
         """Zeigt Formular zum Bearbeiten von Artikeln"""
         st.subheader("Artikel bearbeiten")
 
-        # Artikel auswählen
-        articles, error = self.controller.get_all_articles()
+        # Artikel per Volltextsuche finden (Nummer, Name, Beschreibung)
+        search_term = st.text_input(
+            "Artikel suchen:",
+            placeholder="Artikelnummer, Name oder Beschreibung...",
+            help="Wortanfänge genügen, z. B. 'thin carb' oder 'Mueller'"
+        )
+
+        if len(search_term.strip()) < SEARCH_MIN_LENGTH:
+            st.info(f"Mindestens {SEARCH_MIN_LENGTH} Zeichen eingeben")
+            return
+
+        articles, error = self.controller.search_articles(search_term)
 
         if error:
-            st.error(f"Fehler beim Laden der Artikel: {error}")
+            st.error(f"Fehler bei der Suche: {error}")
             return
         
         if not articles:
-            st.info("Keine Artikel zum Bearbeiten vorhanden")
+            st.info("Keine passenden Artikel gefunden")
             return
         
-        # Artikel-Auswahl-Dropdown-Menü
+        # Treffer-Auswahl (beste Treffer zuerst)
         article_options = {}
         for article in articles:
             display_name = f"{article.article_number} - {article.name} ({article.status})"
@@ -195,37 +230,42 @@ class PurchaseView(BaseView):
     def _render_edit_form(self, article_id):
         """Zeigt das Bearbeitungsformular für einen spezifischen Artikel"""
 
-        # Artikel-Details laden
-        article = None
-        all_articles, _ = self.controller.get_all_articles()
-        for a in all_articles:
-            if a.article_id == article_id:
-                article = a
-                break
-        if not article:
-            st.error("Artikel nicht gefunden")
+        # Artikel-Details direkt per ID laden
+        article, error = self.controller.get_article(article_id)
+        if error:
+            st.error(error)
             return
+
+        # Geladenen Stand merken: beim Speichern wird gegen diese Version geprüft
+        base_key = f"edit_article_base_{article_id}"
+        if base_key not in st.session_state:
+            st.session_state[base_key] = self._article_snapshot(article)
+        base = st.session_state[base_key]
+
+        conflict_key = f"edit_article_conflict_{article_id}"
+        if conflict_key in st.session_state:
+            self._render_edit_conflict(article_id, *st.session_state[conflict_key])
         
         # Edit-Formular mit vorausgefüllten Werten
-        with st.form(f"edit_article_form_{article_id}"):
+        with st.form(f"edit_article_form_{article_id}_{base['row_version']}"):
             st.write("**Aktuelle Werte:**")
 
             # Eingabefelder mit aktuellen Werten
             article_number = st.text_input(
                 "Artikelnummer *",
-                value=article.article_number,
+                value=base["article_number"],
                 help="Eindeutige Artikelnummer"
             )
 
             name = st.text_input(
                 "Artikelname *",
-                value=article.name,
+                value=base["name"],
                 help="Bezeichnung des Artikels"
             )
 
             description = st.text_area(
                 "Beschreibung",
-                value=article.description or "",
+                value=base["description"] or "",
                 help="Optionale Beschreibung"
             )
 
@@ -235,12 +275,12 @@ class PurchaseView(BaseView):
                 min_stock = st.number_input(
                     "Mindestbestand *",
                     min_value=0,
-                    value=article.min_stock,
+                    value=base["min_stock"],
                     help="Minimaler Lagerbestand"
                 )
 
             with col2:
-                current_status = article.status
+                current_status = base["status"]
                 status_index = 0 if current_status == "aktiv" else 1
                 status = st.selectbox(
                     "Status",
@@ -273,6 +313,9 @@ class PurchaseView(BaseView):
             if delete_submitted:
                 self._handle_delete_article_submission(article_id)
 
+        with st.expander("🕓 Änderungsverlauf"):
+            self._render_article_history(article_id)
+
     # --- 3.1.8 Edit-Artikel Verarbeitung ---
     def _handle_edit_article_submission(self, article_id, article_number, name, description, min_stock, status):
         """Verarbeitet die Bearbeitung eines Artikels"""
@@ -295,17 +338,80 @@ class PurchaseView(BaseView):
             "status": status
         }
 
-        # Controller aufrufen
-        success, message = self.controller.update_article(article_id, article_data)
+        # Controller aufrufen (mit geladener Version und geladenen Werten zum Zusammenführen)
+        base = st.session_state[f"edit_article_base_{article_id}"]
+        success, message = self.controller.update_article(
+            article_id, article_data, expected_version=base["row_version"], original=base
+        )
 
         if success:
+            self._reset_edit_state(article_id)
             st.success(message)
             st.balloons()
             st.rerun()
+        elif isinstance(message, ConflictError):
+            st.session_state[f"edit_article_conflict_{article_id}"] = (message, article_data)
+            st.rerun()
         else:
             for error in message:
                 st.error(error)
 
+    # --- 3.1.8.1 Artikelwerte als Vergleichsstand ---
+    @staticmethod
+    def _article_snapshot(article):
+        return {
+            "article_number": article.article_number,
+            "name": article.name,
+            "description": article.description or "",
+            "min_stock": article.min_stock,
+            "status": article.status,
+            "row_version": article.row_version
+        }
+
+    def _reset_edit_state(self, article_id):
+        st.session_state.pop(f"edit_article_base_{article_id}", None)
+        st.session_state.pop(f"edit_article_conflict_{article_id}", None)
+
+    # --- 3.1.8.2 Bearbeitungskonflikt anzeigen ---
+    def _render_edit_conflict(self, article_id, conflict, article_data):
+        """Zeigt eigene vs. aktuelle Werte; Neu laden oder bewusst überschreiben"""
+        st.warning(f"⚠️ {conflict} – Ihre Änderungen wurden nicht gespeichert.")
+        labels = {
+            "article_number": "Artikelnummer",
+            "name": "Name",
+            "description": "Beschreibung",
+            "min_stock": "Mindestbestand",
+            "status": "Status"
+        }
+        fields = conflict.fields or list(labels)
+        st.dataframe({
+            "Feld": [labels[field] for field in fields],
+            "Ihr Wert": [str(article_data.get(field, "")) for field in fields],
+            "Aktueller Wert": [str(getattr(conflict.current, field)) for field in fields]
+        }, use_container_width=True)
+
+        col1, col2 = st.columns(2)
+        with col1:
+            if st.button("🔄 Aktuellen Stand laden", key=f"conflict_reload_{article_id}"):
+                self._reset_edit_state(article_id)
+                st.rerun()
+        with col2:
+            if st.button("✍️ Meine Werte trotzdem speichern", key=f"conflict_overwrite_{article_id}"):
+                success, message = self.controller.update_article(
+                    article_id, article_data, expected_version=conflict.current.row_version
+                )
+                if success:
+                    self._reset_edit_state(article_id)
+                    st.success(message)
+                    st.rerun()
+                elif isinstance(message, ConflictError):
+                    # Schon wieder geändert: neuen Stand zum Vergleich anzeigen
+                    st.session_state[f"edit_article_conflict_{article_id}"] = (message, article_data)
+                    st.rerun()
+                else:
+                    for error in message:
+                        st.error(error)
+
     # --- 3.1.9 Delete-Artikel-Verarbeitung ---
     def _handle_delete_article_submission(self, article_id):
         """Verarbeitet die Deaktivierung eines Artikels"""
@@ -318,8 +424,277 @@ class PurchaseView(BaseView):
 
         # Ergebnis anzeigen
         if success:
+            self._reset_edit_state(article_id)
             st.success(message)
             st.rerun()
         else:
             for error in message:
-                st.error(error)
\ No newline at end of file
+                st.error(error)
+
+    # --- 3.1.10 Massenimport anzeigen ---
+    def _render_article_import(self):
+        """Zeigt den Upload für Lieferanten-Kataloge (CSV/XLSX)"""
+        st.subheader("Artikel-Massenimport")
+        st.info("ℹ️ Spalten: **Artikelnummer**, **Artikelname**, Beschreibung, Mindestbestand, Status. "
+                "Vorhandene Artikelnummern werden aktualisiert; fehlende Spalten "
+                "bzw. leere Mindestbestand/Status-Felder lassen gespeicherte Werte unverändert.")
+
+        uploaded_file = st.file_uploader(
+            "Datei auswählen",
+            type=["csv", "xlsx"],
+            help="CSV (Trennzeichen ; oder ,) oder Excel-Datei"
+        )
+
+        if uploaded_file and st.button("Import starten", type="primary"):
+            self._handle_article_import(uploaded_file)
+
+    # --- 3.1.11 Massenimport verarbeiten ---
+    def _handle_article_import(self, uploaded_file):
+        """Führt den Import mit Fortschrittsanzeige aus und zeigt den Bericht"""
+        progress_bar = st.progress(0.0, text="Import läuft...")
+
+        def on_progress(processed, fraction):
+            progress_bar.progress(fraction or 0.0, text=f"{processed:,} Zeilen verarbeitet")
+
+        success, result = self.controller.import_articles(
+            uploaded_file, uploaded_file.name, progress_callback=on_progress
+        )
+
+        if not success:
+            for error in result:
+                st.error(error)
+            return
+
+        st.success(f"✅ {result['saved']:,} von {result['processed']:,} Zeilen gespeichert")
+
+        if result["failed"]:
+            st.warning(f"⚠️ {result['failed']:,} Zeilen mit Fehlern übersprungen")
+            st.dataframe({
+                "Zeile": [row_number for row_number, _ in result["errors"]],
+                "Fehler": ["; ".join(messages) for _, messages in result["errors"]]
+            }, use_container_width=True)
+            if result["failed"] > len(result["errors"]):
+                st.caption(f"Es werden nur die ersten {len(result['errors']):,} Fehler angezeigt.")
+
+    # --- 3.1.12 Editierbares Artikel-Grid ---
+    def _render_article_grid(self, articles, status):
+        """Grid über die aktuelle Seite; gespeichert wird nur der Diff"""
+        # Neuer Key je Seite/Filter/Speichervorgang verwirft alte Grid-Änderungen
+        cursors = st.session_state.get("article_list_cursors", [])
+        revision = st.session_state.setdefault("article_grid_revision", 0)
+        grid_key = f"article_grid_{status}_{len(cursors)}_{revision}"
+
+        st.data_editor(
+            articles.to_dict(),
+            key=grid_key,
+            num_rows="dynamic",
+            use_container_width=True,
+            column_config={
+                "article_id": st.column_config.NumberColumn("ID", disabled=True),
+                "article_number": st.column_config.TextColumn("Artikelnummer", required=True),
+                "name": st.column_config.TextColumn("Name", required=True),
+                "description": st.column_config.TextColumn("Beschreibung"),
+                "min_stock": st.column_config.NumberColumn("Mindestbestand", min_value=0, step=1, default=0),
+                "status": st.column_config.SelectboxColumn("Status", options=ARTICLE_STATUSES, default="aktiv"),
+                "row_version": None  # ausgeblendet, nur für die Konfliktprüfung
+            }
+        )
+        st.caption("Zellen direkt bearbeiten, Zeilen unten anfügen; gelöschte Zeilen werden deaktiviert.")
+
+        changes = st.session_state.get(grid_key) or {}
+        pending = (len(changes.get("edited_rows", {})) + len(changes.get("added_rows", []))
+                   + len(changes.get("deleted_rows", [])))
+
+        if st.button(f"💾 Änderungen speichern ({pending})", type="primary",
+                     disabled=not pending, key="article_grid_save"):
+            self._handle_article_grid_changes(articles, changes)
+
+    # --- 3.1.13 Grid-Änderungen speichern ---
+    def _handle_article_grid_changes(self, articles, changes):
+        """Übersetzt Zeilenindizes in Artikel-IDs und speichert alles in einem Rutsch"""
+        article_ids = articles.column("article_id")
+        row_versions = articles.column("row_version")
+
+        # Angezeigte Version mitsenden: zwischenzeitliche Änderungen werden erkannt
+        edited_rows = {article_ids[int(index)]: dict(values, row_version=row_versions[int(index)])
+                       for index, values in changes.get("edited_rows", {}).items()}
+        deactivated_rows = {article_ids[int(index)]: row_versions[int(index)]
+                            for index in changes.get("deleted_rows", [])}
+
+        success, message = self.controller.apply_article_changes(
+            edited_rows=edited_rows,
+            added_rows=changes.get("added_rows", []),
+            deactivated_rows=deactivated_rows
+        )
+
+        if success:
+            st.session_state.article_grid_revision += 1
+            st.success(message)
+            st.rerun()
+        else:
+            for error in message:
+                st.error(error)
+
+    # --- 3.1.14 Änderungsverlauf und Stand zu einem Zeitpunkt ---
+    def _render_article_history(self, article_id):
+        """Zeigt die Historie (nur geänderte Felder) und rekonstruiert frühere Stände"""
+        history, error = self.controller.get_article_history(article_id)
+        if error:
+            st.error(f"Fehler beim Laden der Historie: {error}")
+            return
+        if not history:
+            st.info("Keine Änderungen aufgezeichnet")
+            return
+
+        kinds = {"snapshot": "Vollstand", "delta": "Änderung", "delete": "Gelöscht"}
+        st.dataframe({
+            "Zeitpunkt (UTC)": [changed_at for changed_at, _, _ in history],
+            "Art": [kinds[kind] for _, kind, _ in history],
+            "Werte": [", ".join(f"{field}: {value}" for field, value in data.items() if field != "row_version")
+                      for _, _, data in history]
+        }, use_container_width=True)
+
+        st.write("**Stand zu einem Zeitpunkt (UTC):**")
+        # Vorgabe "jetzt" in UTC, einmal je Artikel gemerkt: die Widget-ID enthält den
+        # Vorgabewert, ein neuer Wert je Lauf würde die Auswahl zurücksetzen.
+        # Auf die nächste volle Minute (das Widget kennt nur HH:MM), damit die
+        # Vorgabe alle bisherigen Änderungen einschließt.
+        default_key = f"as_of_default_{article_id}"
+        if default_key not in st.session_state:
+            now = datetime.now(timezone.utc).replace(second=0, microsecond=0)
+            st.session_state[default_key] = now + timedelta(minutes=1)
+        default = st.session_state[default_key]
+        col1, col2 = st.columns(2)
+        with col1:
+            day = st.date_input("Datum", value=default.date(), key=f"as_of_date_{article_id}")
+        with col2:
+            time_of_day = st.time_input("Uhrzeit", value=default.time(), key=f"as_of_time_{article_id}")
+
+        article, error = self.controller.get_article_as_of(
+            article_id, datetime.combine(day, time_of_day, tzinfo=timezone.utc))
+        if error:
+            st.error(f"Fehler bei der Rekonstruktion: {error}")
+        elif article is None:
+            st.info("Zu diesem Zeitpunkt gab es den Artikel noch nicht")
+        else:
+            st.dataframe({
+                "Artikelnummer": [article.article_number],
+                "Name": [article.name],
+                "Beschreibung": [article.description],
+                "Mindestbestand": [article.min_stock],
+                "Status": [article.status]
+            }, use_container_width=True)
+
+    # --- 3.1.15 Bestellungen ---
+    def _render_purchase_orders(self):
+        """Bestellübersicht mit Details und Formular für neue Bestellungen"""
+        st.subheader("Bestellungen")
+
+        # Nachbestellbedarf: Artikel unter Mindestbestand inkl. bereits offener Bestellmengen
+        with st.expander("🚨 Artikel unter Mindestbestand"):
+            self.render_stock_alerts("purchase_stock_alerts")
+
+        with st.expander("➕ Neue Bestellung anlegen"):
+            self._render_new_purchase_order_form()
+
+        status = st.selectbox("Status", ["Alle"] + PO_STATUSES, key="po_status_filter")
+        status = None if status == "Alle" else status
+
+        cursor = self.get_page_cursor("po_list", filters=status)
+        orders, next_cursor, error = self.controller.get_purchase_orders_page(status=status, before=cursor)
+
+        if error:
+            st.error(f"Fehler beim Laden der Bestellungen: {error}")
+            return
+        if not orders:
+            st.info("Keine Bestellungen vorhanden")
+            return
+
+        st.dataframe(orders.to_dict(PO_LIST_LABELS), use_container_width=True, hide_index=True)
+        self.render_pager("po_list", next_cursor)
+
+        # Details einer Bestellung der aktuellen Seite
+        options = dict(zip(orders.column("po_number"), orders.column("po_id")))
+        selected = st.selectbox("Bestellung anzeigen:", list(options), key="po_details_select")
+        if selected:
+            self._render_purchase_order_details(options[selected])
+
+    # --- 3.1.16 Neue Bestellung (Kopf + Positions-Grid) ---
+    def _render_new_purchase_order_form(self):
+        # Neuer Key nach dem Speichern leert das Positions-Grid
+        revision = st.session_state.setdefault("po_form_revision", 0)
+
+        col1, col2 = st.columns(2)
+        with col1:
+            po_number = st.text_input("Bestellnummer *", value=self.controller.suggest_po_number(),
+                                      key=f"po_number_{revision}")
+            supplier = st.text_input("Lieferant *", key=f"po_supplier_{revision}")
+        with col2:
+            order_date = st.date_input("Bestelldatum", value=datetime.now().date(),
+                                       key=f"po_order_date_{revision}")
+            # date_input(value=None) bedeutet in Streamlit 1.24 "heute" – daher per Checkbox
+            if st.checkbox("Liefertermin angeben", key=f"po_has_expected_{revision}"):
+                expected_date = st.date_input("Liefertermin", key=f"po_expected_{revision}")
+            else:
+                expected_date = None
+
+        lines = st.data_editor(
+            [{"article_number": "", "quantity": 1, "unit_price": 0.0}],
+            key=f"po_lines_{revision}",
+            num_rows="dynamic",
+            use_container_width=True,
+            column_config={
+                "article_number": st.column_config.TextColumn("Artikelnummer", required=True),
+                "quantity": st.column_config.NumberColumn("Menge", min_value=1, step=1, default=1),
+                "unit_price": st.column_config.NumberColumn("Einzelpreis (€)", min_value=0.0,
+                                                            step=0.01, format="%.2f", default=0.0),
+            }
+        )
+        st.caption("Positionen können auch per Copy & Paste aus einer Tabelle eingefügt werden.")
+
+        if st.button("💾 Bestellung anlegen", type="primary", key="po_create"):
+            success, result = self.controller.create_purchase_order(
+                {
+                    "po_number": po_number,
+                    "supplier": supplier,
+                    "order_date": order_date.isoformat(),
+                    "expected_date": expected_date.isoformat() if expected_date else None,
+                },
+                lines
+            )
+            if success:
+                st.session_state.po_form_revision += 1
+                st.success(f"✅ {result}")
+                st.rerun()
+            else:
+                for error in result:
+                    st.error(f"❌ {error}")
+
+    # --- 3.1.17 Bestelldetails ---
+    def _render_purchase_order_details(self, po_id):
+        order, error = self.controller.get_purchase_order(po_id)
+        if error:
+            st.error(error)
+            return
+
+        st.write(f"**{order.po_number}** · {order.supplier} · {order.status} · "
+                 f"bestellt am {order.order_date}"
+                 + (f" · Liefertermin {order.expected_date}" if order.expected_date else ""))
+        st.dataframe(
+            [{"Pos": line["line_no"], "Artikelnummer": line["article_number"], "Artikel": line["name"],
+              "Bestellt": line["quantity_ordered"], "Geliefert": line["quantity_received"],
+              "Offen": line["quantity_ordered"] - line["quantity_received"],
+              "Einzelpreis": line["unit_price"]}
+             for line in order.lines],
+            use_container_width=True, hide_index=True
+        )
+
+        if order.status == "Offen":
+            if st.button("🚫 Bestellung stornieren", key=f"po_cancel_{po_id}"):
+                success, result = self.controller.cancel_purchase_order(po_id, order.po_number)
+                if success:
+                    st.success(result)
+                    st.rerun()
+                else:
+                    for error in result:
+                        st.error(error)